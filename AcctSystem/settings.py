@@ -19,6 +19,8 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    # Trigram lookups for main.search
+    "django.contrib.postgres",
     "main",
     "tailwind",
     "theme",
@@ -46,12 +48,14 @@ CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
 MIDDLEWARE = [
+    "main.middleware.AuthQueryCountMiddleware",
+    "main.middleware.RequestProfileMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
-    "django_otp.middleware.OTPMiddleware",
+    "main.middleware.CachedOTPMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "django_browser_reload.middleware.BrowserReloadMiddleware",
@@ -61,7 +65,7 @@ ROOT_URLCONF = "AcctSystem.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "main.profiling.ProfilingDjangoTemplates",
         "DIRS": [],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -77,14 +81,51 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "AcctSystem.wsgi.application"
 
+DB_ENGINE = os.getenv("ACCTSYS_DB_ENGINE")
+
 DATABASES = {
     "default": {
-        "ENGINE": os.getenv("ACCTSYS_DB_ENGINE"),
+        "ENGINE": DB_ENGINE,
         "NAME": os.getenv("ACCTSYS_DB_NAME"),
         "USER": os.getenv("ACCTSYS_DB_USER"),
         "PASSWORD": os.getenv("ACCTSYS_DB_PASSWORD"),
         "HOST": os.getenv("ACCTSYS_DB_HOST"),
         "PORT": os.getenv("ACCTSYS_DB_PORT"),
+        # Seconds to keep a connection open between requests; 0 closes it at
+        # the end of each request, which is what the pooled engine expects:
+        # a persistent connection would hold its pool slot while idle.
+        "CONN_MAX_AGE": int(
+            os.getenv(
+                "ACCTSYS_DB_CONN_MAX_AGE",
+                0 if DB_ENGINE == "main.db.postgresql_pool" else 60,
+            )
+        ),
+        "CONN_HEALTH_CHECKS": os.getenv("ACCTSYS_DB_CONN_HEALTH_CHECKS", "true").lower()
+        in ("1", "true", "yes"),
+        # Used by the main.db.postgresql_pool engine only
+        "POOL": {
+            "MIN_SIZE": int(os.getenv("ACCTSYS_DB_POOL_MIN_SIZE", 1)),
+            "MAX_SIZE": int(os.getenv("ACCTSYS_DB_POOL_MAX_SIZE", 20)),
+            "IDLE_TIMEOUT": int(os.getenv("ACCTSYS_DB_POOL_IDLE_TIMEOUT", 600)),
+            "TIMEOUT": float(os.getenv("ACCTSYS_DB_POOL_TIMEOUT", 30)),
+        },
+    }
+}
+
+# Cache invalidation and OTP verification rely on every process seeing the
+# same cache, so the default is shared by all processes on the host. Use
+# Redis or Memcached when the app runs on several hosts.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "ACCTSYS_CACHE_BACKEND",
+            "django.core.cache.backends.filebased.FileBasedCache",
+        ),
+        "LOCATION": os.getenv("ACCTSYS_CACHE_LOCATION", str(BASE_DIR / "cache")),
+        "TIMEOUT": int(os.getenv("ACCTSYS_CACHE_TIMEOUT", 300)),
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("ACCTSYS_CACHE_MAX_ENTRIES", 1000)),
+        },
     }
 }
 
@@ -118,28 +159,52 @@ STATIC_URL = "static/"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Seconds a verified OTP device is trusted from the session before reloading
+OTP_VERIFICATION_CACHE_TTL = int(os.getenv("ACCTSYS_OTP_CACHE_TTL", 300))
+
 TWO_FACTOR_AUTHENTICATION_FORM = "account.forms.CustomAuthenticationForm"
 
 LOGOUT_REDIRECT_URL = "account:welcome"
 LOGIN_URL = "two_factor:login"
 LOGIN_REDIRECT_URL = "main:application_list"
 
-# LOGGING = {
-#     'version': 1,
-#     'disable_existing_loggers': False,
-#     'handlers': {
-#         'console': {
-#             'class': 'logging.StreamHandler',
-#         },
-#         'file': {
-#             'class': 'logging.FileHandler',
-#             'filename': 'debug.log',
-#         },
-#     },
-#     'loggers': {
-#         'django': {
-#             'handlers': ['console', 'file'],
-#             'level': 'DEBUG',
-#         },
-#     },
-# }
+# Session, user and OTP queries per request, see AuthQueryCountMiddleware
+AUTH_QUERY_COUNTING = os.getenv("ACCTSYS_AUTH_QUERY_COUNTING", str(DEBUG)).lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# Per-request SQL and template timings of main views, see `manage.py slow_queries`
+REQUEST_PROFILING = os.getenv("ACCTSYS_REQUEST_PROFILING", str(DEBUG)).lower() in (
+    "1",
+    "true",
+    "yes",
+)
+REQUEST_PROFILE_LOG = os.getenv(
+    "ACCTSYS_REQUEST_PROFILE_LOG", str(BASE_DIR / "profile.log")
+)
+
+# Uploads waiting for background jobs and the files they produce, see main.jobs
+JOB_FILES_DIR = os.getenv("ACCTSYS_JOB_FILES_DIR", str(BASE_DIR / "job_files"))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "request_profile": {
+            "class": "logging.handlers.RotatingFileHandler",
+            "filename": REQUEST_PROFILE_LOG,
+            "maxBytes": 10 * 1024 * 1024,
+            "backupCount": 5,
+            "delay": True,
+        },
+    },
+    "loggers": {
+        "main.profiling": {
+            "handlers": ["request_profile"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}
@@ -1,19 +1,78 @@
+import argparse
 import os
 import sys
 
 import django
 from django.apps import apps
+from django.core.management.color import no_style
+from django.db import connection
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "AcctSystem.settings")
 django.setup()
 
+from main.caching import bump_generation  # noqa: E402
+
+# Users, sessions and OTP devices; permissions and content types are left alone
+# because migrations, not data, own them.
+AUTH_APP_LABELS = ("admin", "auth", "sessions", "otp_totp", "otp_static")
+
 
 def clear_database():
     for model in apps.get_models():
         model.objects.all().delete()
 
 
+def reset_models(include_auth=False):
+    models = list(apps.get_app_config("main").get_models())
+    if include_auth:
+        models += [
+            model
+            for label in AUTH_APP_LABELS
+            for model in apps.get_app_config(label).get_models(
+                include_auto_created=True
+            )
+            if model._meta.model_name != "permission"
+        ]
+    return models
+
+
+def truncate_database(include_auth=False):
+    """Empty tables without the delete collector.
+
+    PostgreSQL gets one ``TRUNCATE ... RESTART IDENTITY CASCADE``; SQLite gets
+    plain ``DELETE`` statements in dependency order and a sequence reset.
+    """
+    models = reset_models(include_auth)
+    sql_list = connection.ops.sql_flush(
+        no_style(),
+        [model._meta.db_table for model in models],
+        reset_sequences=True,
+        allow_cascade=True,
+    )
+    # SQLite only uses its truncate optimisation for DELETE without a WHERE
+    # clause when no foreign keys are checked; the flush order keeps the
+    # result consistent anyway.
+    with connection.constraint_checks_disabled():
+        connection.ops.execute_sql_flush(sql_list)
+    bump_generation(*apps.get_app_config("main").get_models())
+
+
 if __name__ == "__main__":
-    clear_database()
+    parser = argparse.ArgumentParser(description="Empty the database.")
+    parser.add_argument(
+        "--truncate",
+        action="store_true",
+        help="Truncate the main app tables instead of deleting row by row.",
+    )
+    parser.add_argument(
+        "--include-auth",
+        action="store_true",
+        help="With --truncate, also empty users, sessions and OTP devices.",
+    )
+    args = parser.parse_args()
+    if args.truncate:
+        truncate_database(include_auth=args.include_auth)
+    else:
+        clear_database()
@@ -0,0 +1,115 @@
+"""Read API over partners, legal entities, incomes, outcomes and applications.
+
+``fields=`` picks the columns passed to ``values()``, ``updated_since=``
+returns only rows changed after a timestamp and ``partner_id=`` limits the
+rows to one partner's. Responses carry the scope's row count, so a client
+syncing incrementally can tell when rows were deleted and refetch ids.
+
+``updated_at`` is set when a row is saved, not when its transaction
+commits, so a row can become visible after a sync with an older timestamp.
+``updated_since`` therefore reaches back ``UPDATED_SINCE_OVERLAP``, and
+rows near the boundary are sent again; clients merge results by id.
+"""
+
+import uuid
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Application, Income, LegalEntity, Outcome, Partner
+from .reporting import WATERMARK_OVERLAP
+from .streaming import STREAM_CHUNK_SIZE
+
+TRUE_VALUES = {"1", "true", "yes"}
+FALSE_VALUES = {"0", "false", "no"}
+# Rows committed late are still returned as long as their transaction took
+# less than this, as for the reporting watermark.
+UPDATED_SINCE_OVERLAP = WATERMARK_OVERLAP
+
+
+class ApiError(Exception):
+    pass
+
+
+def _boolean(value):
+    value = value.lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ApiError(f"Invalid boolean: {value!r}")
+
+
+class Resource:
+    def __init__(self, model, scope, filters=None):
+        self.model = model
+        self.fields = tuple(field.attname for field in model._meta.concrete_fields)
+        # Rows belonging to a partner, given its id.
+        self.scope = scope
+        # Query parameters filtering on a column, with their parsers.
+        self.filters = filters or {}
+
+    def parse_fields(self, value):
+        if not value:
+            return self.fields
+        fields = [field.strip() for field in value.split(",") if field.strip()]
+        unknown = [field for field in fields if field not in self.fields]
+        if unknown:
+            raise ApiError(
+                f"Unknown fields: {', '.join(unknown)}. "
+                f"Available: {', '.join(self.fields)}"
+            )
+        if "id" not in fields:
+            fields.insert(0, "id")
+        return tuple(dict.fromkeys(fields))
+
+    def queryset(self, params):
+        """Rows in scope of ``params``, before ``updated_since``."""
+        queryset = self.model.objects.all()
+        partner_id = params.get("partner_id")
+        if partner_id:
+            try:
+                partner_id = uuid.UUID(partner_id)
+            except ValueError:
+                raise ApiError("Invalid partner_id")
+            queryset = queryset.filter(self.scope(partner_id))
+        for name, parse in self.filters.items():
+            if name in params:
+                queryset = queryset.filter(**{name: parse(params[name])})
+        return queryset
+
+
+RESOURCES = {
+    "partners": Resource(
+        Partner, lambda pk: Q(pk=pk), filters={"is_executor": _boolean}
+    ),
+    "legal_entities": Resource(LegalEntity, lambda pk: Q(partner_id=pk)),
+    "incomes": Resource(Income, lambda pk: Q(executor_id=pk)),
+    "outcomes": Resource(Outcome, lambda pk: Q(customer_id=pk)),
+    "applications": Resource(
+        Application,
+        lambda pk: Q(executor_id=pk) | Q(customer_id=pk),
+        filters={"status": str},
+    ),
+}
+
+
+def parse_updated_since(value):
+    if not value:
+        return None
+    updated_since = parse_datetime(value)
+    if updated_since is None:
+        raise ApiError(f"Invalid updated_since: {value!r}")
+    if timezone.is_naive(updated_since):
+        updated_since = timezone.make_aware(updated_since)
+    return updated_since
+
+
+def rows(queryset, fields, updated_since=None, chunk_size=STREAM_CHUNK_SIZE):
+    """Iterate the selected ``fields`` of ``queryset``, oldest change first."""
+    if updated_since is not None:
+        queryset = queryset.filter(
+            updated_at__gte=updated_since - UPDATED_SINCE_OVERLAP
+        )
+    return queryset.order_by("updated_at", "pk").values(*fields).iterator(chunk_size)
@@ -0,0 +1,227 @@
+"""Per-partner discrepancy totals kept in ``PartnerBalance``.
+
+The totals mirror ``main.discrepancy``: an executor's outcome total is the
+sum of outcomes of every customer it shares an application with, and a
+customer's income total is the sum of incomes of its executors. Writes are
+applied as deltas with ``F()`` expressions, fanned out to counterparties in
+a single ``UPDATE``; ``rebuild`` recomputes everything from raw rows.
+"""
+
+from collections import defaultdict
+
+from django.apps import apps as global_apps
+from django.db.models import Count, F, Q, Sum
+
+BALANCE_FIELDS = (
+    "executor_applications",
+    "executor_income",
+    "executor_outcome",
+    "executor_discrepancy",
+    "customer_applications",
+    "customer_income",
+    "customer_outcome",
+    "customer_discrepancy",
+)
+
+
+def _model(name, apps=global_apps):
+    return apps.get_model("main", name)
+
+
+def _apply(partner_ids, **deltas):
+    """Add ``deltas`` to the balances of ``partner_ids`` in one UPDATE.
+
+    Income and outcome deltas are mirrored onto the matching discrepancy.
+    ``partner_ids`` may be a list or a subquery.
+    """
+    updates = defaultdict(int)
+    for field, delta in deltas.items():
+        if not delta:
+            continue
+        updates[field] += delta
+        role, _, kind = field.partition("_")
+        if kind == "income":
+            updates[f"{role}_discrepancy"] += delta
+        elif kind == "outcome":
+            updates[f"{role}_discrepancy"] -= delta
+    if not updates:
+        return
+    _model("PartnerBalance").objects.filter(partner_id__in=partner_ids).update(
+        **{field: F(field) + delta for field, delta in updates.items()}
+    )
+
+
+def _counterparties(partner_id, role):
+    """Subquery of partners sharing an application with ``partner_id``."""
+    Application = _model("Application")
+    if role == "executor":
+        return (
+            Application.objects.filter(executor_id=partner_id)
+            .exclude(customer_id=None)
+            .values("customer_id")
+        )
+    return (
+        Application.objects.filter(customer_id=partner_id)
+        .exclude(executor_id=None)
+        .values("executor_id")
+    )
+
+
+def with_counterparties(partner_ids):
+    """``partner_ids`` plus every partner sharing an application with them."""
+    Application = _model("Application")
+    partner_ids = set(partner_ids)
+    related = Application.objects.filter(
+        Q(executor_id__in=partner_ids) | Q(customer_id__in=partner_ids)
+    ).values_list("executor_id", "customer_id")
+    for executor_id, customer_id in related.iterator():
+        partner_ids.update((executor_id, customer_id))
+    partner_ids.discard(None)
+    return partner_ids
+
+
+def apply_income(executor_id, amount):
+    _apply([executor_id], executor_income=amount)
+    _apply(_counterparties(executor_id, "executor"), customer_income=amount)
+
+
+def apply_outcome(customer_id, amount):
+    _apply([customer_id], customer_outcome=amount)
+    _apply(_counterparties(customer_id, "customer"), executor_outcome=amount)
+
+
+def _pair_exists(executor_id, customer_id, exclude_pk):
+    return (
+        _model("Application")
+        .objects.filter(executor_id=executor_id, customer_id=customer_id)
+        .exclude(pk=exclude_pk)
+        .exists()
+    )
+
+
+def apply_application(pk, executor_id, customer_id, sign):
+    """Add (``sign=1``) or remove (``sign=-1``) one application's effect."""
+    if executor_id:
+        _apply([executor_id], executor_applications=sign)
+    if customer_id:
+        _apply([customer_id], customer_applications=sign)
+    if not (executor_id and customer_id):
+        return
+    if _pair_exists(executor_id, customer_id, exclude_pk=pk):
+        return
+
+    own_income = (
+        _model("Income")
+        .objects.filter(executor_id=executor_id)
+        .aggregate(total=Sum("amount"))["total"]
+    )
+    own_outcome = (
+        _model("Outcome")
+        .objects.filter(customer_id=customer_id)
+        .aggregate(total=Sum("amount"))["total"]
+    )
+    _apply([executor_id], executor_outcome=sign * (own_outcome or 0))
+    _apply([customer_id], customer_income=sign * (own_income or 0))
+
+
+def compute(partner_ids=None, apps=global_apps):
+    """Recompute balances from raw rows, for all or only ``partner_ids``."""
+    Partner = _model("Partner", apps)
+    Application = _model("Application", apps)
+    Income = _model("Income", apps)
+    Outcome = _model("Outcome", apps)
+
+    partners = Partner.objects.all()
+    if partner_ids is not None:
+        partners = partners.filter(pk__in=partner_ids)
+    balances = {
+        pk: dict.fromkeys(BALANCE_FIELDS, 0)
+        for pk in partners.values_list("pk", flat=True)
+    }
+
+    applications = Application.objects.all()
+    if partner_ids is not None:
+        applications = applications.filter(
+            Q(executor_id__in=partner_ids) | Q(customer_id__in=partner_ids)
+        )
+
+    for row in applications.values("executor_id").annotate(n=Count("pk")):
+        if row["executor_id"] in balances:
+            balances[row["executor_id"]]["executor_applications"] = row["n"]
+    for row in applications.values("customer_id").annotate(n=Count("pk")):
+        if row["customer_id"] in balances:
+            balances[row["customer_id"]]["customer_applications"] = row["n"]
+
+    own_income = dict(
+        Income.objects.values("executor_id")
+        .annotate(total=Sum("amount"))
+        .values_list("executor_id", "total")
+    )
+    own_outcome = dict(
+        Outcome.objects.values("customer_id")
+        .annotate(total=Sum("amount"))
+        .values_list("customer_id", "total")
+    )
+    pairs = (
+        applications.exclude(executor_id=None)
+        .exclude(customer_id=None)
+        .values_list("executor_id", "customer_id")
+        .distinct()
+    )
+    for pk, balance in balances.items():
+        balance["executor_income"] = own_income.get(pk, 0)
+        balance["customer_outcome"] = own_outcome.get(pk, 0)
+    for executor_id, customer_id in pairs:
+        if executor_id in balances:
+            balances[executor_id]["executor_outcome"] += own_outcome.get(customer_id, 0)
+        if customer_id in balances:
+            balances[customer_id]["customer_income"] += own_income.get(executor_id, 0)
+
+    for balance in balances.values():
+        for role in ("executor", "customer"):
+            balance[f"{role}_discrepancy"] = (
+                balance[f"{role}_income"] - balance[f"{role}_outcome"]
+            )
+    return balances
+
+
+def _differs(stored, expected):
+    return any(stored[field] != expected[field] for field in BALANCE_FIELDS)
+
+
+def rebuild(partner_ids=None, apps=global_apps, dry_run=False):
+    """Rewrite balances from raw rows and return the ids that had drifted."""
+    PartnerBalance = _model("PartnerBalance", apps)
+    expected = compute(partner_ids, apps)
+    stored = {
+        row["partner_id"]: row
+        for row in PartnerBalance.objects.filter(partner_id__in=expected).values(
+            "partner_id", *BALANCE_FIELDS
+        )
+    }
+    drifted = [
+        pk
+        for pk, balance in expected.items()
+        if pk not in stored or _differs(stored[pk], balance)
+    ]
+    if dry_run:
+        return drifted
+
+    PartnerBalance.objects.bulk_create(
+        [
+            PartnerBalance(partner_id=pk, **expected[pk])
+            for pk in drifted
+            if pk not in stored
+        ],
+        batch_size=1000,
+    )
+    PartnerBalance.objects.bulk_update(
+        [
+            PartnerBalance(partner_id=pk, **expected[pk])
+            for pk in drifted
+            if pk in stored
+        ],
+        BALANCE_FIELDS,
+        batch_size=1000,
+    )
+    return drifted
@@ -0,0 +1,159 @@
+"""Latency, query count and peak memory of the dashboard's hot endpoints."""
+
+import statistics
+import time
+import tracemalloc
+from contextlib import nullcontext
+from itertools import combinations
+from urllib.parse import urlencode
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django_otp import DEVICE_ID_SESSION_KEY
+from django_otp.plugins.otp_totp.models import TOTPDevice
+
+from .models import Application
+from .testing import temporary_cache
+
+# A regression must exceed both the relative threshold and these floors, so
+# sub-millisecond jitter on fast endpoints is not reported.
+MIN_LATENCY_DELTA_MS = 0.5
+MIN_MEMORY_DELTA_KB = 64
+
+
+def verified_client():
+    """A test client logged in as a benchmark user with a verified OTP device."""
+    user, _ = User.objects.get_or_create(username="benchmark")
+    device, _ = TOTPDevice.objects.get_or_create(user=user, name="benchmark")
+    client = Client()
+    client.force_login(user)
+    session = client.session
+    session[DEVICE_ID_SESSION_KEY] = device.persistent_id
+    session.save()
+    return client
+
+
+def _url(name, **params):
+    url = reverse(f"main:{name}")
+    return f"{url}?{urlencode(params)}" if params else url
+
+
+def dashboard_cases():
+    """Return ``{case name: url}`` for the endpoints worth tracking."""
+    sample = Application.objects.exclude(executor=None).exclude(customer=None)
+    sample = sample.exclude(receiver=None).order_by("pk").first()
+    if sample is None:
+        raise ValueError("The database needs at least one complete application.")
+
+    filters = {
+        "customer": {"customer": sample.customer_id},
+        "executor": {"executor": sample.executor_id},
+        "legal_entity": {"legal_entity": sample.receiver_id},
+        "dates": {
+            "start_date": sample.created_date.date().replace(day=1).isoformat(),
+            "end_date": sample.created_date.date().isoformat(),
+        },
+    }
+    cases = {}
+    for size in range(len(filters) + 1):
+        for names in combinations(filters, size):
+            params = {}
+            for name in names:
+                params.update(filters[name])
+            cases[f"application_list[{'+'.join(names)}]"] = _url(
+                "application_list", **params
+            )
+    cases["application_list[sort_by_sum]"] = _url(
+        "application_list", sort_by_sum="desc"
+    )
+    for role in ("executor", "customer"):
+        cases[f"partner_data_whole[{role}]"] = _url(
+            "partner_data_whole", partner_id=getattr(sample, f"{role}_id"), role=role
+        )
+    cases["legal_entities_data"] = _url("legal_entities_data")
+    cases["legal_entities_data[partner]"] = _url(
+        "legal_entities_data", partner_id=sample.executor_id
+    )
+    cases["partner_list"] = _url("partner_list")
+    cases["application_form"] = _url("application_create")
+    return cases
+
+
+def _get(client, url):
+    response = client.get(url)
+    if response.status_code != 200:
+        raise AssertionError(f"GET {url} returned {response.status_code}")
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def measure(client, url, repeat, warm_cache=False):
+    """Time ``repeat`` requests to ``url`` after one unrecorded warm-up.
+
+    Without ``warm_cache`` every request gets an empty cache of its own and
+    the configured one is left untouched.
+    """
+
+    def cache_state():
+        return nullcontext() if warm_cache else temporary_cache()
+
+    with cache_state():
+        _get(client, url)
+    durations, queries = [], []
+    for _ in range(repeat):
+        with cache_state(), CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            size = _get(client, url)
+            durations.append((time.perf_counter() - started) * 1000)
+        queries.append(len(captured))
+
+    # Traced separately: tracemalloc slows allocation-heavy code down a lot.
+    with cache_state():
+        tracemalloc.start()
+        try:
+            _get(client, url)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    durations.sort()
+    return {
+        "p50_ms": round(statistics.median(durations), 3),
+        "p95_ms": round(
+            durations[min(len(durations) - 1, int(len(durations) * 0.95))], 3
+        ),
+        "mean_ms": round(statistics.mean(durations), 3),
+        "queries": max(queries),
+        "peak_kb": round(peak / 1024, 1),
+        "response_bytes": size,
+    }
+
+
+def compare(baseline, current, threshold):
+    """Return ``[(case, message)]`` for every regression from ``baseline``."""
+    regressions = []
+    for case, new in current.items():
+        old = baseline.get(case)
+        if old is None:
+            continue
+        if new["queries"] > old["queries"]:
+            regressions.append((case, f"queries {old['queries']} -> {new['queries']}"))
+        latency = new["p50_ms"] - old["p50_ms"]
+        if latency > MIN_LATENCY_DELTA_MS and new["p50_ms"] > old["p50_ms"] * (
+            1 + threshold
+        ):
+            regressions.append(
+                (case, f"p50 {old['p50_ms']:.2f}ms -> {new['p50_ms']:.2f}ms")
+            )
+        memory = new["peak_kb"] - old["peak_kb"]
+        if memory > MIN_MEMORY_DELTA_KB and new["peak_kb"] > old["peak_kb"] * (
+            1 + threshold
+        ):
+            regressions.append(
+                (case, f"peak memory {old['peak_kb']}KB -> {new['peak_kb']}KB")
+            )
+    return regressions
@@ -0,0 +1,91 @@
+"""Caching of list view pages.
+
+Cached entries are keyed on the view's validated filters and page cursor
+and on a generation token for every model the view reads. Writes replace
+the token after commit, which orphans all entries built from the old data;
+eviction in the cache backend reclaims them.
+
+Tokens only invalidate anything if every process sees the same ones, so
+nothing is cached while the default cache is local to the process.
+"""
+
+import hashlib
+import uuid
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models import Model
+
+GENERATION_KEY = "main:generation:{}"
+# Larger results are rebuilt on every request rather than cached
+MAX_CACHED_ROWS = 500
+
+
+def is_process_local():
+    """Whether the default cache is invisible to other processes."""
+    return isinstance(caches["default"], LocMemCache)
+
+
+def _generation_key(model):
+    return GENERATION_KEY.format(model._meta.label_lower)
+
+
+def bump_tokens(*keys):
+    """Replace the tokens stored under ``keys`` once the transaction commits."""
+
+    def bump():
+        cache.set_many({key: uuid.uuid4().hex for key in keys}, None)
+
+    transaction.on_commit(bump)
+
+
+def current_tokens(*keys):
+    found = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in found}
+    if missing:
+        # An evicted token must not come back with its old value, so a fresh
+        # one is issued and anything cached under the old one is unreachable.
+        cache.set_many(missing, None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def bump_generation(*models):
+    """Invalidate cached rows of ``models`` once the current transaction commits."""
+    bump_tokens(*[_generation_key(model) for model in models])
+
+
+def generations(*models):
+    return current_tokens(*[_generation_key(model) for model in models])
+
+
+def _key_part(value):
+    if isinstance(value, Model):
+        return value.pk
+    if isinstance(value, dict):
+        return sorted((key, _key_part(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return [_key_part(item) for item in value]
+    return value
+
+
+def cached_rows(namespace, models, build, *key):
+    """Return ``build()`` evaluated once per ``key`` and data generation.
+
+    ``key`` holds what the rows depend on, such as a form's ``cleaned_data``
+    and the page cursor; model instances in it count by primary key. Only
+    results of at most ``MAX_CACHED_ROWS`` rows are stored.
+    """
+    if is_process_local():
+        return build()
+
+    fingerprint = repr((_key_part(key), generations(*models)))
+    key = f"main:rows:{namespace}:{hashlib.md5(fingerprint.encode()).hexdigest()}"
+
+    rows = cache.get(key)
+    if rows is None:
+        rows = build()
+        if len(rows) <= MAX_CACHED_ROWS:
+            cache.set(key, rows)
+    return rows
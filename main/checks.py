@@ -0,0 +1,38 @@
+from django.core.checks import Tags, Warning, register
+from django.db import connections
+
+from .caching import is_process_local
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    if not is_process_local():
+        return []
+    return [
+        Warning(
+            "The default cache is local to each process.",
+            hint=(
+                "List pages are not cached, OTP verification is checked "
+                "against the database on every request and run_jobs refuses "
+                "to start. Configure a cache shared by all processes."
+            ),
+            id="main.W001",
+        )
+    ]
+
+
+@register()
+def check_pooled_connection_age(app_configs, **kwargs):
+    return [
+        Warning(
+            f"Database {alias!r} keeps pooled connections open between requests.",
+            hint=(
+                "With main.db.postgresql_pool each persistent connection holds "
+                "a pool slot while idle. Set CONN_MAX_AGE to 0."
+            ),
+            id="main.W002",
+        )
+        for alias in connections
+        if connections.settings[alias]["ENGINE"] == "main.db.postgresql_pool"
+        and connections.settings[alias]["CONN_MAX_AGE"] != 0
+    ]
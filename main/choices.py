@@ -0,0 +1,182 @@
+"""Cached partner and legal entity dropdowns.
+
+A ``ChoiceProvider`` keeps the ``values_list`` rows of its model in the
+cache, keyed on the model's generation token from ``main.caching``, and a
+copy in process memory. Writes bump the token, so the next form build reads
+the rows once and every form after that renders and validates from memory.
+Tokens in a process-local cache miss other processes' writes, so with one
+the rows are read on every form build instead.
+"""
+
+import uuid
+
+from django import forms
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+
+from .caching import generations, is_process_local
+from .models import LegalEntity, Partner
+
+
+def _key(value):
+    """Canonical string form of a primary or foreign key value."""
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        return None
+
+
+class ChoiceProvider:
+    def __init__(self, name, model, fields, **filters):
+        # ``fields`` must follow the model's field order, see Model.from_db().
+        self.name = name
+        self.model = model
+        self.fields = fields
+        self.filters = filters
+        self._local = None
+
+    def _query(self):
+        return list(
+            self.model.objects.filter(**self.filters)
+            .order_by("name")
+            .values_list(*self.fields)
+        )
+
+    def _rows(self):
+        if is_process_local():
+            rows = self._query()
+            return rows, {str(row[0]): row for row in rows}
+
+        (token,) = generations(self.model)
+        local = self._local
+        if local is not None and local[0] == token:
+            return local[1], local[2]
+
+        key = f"main:choices:{self.name}:{token}"
+        rows = cache.get(key)
+        if rows is None:
+            rows = self._query()
+            cache.set(key, rows)
+        by_pk = {str(row[0]): row for row in rows}
+        self._local = (token, rows, by_pk)
+        return rows, by_pk
+
+    def _matches(self, row, limit):
+        return all(
+            _key(row[self.fields.index(field)]) == _key(value)
+            for field, value in limit.items()
+        )
+
+    def choices(self, **limit):
+        if None in limit.values():
+            return []
+        rows, _ = self._rows()
+        return [(str(row[0]), row[1]) for row in rows if self._matches(row, limit)]
+
+    def instances(self, **limit):
+        """Instances built from the cached rows, in name order."""
+        rows, _ = self._rows()
+        return [
+            self.model.from_db("default", self.fields, row)
+            for row in rows
+            if self._matches(row, limit)
+        ]
+
+    def get(self, pk, **limit):
+        """Return an instance built from the cached row, or ``None``."""
+        if pk is None or None in limit.values():
+            return None
+        _, by_pk = self._rows()
+        row = by_pk.get(_key(pk))
+        if row is None or not self._matches(row, limit):
+            return None
+        return self.model.from_db("default", self.fields, row)
+
+
+PARTNERS = ChoiceProvider(
+    "partners", Partner, ("id", "name", "referral_percentage", "is_executor")
+)
+EXECUTORS = ChoiceProvider(
+    "executors",
+    Partner,
+    ("id", "name", "referral_percentage", "is_executor"),
+    is_executor=True,
+)
+CUSTOMERS = ChoiceProvider(
+    "customers",
+    Partner,
+    ("id", "name", "referral_percentage", "is_executor"),
+    is_executor=False,
+)
+LEGAL_ENTITIES = ChoiceProvider(
+    "legal_entities", LegalEntity, ("id", "name", "partner_id")
+)
+
+
+class CachedChoiceIterator:
+    def __init__(self, field):
+        self.field = field
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        yield from self.field.provider.choices(**self.field.limit)
+
+    def __len__(self):
+        return len(list(iter(self)))
+
+    def __bool__(self):
+        return True
+
+
+class CachedModelChoiceField(forms.ModelChoiceField):
+    """ModelChoiceField served from a ``ChoiceProvider`` instead of a queryset.
+
+    Validation is a dict lookup; the cleaned value is an instance with only
+    the provider's fields loaded. ``limit`` restricts the choices by field
+    value, e.g. legal entities of one partner.
+    """
+
+    def __init__(self, provider, limit=None, **kwargs):
+        self.provider = provider
+        self.limit = limit or {}
+        super().__init__(queryset=provider.model.objects.none(), **kwargs)
+
+    def limit_choices(self, **limit):
+        self.limit = limit
+
+    def _get_choices(self):
+        return CachedChoiceIterator(self)
+
+    choices = property(_get_choices, forms.ChoiceField._set_choices)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if isinstance(value, self.provider.model):
+            value = value.pk
+        instance = self.provider.get(value, **self.limit)
+        if instance is None:
+            raise ValidationError(
+                self.error_messages["invalid_choice"],
+                code="invalid_choice",
+                params={"value": value},
+            )
+        return instance
+
+
+class CachedChoicesMixin:
+    """ModelForm mixin skipping the model's per-field existence queries.
+
+    ``CachedModelChoiceField`` already checked the value against the cached
+    rows; the foreign key constraint still guards the write.
+    """
+
+    def _get_validation_exclusions(self):
+        exclude = super()._get_validation_exclusions()
+        exclude.update(
+            name
+            for name, field in self.fields.items()
+            if isinstance(field, CachedModelChoiceField)
+        )
+        return exclude
@@ -0,0 +1,45 @@
+import hashlib
+from calendar import timegm
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+def collection_validators(queryset, *salt):
+    """Return ``(etag, last_modified)`` for the rows matched by ``queryset``.
+
+    Both come from a single ``COUNT``/``MAX(updated_at)`` aggregate: an edit
+    moves the timestamp and a delete changes the count.
+    """
+    state = collection_state(queryset)
+    return timestamp_validators(state["last_modified"], state["count"], *salt)
+
+
+def collection_state(queryset):
+    return queryset.order_by().aggregate(
+        count=Count("pk"), last_modified=Max("updated_at")
+    )
+
+
+def timestamp_validators(last_modified, *salt):
+    """Return ``(etag, last_modified)`` for data that changes with ``last_modified``."""
+    fingerprint = ":".join(
+        [last_modified.isoformat() if last_modified else ""]
+        + [str(part) for part in salt]
+    )
+    etag = quote_etag(hashlib.md5(fingerprint.encode()).hexdigest())
+    return etag, last_modified
+
+
+def conditional_response(request, etag, last_modified, build_response):
+    """Answer with 304 when the client's validators match, else build the body."""
+    timestamp = timegm(last_modified.utctimetuple()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = build_response()
+    response.headers["ETag"] = etag
+    if timestamp is not None:
+        response.headers["Last-Modified"] = http_date(timestamp)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
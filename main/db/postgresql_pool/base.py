@@ -0,0 +1,94 @@
+"""PostgreSQL backend that borrows connections from an in-process pool.
+
+Select it with ``ACCTSYS_DB_ENGINE=main.db.postgresql_pool``. Pool sizes come
+from the ``POOL`` entry of the database settings. Closing a Django connection
+hands the psycopg2 connection back to the pool instead of disconnecting, so
+pair it with ``CONN_MAX_AGE = 0`` and let the pool keep connections alive
+between requests.
+"""
+
+import os
+import threading
+import time
+
+import psycopg2.extras
+from django.db.backends.postgresql.base import DatabaseWrapper as BaseDatabaseWrapper
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+from psycopg2_pool import PoolError, ThreadSafeConnectionPool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class DatabaseWrapper(BaseDatabaseWrapper):
+    def _pool_key(self):
+        # Keyed on the pid too: a forked worker must not share sockets with
+        # its parent. The name changes when the test runner creates its own
+        # database.
+        return self.alias, self.settings_dict["NAME"], os.getpid()
+
+    def _pool(self, conn_params):
+        options = self.settings_dict["POOL"]
+        key = self._pool_key()
+        with _pools_lock:
+            if key not in _pools:
+                _pools[key] = ThreadSafeConnectionPool(
+                    minconn=options.get("MIN_SIZE", 0),
+                    maxconn=options.get("MAX_SIZE", float("inf")),
+                    idle_timeout=options.get("IDLE_TIMEOUT", 600),
+                    **conn_params,
+                )
+            return _pools[key]
+
+    def _checkout(self, pool):
+        deadline = time.monotonic() + self.settings_dict["POOL"].get("TIMEOUT", 30)
+        while True:
+            try:
+                connection = pool.getconn()
+            except PoolError:
+                if time.monotonic() >= deadline:
+                    raise self.Database.OperationalError(
+                        "Timed out waiting for a pooled database connection."
+                    )
+                time.sleep(0.01)
+                continue
+            if not self.settings_dict["CONN_HEALTH_CHECKS"]:
+                return connection
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+            except self.Database.Error:
+                # The server dropped the connection while it sat idle in the
+                # pool; discard it and take another.
+                connection.close()
+                pool.putconn(connection)
+                continue
+            if not connection.autocommit:
+                # Leave no transaction open, or Django can't set autocommit.
+                connection.rollback()
+            return connection
+
+    def get_new_connection(self, conn_params):
+        if not self.settings_dict.get("POOL"):
+            return super().get_new_connection(conn_params)
+
+        isolation_level = self.settings_dict["OPTIONS"].get("isolation_level")
+        self.isolation_level = IsolationLevel(
+            IsolationLevel.READ_COMMITTED
+            if isolation_level is None
+            else isolation_level
+        )
+        connection = self._checkout(self._pool(conn_params))
+        if isolation_level is not None:
+            connection.isolation_level = self.isolation_level
+        psycopg2.extras.register_default_jsonb(
+            conn_or_curs=connection, loads=lambda x: x
+        )
+        return connection
+
+    def _close(self):
+        pool = self.settings_dict.get("POOL") and _pools.get(self._pool_key())
+        if self.connection is None or not pool:
+            return super()._close()
+        with self.wrap_database_errors:
+            pool.putconn(self.connection)
@@ -0,0 +1,103 @@
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+
+from .models import Application, Income, Outcome, PartnerBalance
+from .streaming import STREAM_CHUNK_SIZE
+
+# Payload keys of ledger rows mapped to the values() keys they come from
+APPLICATION_KEYS = {
+    "created_date": "created_date",
+    "id": "id",
+    "customer": "customer_name",
+    "executor": "executor_name",
+    "amount": "uncargo_sum",
+    "created_at": "created_at",
+}
+INCOME_KEYS = {
+    "created_at": "created_at",
+    "id": "id",
+    "executor": "executor_id",
+    "name": "executor__name",
+    "amount": "amount",
+}
+OUTCOME_KEYS = {
+    "created_at": "created_at",
+    "id": "id",
+    "customer": "customer_id",
+    "name": "customer__name",
+    "amount": "amount",
+}
+
+
+def partner_querysets(partner_id, role):
+    """Return the applications, incomes and outcomes behind a partner's ledger."""
+    if role == "executor":
+        applications = Application.objects.filter(executor_id=partner_id)
+        incomes = Income.objects.filter(executor_id=partner_id)
+        outcomes = Outcome.objects.filter(
+            customer_id__in=applications.values("customer_id")
+        )
+    else:
+        applications = Application.objects.filter(customer_id=partner_id)
+        incomes = Income.objects.filter(
+            executor_id__in=applications.values("executor_id")
+        )
+        outcomes = Outcome.objects.filter(customer_id=partner_id)
+    return applications, incomes, outcomes
+
+
+# values() rather than values_list(): in Django 4.2 the values_list() iterator
+# runs its query as soon as it is created, so aiterator() would run it in the
+# async context and fail.
+def application_rows(applications):
+    return applications.values(
+        "created_date",
+        "id",
+        "uncargo_sum",
+        "created_at",
+        customer_name=Coalesce("customer__name", Value("Нет заказчика")),
+        executor_name=Coalesce("executor__name", Value("Нет исполнителя")),
+    )
+
+
+def income_rows(incomes):
+    return incomes.values(*INCOME_KEYS.values())
+
+
+def outcome_rows(outcomes):
+    return outcomes.values(*OUTCOME_KEYS.values())
+
+
+async def as_dicts(rows, keys):
+    async for row in rows:
+        yield {key: row[source] for key, source in keys.items()}
+
+
+async def partner_totals(partner_id, role):
+    balance = await PartnerBalance.objects.filter(partner_id=partner_id).afirst()
+    if balance is None:
+        balance = PartnerBalance()
+    return balance.totals(role)
+
+
+async def partner_ledger_members(partner_id, role, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield the ledger payload as ``(key, value)`` pairs, for ``ajson_object``.
+
+    Row lists are async iterators fetching ``chunk_size`` rows at a time; the
+    totals come from the partner's ``PartnerBalance`` row.
+    """
+    applications, incomes, outcomes = partner_querysets(partner_id, role)
+
+    yield "incomes", as_dicts(income_rows(incomes).aiterator(chunk_size), INCOME_KEYS)
+    yield (
+        "outcomes",
+        as_dicts(outcome_rows(outcomes).aiterator(chunk_size), OUTCOME_KEYS),
+    )
+    yield (
+        "applications",
+        as_dicts(
+            application_rows(applications).aiterator(chunk_size), APPLICATION_KEYS
+        ),
+    )
+    for member in (await partner_totals(partner_id, role)).items():
+        yield member
@@ -1,4 +1,16 @@
 from django import forms
+from django.core.validators import FileExtensionValidator
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .choices import (
+    CUSTOMERS,
+    EXECUTORS,
+    LEGAL_ENTITIES,
+    PARTNERS,
+    CachedChoicesMixin,
+    CachedModelChoiceField,
+)
 from .models import (
     Application,
     ApplicationChoices,
@@ -6,7 +18,10 @@ from .models import (
     LegalEntity,
     Outcome,
     Income,
+    RollupDimension,
 )
+from .search import MIN_QUERY_LENGTH
+from .money import MONEY_DECIMAL_PLACES, MONEY_MAX_DIGITS, derived_amounts
 
 import logging
 
@@ -16,32 +31,43 @@ inputClass = "block w-full rounded-md border-0 py-1.5 pl-7 pr-20 text-gray-900 r
 checkboxClass = "!max-w-[50px] !max-h-[50px] !w-auto block rounded-md border-0 py-1.5 pl-7 pr-20 text-gray-900 ring-1 ring-inset ring-gray-300 placeholder:text-gray-400 focus:ring-2 focus:ring-inset focus:ring-indigo-600 sm:text-sm sm:leading-6"
 
 
-class ApplicationForm(forms.ModelForm):
+class EditConflict(Exception):
+    """The row was changed by someone else since the form was loaded."""
+
+
+class ApplicationForm(CachedChoicesMixin, forms.ModelForm):
     status = forms.ChoiceField(
         choices=ApplicationChoices.choices(),
         label="Статус заявки: ",
         widget=forms.Select(attrs={"class": inputClass}),
     )
-    customer = forms.ModelChoiceField(
-        queryset=Partner.objects.filter(is_executor=False),
+    customer = CachedModelChoiceField(
+        CUSTOMERS,
         label="Клиент: ",
         widget=forms.Select(attrs={"class": inputClass, "id": "id_customer"}),
     )
-    executor = forms.ModelChoiceField(
-        queryset=Partner.objects.filter(is_executor=True),
+    executor = CachedModelChoiceField(
+        EXECUTORS,
         label="Исполнитель: ",
         widget=forms.Select(attrs={"class": inputClass, "id": "id_executor"}),
     )
-    initial_sum = forms.FloatField(
-        label="Сумма приемки: ", widget=forms.NumberInput(attrs={"class": inputClass})
+    initial_sum = forms.DecimalField(
+        max_digits=MONEY_MAX_DIGITS,
+        decimal_places=MONEY_DECIMAL_PLACES,
+        label="Сумма приемки: ",
+        widget=forms.NumberInput(attrs={"class": inputClass}),
     )
-    sender = forms.ModelChoiceField(
-        queryset=LegalEntity.objects.none(),
+    sender = CachedModelChoiceField(
+        LEGAL_ENTITIES,
+        # Nothing to choose until the partner is known
+        limit={"partner_id": None},
         label="Юридическое лицо клиента",
         widget=forms.Select(attrs={"class": inputClass, "id": "id_sender"}),
     )
-    receiver = forms.ModelChoiceField(
-        queryset=LegalEntity.objects.none(),
+    receiver = CachedModelChoiceField(
+        LEGAL_ENTITIES,
+        # Nothing to choose until the partner is known
+        limit={"partner_id": None},
         label="Юридическое лицо исполнителя: ",
         widget=forms.Select(attrs={"class": inputClass, "id": "id_receiver"}),
     )
@@ -49,8 +75,8 @@ class ApplicationForm(forms.ModelForm):
         label="Комиссия исполнителя: ",
         widget=forms.NumberInput(attrs={"class": inputClass}),
     )
-    giving_side = forms.ModelChoiceField(
-        queryset=Partner.objects.filter(is_executor=True),
+    giving_side = CachedModelChoiceField(
+        EXECUTORS,
         label="Выдающая сторона: ",
         widget=forms.Select(attrs={"class": inputClass}),
     )
@@ -69,26 +95,36 @@ class ApplicationForm(forms.ModelForm):
         widget=forms.CheckboxInput(attrs={"class": "form-checkbox"}),
     )
 
-    sum_with_executors_commission = forms.FloatField(
+    sum_with_executors_commission = forms.DecimalField(
+        max_digits=MONEY_MAX_DIGITS,
+        decimal_places=MONEY_DECIMAL_PLACES,
         label="Сумма с учетом комиссии исполнителя: ",
         required=False,
         widget=forms.TextInput(attrs={"class": inputClass, "readonly": "readonly"}),
     )
-    uncargo_sum = forms.FloatField(
+    uncargo_sum = forms.DecimalField(
+        max_digits=MONEY_MAX_DIGITS,
+        decimal_places=MONEY_DECIMAL_PLACES,
         label="Сумма отгрузки: ",
         required=False,
         widget=forms.TextInput(attrs={"class": inputClass, "readonly": "readonly"}),
     )
-    referral_percentage = forms.FloatField(
+    referral_percentage = forms.DecimalField(
+        max_digits=MONEY_MAX_DIGITS,
+        decimal_places=MONEY_DECIMAL_PLACES,
         label="Реф %: ",
         required=False,
         widget=forms.TextInput(attrs={"class": inputClass, "readonly": "readonly"}),
     )
-    clean_income = forms.FloatField(
+    clean_income = forms.DecimalField(
+        max_digits=MONEY_MAX_DIGITS,
+        decimal_places=MONEY_DECIMAL_PLACES,
         label="Чистый доход: ",
         required=False,
         widget=forms.TextInput(attrs={"class": inputClass, "readonly": "readonly"}),
     )
+    # updated_at of the row the form was loaded from
+    version = forms.CharField(required=False, widget=forms.HiddenInput)
 
     class Meta:
         model = Application
@@ -114,54 +150,66 @@ class ApplicationForm(forms.ModelForm):
         super(ApplicationForm, self).__init__(*args, **kwargs)
 
         if "executor" in self.data:
-            try:
-                executor_id = int(self.data.get("executor"))
-                self.fields["receiver"].queryset = LegalEntity.objects.filter(
-                    partner_id=executor_id
-                )
-            except (ValueError, TypeError):
-                pass
+            self.fields["receiver"].limit_choices(partner_id=self.data.get("executor"))
         elif self.instance.pk:
-            self.fields["receiver"].queryset = LegalEntity.objects.filter(
-                partner_id=self.instance.executor.id
-            )
+            self.fields["receiver"].limit_choices(partner_id=self.instance.executor_id)
 
         if "customer" in self.data:
-            try:
-                customer_id = int(self.data.get("customer"))
-                self.fields["sender"].queryset = LegalEntity.objects.filter(
-                    partner_id=customer_id
-                )
-            except (ValueError, TypeError):
-                pass
+            self.fields["sender"].limit_choices(partner_id=self.data.get("customer"))
         elif self.instance.pk:
-            self.fields["sender"].queryset = LegalEntity.objects.filter(
-                partner_id=self.instance.customer_id
-            )
+            self.fields["sender"].limit_choices(partner_id=self.instance.customer_id)
+
+        self._stored = {}
+        if self.instance.pk:
+            self.fields["version"].initial = self.instance.updated_at.isoformat()
+            self._stored = {
+                field.attname: getattr(self.instance, field.attname)
+                for field in map(self.instance._meta.get_field, self._meta.fields)
+            }
 
         self.update_calculated_fields()
 
     def update_calculated_fields(self):
-        if self.instance.pk:
-            self.instance = self.instance
-            self.fields["sum_with_executors_commission"].initial = (
-                self.instance.initial_sum
-                * (self.instance.executor_commission - 100)
-                / -100
-            )
-            self.fields["uncargo_sum"].initial = (
-                self.instance.initial_sum
-                * (self.instance.commission_with_interest - 100)
-                / -100
-            )
-            self.fields["referral_percentage"].initial = self.instance.initial_sum * (
-                self.instance.executor.referral_percentage / 100
-            )
-            self.fields["clean_income"].initial = (
-                self.fields["sum_with_executors_commission"].initial
-                - self.fields["uncargo_sum"].initial
-                - self.fields["referral_percentage"].initial
+        if not self.instance.pk:
+            return
+        executor = PARTNERS.get(self.instance.executor_id)
+        if executor is not None:
+            amounts = derived_amounts(
+                self.instance.initial_sum,
+                self.instance.executor_commission,
+                self.instance.commission_with_interest,
+                executor.referral_percentage,
             )
+            for field, amount in amounts.items():
+                self.fields[field].initial = amount
+
+    def changed_fields(self):
+        """Names of the model fields whose cleaned value differs from the stored one."""
+        return [
+            attname
+            for attname, value in self._stored.items()
+            if getattr(self.instance, attname) != value
+        ]
+
+    def save_changes(self):
+        """Write the changed fields of an existing application.
+
+        ``updated_at`` is compared and swapped first, so an edit made from a
+        stale form raises ``EditConflict`` instead of overwriting someone
+        else's changes. Every writer bumps ``updated_at``, including the bulk
+        recalculation, so no row lock or version column is needed.
+        """
+        fields = self.changed_fields()
+        if not fields:
+            return self.instance
+        version = parse_datetime(self.cleaned_data.get("version") or "")
+        with transaction.atomic():
+            if not Application.objects.filter(
+                pk=self.instance.pk, updated_at=version
+            ).update(updated_at=timezone.now()):
+                raise EditConflict
+            self.instance.save(update_fields=[*fields, "updated_at"])
+        return self.instance
 
     def clean_is_documents(self):
         is_documents = self.cleaned_data.get("is_documents")
@@ -173,40 +221,30 @@ class ApplicationForm(forms.ModelForm):
         executor_commission = cleaned_data.get("executor_commission")
         commission_with_interest = cleaned_data.get("commission_with_interest")
         giving_side = cleaned_data.get("giving_side")
+        executor = cleaned_data.get("executor")
 
         if (
             initial_sum
             and executor_commission
             and commission_with_interest
             and giving_side
+            and executor
         ):
-            sum_with_executors_commission = (
-                initial_sum * (executor_commission - 100) / -100
-            )
-            uncargo_sum = initial_sum * (commission_with_interest - 100) / -100
-            referral_percentage = initial_sum * (executor_commission / 100)
-            clean_income = (
-                sum_with_executors_commission - uncargo_sum - referral_percentage
-            )
-
-            cleaned_data["sum_with_executors_commission"] = (
-                sum_with_executors_commission
+            cleaned_data.update(
+                derived_amounts(
+                    initial_sum,
+                    executor_commission,
+                    commission_with_interest,
+                    executor.referral_percentage,
+                )
             )
-            cleaned_data["uncargo_sum"] = uncargo_sum
-            cleaned_data["referral_percentage"] = referral_percentage
-            cleaned_data["clean_income"] = clean_income
 
         return cleaned_data
 
 
-class PartnerModelChoiceField(forms.ModelChoiceField):
-    def label_from_instance(self, obj):
-        return obj.name
-
-
-class LegalEntitiesForm(forms.ModelForm):
-    partner = PartnerModelChoiceField(
-        queryset=Partner.objects.all(),
+class LegalEntitiesForm(CachedChoicesMixin, forms.ModelForm):
+    partner = CachedModelChoiceField(
+        PARTNERS,
         label="Partner",
         widget=forms.Select(attrs={"class": inputClass}),
     )
@@ -253,9 +291,9 @@ class PartnerForm(forms.ModelForm):
         super(PartnerForm, self).__init__(*args, **kwargs)
 
 
-class IncomeForm(forms.ModelForm):
-    executor = PartnerModelChoiceField(
-        queryset=Partner.objects.filter(is_executor=True),
+class IncomeForm(CachedChoicesMixin, forms.ModelForm):
+    executor = CachedModelChoiceField(
+        EXECUTORS,
         label="Исполнитель",
         widget=forms.Select(
             attrs={"class": inputClass, "placeholder": "Введите исполнителя"}
@@ -278,9 +316,9 @@ class IncomeForm(forms.ModelForm):
         super(IncomeForm, self).__init__(*args, **kwargs)
 
 
-class OutcomeForm(forms.ModelForm):
-    customer = PartnerModelChoiceField(
-        queryset=Partner.objects.filter(is_executor=False),
+class OutcomeForm(CachedChoicesMixin, forms.ModelForm):
+    customer = CachedModelChoiceField(
+        CUSTOMERS,
         label="Заказчик",
         widget=forms.Select(
             attrs={"class": inputClass, "placeholder": "Введите исполнителя"}
@@ -304,14 +342,14 @@ class OutcomeForm(forms.ModelForm):
 
 
 class ApplicationFilterForm(forms.Form):
-    customer = forms.ModelChoiceField(
-        queryset=Partner.objects.filter(is_executor=False),
+    customer = CachedModelChoiceField(
+        CUSTOMERS,
         required=False,
         label="Заказчик",
         widget=forms.Select(attrs={"class": inputClass}),
     )
-    executor = forms.ModelChoiceField(
-        queryset=Partner.objects.all().filter(is_executor=True),
+    executor = CachedModelChoiceField(
+        EXECUTORS,
         required=False,
         label="Исполнитель",
         widget=forms.Select(attrs={"class": inputClass}),
@@ -328,17 +366,96 @@ class ApplicationFilterForm(forms.Form):
         label="Дата окончания",
     )
 
-    legal_entity = forms.ModelChoiceField(
-        queryset=LegalEntity.objects.all(),
+    legal_entity = CachedModelChoiceField(
+        LEGAL_ENTITIES,
         required=False,
         label="Юр лицо",
         widget=forms.Select(attrs={"class": inputClass}),
     )
 
+    q = forms.CharField(
+        required=False,
+        min_length=MIN_QUERY_LENGTH,
+        label="Поиск",
+        widget=forms.TextInput(
+            attrs={
+                "class": inputClass,
+                "placeholder": "Комментарий, партнер, юр лицо или ИНН",
+            }
+        ),
+    )
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(
+        required=False,
+        min_length=MIN_QUERY_LENGTH,
+        label="Поиск",
+        widget=forms.TextInput(
+            attrs={"class": inputClass, "placeholder": "Имя, ИНН или партнер"}
+        ),
+    )
+
+
+class ImportForm(forms.Form):
+    kind = forms.ChoiceField(
+        choices=[
+            ("applications", "Заявки"),
+            ("incomes", "Входящие платежи"),
+            ("outcomes", "Исходящие платежи"),
+        ],
+        label="Что загружаем",
+        widget=forms.Select(attrs={"class": inputClass}),
+    )
+    file = forms.FileField(
+        label="Файл CSV или XLSX",
+        validators=[FileExtensionValidator(["csv", "xlsx"])],
+        widget=forms.ClearableFileInput(
+            attrs={"class": inputClass, "accept": ".csv,.xlsx"}
+        ),
+    )
+    strict = forms.BooleanField(
+        required=False,
+        label="Отменить загрузку при ошибках",
+    )
+
+
+class ReportFilterForm(forms.Form):
+    period = forms.ChoiceField(
+        choices=[("month", "По месяцам"), ("day", "По дням")],
+        required=False,
+        label="Период",
+        widget=forms.Select(attrs={"class": inputClass}),
+    )
+    dimension = forms.ChoiceField(
+        choices=RollupDimension.choices,
+        required=False,
+        label="Группировка",
+        widget=forms.Select(attrs={"class": inputClass}),
+    )
+    start_date = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={"type": "date", "class": inputClass}),
+        label="Дата начала",
+    )
+    end_date = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={"type": "date", "class": inputClass}),
+        label="Дата окончания",
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        cleaned_data["period"] = cleaned_data.get("period") or "month"
+        cleaned_data["dimension"] = (
+            cleaned_data.get("dimension") or RollupDimension.EXECUTOR
+        )
+        return cleaned_data
+
 
 class IncomeFilterForm(forms.Form):
-    executor = forms.ModelChoiceField(
-        queryset=Partner.objects.filter(is_executor=True),
+    executor = CachedModelChoiceField(
+        EXECUTORS,
         required=False,
         label="Исполнитель",
     )
@@ -357,8 +474,8 @@ class IncomeFilterForm(forms.Form):
 
 
 class OutcomeFilterForm(forms.Form):
-    customer = forms.ModelChoiceField(
-        queryset=Partner.objects.filter(is_executor=False),
+    customer = CachedModelChoiceField(
+        CUSTOMERS,
         required=False,
         label="Исполнитель",
         widget=forms.Select(attrs={"class": inputClass}),
@@ -375,3 +492,15 @@ class OutcomeFilterForm(forms.Form):
         widget=forms.DateInput(attrs={"type": "date", "class": inputClass}),
         label="Сумма",
     )
+
+    sort_by_amount = forms.ChoiceField(
+        choices=[("asc", "По возрастанию"), ("desc", "По убыванию")],
+        required=False,
+        label="Сортировать по сумме",
+    )
+
+    sort_by_created_at = forms.ChoiceField(
+        choices=[("asc", "По возрастанию даты"), ("desc", "По убыванию даты")],
+        required=False,
+        label="Сортировать по дате создания",
+    )
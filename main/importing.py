@@ -0,0 +1,315 @@
+"""Bulk import of applications, incomes and outcomes from CSV or XLSX files.
+
+Rows are read lazily and turned into model instances against in-memory
+name lookups of partners and legal entities, loaded once per import. Valid
+rows are written with chunked ``bulk_create`` inside one transaction; invalid
+ones are collected with their row number. ``bulk_create`` sends no signals,
+so balances of the partners involved are rebuilt and list caches bumped at
+the end.
+"""
+
+import csv
+import io
+import time
+import uuid
+from decimal import InvalidOperation
+from itertools import chain
+from pathlib import Path
+
+from django.db import transaction
+
+from . import balances
+from .caching import bump_generation
+from .models import (
+    Application,
+    ApplicationChoices,
+    Income,
+    LegalEntity,
+    Outcome,
+    Partner,
+)
+from .money import MONEY_DECIMAL_PLACES, MONEY_MAX_DIGITS, derived_amounts, to_money
+
+IMPORT_CHUNK_SIZE = 1000
+COLUMNS = {
+    "applications": (
+        "status",
+        "customer",
+        "executor",
+        "giving_side",
+        "sender",
+        "receiver",
+        "initial_sum",
+        "executor_commission",
+        "commission_with_interest",
+        "comment",
+        "is_documents",
+    ),
+    "incomes": ("executor", "amount"),
+    "outcomes": ("customer", "amount"),
+}
+OPTIONAL_COLUMNS = {"comment", "is_documents"}
+STATUSES = {choice.value for choice in ApplicationChoices}
+TRUE_VALUES = {"1", "true", "yes", "y", "да", "+"}
+
+
+class ImportFileError(Exception):
+    """The file as a whole can't be imported."""
+
+
+class RowError(Exception):
+    pass
+
+
+def _normalize_header(header):
+    return [str(column or "").strip().lower() for column in header]
+
+
+def read_csv(file):
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    reader = csv.reader(text)
+    header = _normalize_header(next(reader, []))
+    for values in reader:
+        yield dict(zip(header, values))
+
+
+def read_xlsx(file):
+    try:
+        import openpyxl
+    except ImportError as e:
+        raise ImportFileError("Reading XLSX files requires openpyxl.") from e
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = _normalize_header(next(rows, []))
+        for values in rows:
+            yield dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def read_rows(file, name):
+    """Yield the rows of binary ``file`` as dicts keyed by lowercased header."""
+    suffix = Path(name).suffix.lower()
+    if suffix == ".csv":
+        return read_csv(file)
+    if suffix == ".xlsx":
+        return read_xlsx(file)
+    raise ImportFileError(f"Unsupported file type: {suffix or name}")
+
+
+class Lookups:
+    """Partner and legal entity ids by name, loaded once."""
+
+    def __init__(self):
+        self.partners = {}
+        self.referral_rates = {}
+        for pk, name, is_executor, referral_rate in Partner.objects.values_list(
+            "id", "name", "is_executor", "referral_percentage"
+        ).iterator():
+            self.partners[name] = (pk, is_executor)
+            self.referral_rates[pk] = referral_rate
+        self.legal_entities = {
+            name: (pk, partner_id)
+            for pk, name, partner_id in LegalEntity.objects.values_list(
+                "id", "name", "partner_id"
+            ).iterator()
+        }
+
+    def partner(self, row, column, is_executor):
+        name = _text(row, column)
+        try:
+            pk, partner_is_executor = self.partners[name]
+        except KeyError:
+            raise RowError(f"{column}: unknown partner {name!r}")
+        if partner_is_executor != is_executor:
+            role = "an executor" if is_executor else "a customer"
+            raise RowError(f"{column}: {name!r} is not {role}")
+        return pk
+
+    def legal_entity(self, row, column, partner_id):
+        name = _text(row, column)
+        try:
+            pk, owner_id = self.legal_entities[name]
+        except KeyError:
+            raise RowError(f"{column}: unknown legal entity {name!r}")
+        if owner_id != partner_id:
+            raise RowError(f"{column}: {name!r} belongs to another partner")
+        return pk
+
+
+def _text(row, column):
+    value = row.get(column)
+    value = "" if value is None else str(value).strip()
+    if not value:
+        raise RowError(f"{column}: required")
+    return value
+
+
+def _money(row, column):
+    value = _text(row, column).replace(" ", "").replace(",", ".")
+    try:
+        amount = to_money(value)
+    except InvalidOperation:
+        raise RowError(f"{column}: not a number: {value!r}")
+    if abs(amount) >= 10 ** (MONEY_MAX_DIGITS - MONEY_DECIMAL_PLACES):
+        raise RowError(f"{column}: out of range: {value!r}")
+    return amount
+
+
+def _percentage(row, column):
+    value = _text(row, column).replace(",", ".")
+    try:
+        return float(value)
+    except ValueError:
+        raise RowError(f"{column}: not a number: {value!r}")
+
+
+def _comment(row):
+    comment = str(row.get("comment") or "").strip()
+    max_length = Application._meta.get_field("comment").max_length
+    if len(comment) > max_length:
+        raise RowError(f"comment: longer than {max_length} characters")
+    return comment
+
+
+def build_application(row, lookups):
+    status = _text(row, "status")
+    if status not in STATUSES:
+        raise RowError(f"status: unknown status {status!r}")
+    customer_id = lookups.partner(row, "customer", is_executor=False)
+    executor_id = lookups.partner(row, "executor", is_executor=True)
+    initial_sum = _money(row, "initial_sum")
+    executor_commission = _percentage(row, "executor_commission")
+    commission_with_interest = _percentage(row, "commission_with_interest")
+    return Application(
+        id=uuid.uuid4(),
+        status=status,
+        customer_id=customer_id,
+        executor_id=executor_id,
+        giving_side_id=lookups.partner(row, "giving_side", is_executor=True),
+        sender_id=lookups.legal_entity(row, "sender", customer_id),
+        receiver_id=lookups.legal_entity(row, "receiver", executor_id),
+        initial_sum=initial_sum,
+        executor_commission=executor_commission,
+        commission_with_interest=commission_with_interest,
+        comment=_comment(row),
+        is_documents=str(row.get("is_documents") or "").strip().lower() in TRUE_VALUES,
+        # The same amounts ApplicationForm.clean() derives
+        **derived_amounts(
+            initial_sum,
+            executor_commission,
+            commission_with_interest,
+            lookups.referral_rates[executor_id],
+        ),
+    )
+
+
+def build_income(row, lookups):
+    return Income(
+        id=uuid.uuid4(),
+        executor_id=lookups.partner(row, "executor", is_executor=True),
+        amount=_money(row, "amount"),
+    )
+
+
+def build_outcome(row, lookups):
+    return Outcome(
+        id=uuid.uuid4(),
+        customer_id=lookups.partner(row, "customer", is_executor=False),
+        amount=_money(row, "amount"),
+    )
+
+
+BUILDERS = {
+    "applications": (Application, build_application),
+    "incomes": (Income, build_income),
+    "outcomes": (Outcome, build_outcome),
+}
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.errors = []
+        self.elapsed = 0.0
+
+    @property
+    def rate(self):
+        return self.rows / self.elapsed if self.elapsed else 0
+
+
+def _partner_ids(objs):
+    return {
+        pk
+        for obj in objs
+        for pk in (getattr(obj, "executor_id", None), getattr(obj, "customer_id", None))
+        if pk is not None
+    }
+
+
+def import_rows(
+    kind,
+    rows,
+    chunk_size=IMPORT_CHUNK_SIZE,
+    strict=False,
+    dry_run=False,
+    progress=None,
+):
+    """Import ``rows`` of ``kind`` and return an ``ImportReport``.
+
+    With ``strict`` nothing is written if any row fails; with ``dry_run``
+    rows are only validated. ``progress`` is called with the number of rows
+    read after every chunk.
+    """
+    model, build = BUILDERS[kind]
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is not None:
+        missing = [
+            column
+            for column in COLUMNS[kind]
+            if column not in first and column not in OPTIONAL_COLUMNS
+        ]
+        if missing:
+            raise ImportFileError(f"Missing columns: {', '.join(missing)}")
+        rows = chain([first], rows)
+
+    report = ImportReport()
+    started = time.monotonic()
+    lookups = Lookups()
+    partner_ids = set()
+    batch = []
+
+    def flush():
+        if not dry_run:
+            model.objects.bulk_create(batch)
+        report.created += len(batch)
+        partner_ids.update(_partner_ids(batch))
+        batch.clear()
+        if progress:
+            progress(report.rows)
+
+    with transaction.atomic():
+        # Row 1 is the header.
+        for number, row in enumerate(rows, start=2):
+            report.rows += 1
+            try:
+                batch.append(build(row, lookups))
+            except RowError as e:
+                report.errors.append((number, str(e)))
+                continue
+            if len(batch) >= chunk_size:
+                flush()
+        flush()
+
+        if dry_run or (strict and report.errors):
+            transaction.set_rollback(True)
+            report.created = 0
+        elif report.created:
+            balances.rebuild(balances.with_counterparties(partner_ids))
+            bump_generation(model)
+
+    report.elapsed = time.monotonic() - started
+    return report
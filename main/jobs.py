@@ -0,0 +1,373 @@
+"""Database-backed background jobs.
+
+A job is a ``Job`` row naming a function registered with ``@job`` and its
+JSON params. Views ``enqueue`` one, which costs a single INSERT, and
+``manage.py run_jobs`` claims due rows and runs them in a process pool. A
+claim is a conditional UPDATE from queued to running, so two workers can't
+take the same job on any database.
+
+A failed attempt is retried with exponential backoff until the kind's
+``max_attempts`` is used up; ``JobError`` fails the job right away. Workers
+touch ``heartbeat_at`` of the jobs they run, so the job of a worker that
+died is requeued once its heartbeat goes stale.
+
+Claims of a kind with a concurrency limit hold the kind's ``JobKindLock``
+row while counting its running jobs, so workers claiming at the same time
+can't overshoot the limit.
+"""
+
+import logging
+import shutil
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models import Count, F
+from django.http import QueryDict
+from django.utils import timezone
+
+from . import reporting
+from .importing import ImportFileError, import_rows, read_rows
+from .models import Job, JobKindLock, JobStatus
+from .querysets import APPLICATION_EXPORT_COLUMNS, application_export_rows
+from .recalculation import recalculate_applications
+from .streaming import STREAM_CHUNK_SIZE, csv_rows
+
+logger = logging.getLogger(__name__)
+
+JOBS = {}
+RETRY_DELAY = timedelta(seconds=30)
+STALE_AFTER = timedelta(minutes=5)
+JOB_RETENTION = timedelta(days=7)
+CLAIM_BATCH = 50
+# Seconds between progress writes of one job
+PROGRESS_INTERVAL = 1.0
+RECALCULATION_CHUNK_SIZE = 5000
+IMPORT_ERRORS_SHOWN = 100
+
+
+class JobError(Exception):
+    """A failure retrying won't fix."""
+
+
+class JobKind:
+    def __init__(self, name, label, func, concurrency, max_attempts):
+        self.name = name
+        self.label = label
+        self.func = func
+        # Jobs of this kind running at once across workers, None for no limit
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+
+
+def job(name, label, concurrency=None, max_attempts=3):
+    """Register the decorated function as the job kind ``name``.
+
+    It is called with a ``JobContext`` and the job's params and returns a
+    JSON-serializable result.
+    """
+
+    def register(func):
+        JOBS[name] = JobKind(name, label, func, concurrency, max_attempts)
+        return func
+
+    return register
+
+
+def job_dir(job_id):
+    return Path(settings.JOB_FILES_DIR) / str(job_id)
+
+
+def enqueue(kind, params=None, key="", files=None):
+    """Queue a job of ``kind`` and return it.
+
+    ``files`` maps names to uploaded files, saved where the job finds them
+    with ``JobContext.path``. With ``key``, a job of the same kind and key
+    still waiting in the queue is returned instead of a new one.
+    """
+    if key:
+        queued = Job.objects.filter(kind=kind, key=key, status=JobStatus.QUEUED).first()
+        if queued is not None:
+            return queued
+
+    job = Job(
+        id=uuid.uuid4(),
+        kind=kind,
+        key=key,
+        params=params or {},
+        run_after=timezone.now(),
+        max_attempts=JOBS[kind].max_attempts,
+    )
+    if files:
+        directory = job_dir(job.pk)
+        directory.mkdir(parents=True)
+        for name, file in files.items():
+            with open(directory / name, "wb") as f:
+                for chunk in file.chunks():
+                    f.write(chunk)
+    job.save(force_insert=True)
+    return job
+
+
+_progress_writer = None
+
+
+def _write_progress(job_id, done, total):
+    try:
+        Job.objects.filter(pk=job_id).update(progress=done, total=total)
+    except DatabaseError:
+        logger.warning("Could not record progress of job %s", job_id, exc_info=True)
+    finally:
+        close_old_connections()
+
+
+class JobContext:
+    """A running job's files and progress reporting."""
+
+    def __init__(self, job):
+        self.job = job
+        self.done = 0
+        self.total = None
+        self._written_at = 0.0
+        self._pending = None
+
+    def path(self, name):
+        directory = job_dir(self.job.pk)
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory / name
+
+    def progress(self, done, total=None):
+        """Record ``done`` out of ``total`` units of work, at most once a second."""
+        global _progress_writer
+
+        self.done, self.total = done, total
+        now = time.monotonic()
+        if now - self._written_at < PROGRESS_INTERVAL:
+            return
+        self._written_at = now
+        if _progress_writer is None:
+            _progress_writer = ThreadPoolExecutor(max_workers=1)
+        # Another thread has its own connection, so progress is visible
+        # while the job's transaction is still open.
+        self._pending = _progress_writer.submit(
+            _write_progress, self.job.pk, done, total
+        )
+
+    def flush(self):
+        if self._pending is not None:
+            self._pending.result()
+
+
+def _finish(job, **fields):
+    """Update ``job`` unless it was requeued and claimed again meanwhile."""
+    return Job.objects.filter(
+        pk=job.pk, status=JobStatus.RUNNING, started_at=job.started_at
+    ).update(**fields)
+
+
+def fail(job, error, retry=True):
+    """Requeue ``job`` with backoff if it has attempts left, else mark it failed."""
+    now = timezone.now()
+    if retry and job.attempts < job.max_attempts:
+        fields = {
+            "status": JobStatus.QUEUED,
+            "run_after": now + RETRY_DELAY * 2 ** (job.attempts - 1),
+            "worker": "",
+            "heartbeat_at": None,
+        }
+    else:
+        fields = {"status": JobStatus.FAILED, "finished_at": now}
+    return _finish(job, error=error, **fields)
+
+
+def claim(worker, limit, kinds=None):
+    """Mark up to ``limit`` due jobs as run by ``worker`` and return their ids.
+
+    Jobs are taken oldest first, skipping kinds at their concurrency limit.
+    """
+    if limit <= 0:
+        return []
+    running = Counter(
+        dict(
+            Job.objects.filter(status=JobStatus.RUNNING)
+            .values_list("kind")
+            .annotate(Count("pk"))
+            .order_by()
+        )
+    )
+    now = timezone.now()
+    candidates = (
+        Job.objects.filter(
+            status=JobStatus.QUEUED, run_after__lte=now, kind__in=kinds or list(JOBS)
+        )
+        .order_by("run_after", "created_at")
+        .values_list("pk", "kind")[:CLAIM_BATCH]
+    )
+    claimed = []
+    for pk, kind in candidates:
+        concurrency = JOBS[kind].concurrency
+        if concurrency is None:
+            taken = _take(pk, worker)
+        elif running[kind] >= concurrency:
+            continue
+        else:
+            taken = _take_limited(pk, kind, concurrency, worker)
+        if taken:
+            running[kind] += 1
+            claimed.append(pk)
+            if len(claimed) == limit:
+                break
+    return claimed
+
+
+def _take(pk, worker):
+    now = timezone.now()
+    return Job.objects.filter(pk=pk, status=JobStatus.QUEUED).update(
+        status=JobStatus.RUNNING,
+        worker=worker,
+        attempts=F("attempts") + 1,
+        started_at=now,
+        heartbeat_at=now,
+    )
+
+
+def _take_limited(pk, kind, concurrency, worker):
+    """``_take`` unless ``concurrency`` jobs of ``kind`` are running."""
+    with transaction.atomic():
+        # Writing the lock row first takes a row lock on PostgreSQL and the
+        # write lock on SQLite, so the count below can't go stale.
+        locked = JobKindLock.objects.filter(kind=kind)
+        if not locked.update(locked_at=timezone.now()):
+            JobKindLock.objects.get_or_create(kind=kind)
+            locked.update(locked_at=timezone.now())
+        if (
+            Job.objects.filter(kind=kind, status=JobStatus.RUNNING).count()
+            >= concurrency
+        ):
+            return False
+        return _take(pk, worker)
+
+
+def heartbeat(job_ids):
+    Job.objects.filter(pk__in=job_ids, status=JobStatus.RUNNING).update(
+        heartbeat_at=timezone.now()
+    )
+
+
+def release(job_ids):
+    """Put jobs of a worker shutting down back in the queue, not counting the attempt."""
+    Job.objects.filter(pk__in=job_ids, status=JobStatus.RUNNING).update(
+        status=JobStatus.QUEUED,
+        attempts=F("attempts") - 1,
+        worker="",
+        heartbeat_at=None,
+    )
+
+
+def requeue_stale():
+    """Retry or fail running jobs whose worker stopped sending heartbeats."""
+    stale = Job.objects.filter(
+        status=JobStatus.RUNNING, heartbeat_at__lt=timezone.now() - STALE_AFTER
+    )
+    for job in stale:
+        logger.warning("Job %s of %s went stale", job.pk, job.worker)
+        fail(job, "Worker stopped responding")
+
+
+def purge(older_than=JOB_RETENTION):
+    """Delete jobs finished more than ``older_than`` ago, with their files."""
+    finished = Job.objects.filter(
+        status__in=[JobStatus.SUCCEEDED, JobStatus.FAILED],
+        finished_at__lt=timezone.now() - older_than,
+    )
+    for pk in finished.values_list("pk", flat=True).iterator():
+        shutil.rmtree(job_dir(pk), ignore_errors=True)
+    return finished.delete()[0]
+
+
+def execute(job_id):
+    """Run a claimed job and return its new status; called in a worker process."""
+    close_old_connections()
+    job = Job.objects.get(pk=job_id)
+    context = JobContext(job)
+    try:
+        result = JOBS[job.kind].func(context, **job.params)
+    except Exception as e:
+        logger.exception("Job %s (%s) failed", job.pk, job.kind)
+        context.flush()
+        fail(job, f"{type(e).__name__}: {e}", retry=not isinstance(e, JobError))
+        return Job.objects.values_list("status", flat=True).get(pk=job.pk)
+    else:
+        context.flush()
+        _finish(
+            job,
+            status=JobStatus.SUCCEEDED,
+            result=result,
+            progress=context.done,
+            total=context.total,
+            error="",
+            finished_at=timezone.now(),
+        )
+        return JobStatus.SUCCEEDED
+    finally:
+        close_old_connections()
+
+
+UPLOAD = "upload"
+EXPORT = "applications.csv"
+
+
+@job("import_data", "Импорт", concurrency=1)
+def import_data(context, kind, name, strict=False):
+    path = context.path(UPLOAD)
+    try:
+        with open(path, "rb") as file:
+            report = import_rows(
+                kind, read_rows(file, name), strict=strict, progress=context.progress
+            )
+    except ImportFileError as e:
+        raise JobError(str(e)) from e
+    path.unlink()
+    return {
+        "rows": report.rows,
+        "created": report.created,
+        "invalid": len(report.errors),
+        "errors": report.errors[:IMPORT_ERRORS_SHOWN],
+        "elapsed": report.elapsed,
+    }
+
+
+@job("export_applications", "Экспорт заявок", concurrency=2)
+def export_applications(context, query=""):
+    rows = application_export_rows(QueryDict(query))
+    total = rows.count()
+    chunks = csv_rows(
+        [heading for _, heading in APPLICATION_EXPORT_COLUMNS],
+        rows.iterator(chunk_size=STREAM_CHUNK_SIZE),
+    )
+    with open(context.path(EXPORT), "w", encoding="utf-8", newline="") as f:
+        # The first chunk is the header, each one after it a batch of rows.
+        for number, chunk in enumerate(chunks):
+            f.write(chunk)
+            context.progress(min(number * STREAM_CHUNK_SIZE, total), total)
+    return {"rows": total, "file": EXPORT}
+
+
+@job("recalculate_applications", "Пересчет заявок", concurrency=1)
+def recalculate(context, executor=None):
+    updated = recalculate_applications(
+        chunk_size=RECALCULATION_CHUNK_SIZE,
+        progress=context.progress,
+        executor=executor,
+    )
+    return {"updated": updated}
+
+
+@job("refresh_reports", "Обновление отчетов", concurrency=1)
+def refresh_reports(context, full=False):
+    return {"days": reporting.refresh(full=full)}
@@ -0,0 +1,81 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connection, connections
+
+from main.models import Partner
+from main.querysets import partner_list_queryset
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate request cycles against the default database and report "
+        "p50/p99 latency with fresh, persistent and (for the pooled engine) "
+        "pooled connections."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--threads", type=int, default=4)
+        parser.add_argument(
+            "--max-age",
+            type=int,
+            default=None,
+            help="CONN_MAX_AGE for the persistent run (defaults to settings, "
+            "or 60 when that is 0).",
+        )
+
+    def handle(self, *args, **options):
+        settings_dict = connection.settings_dict
+        configured = {key: settings_dict.get(key) for key in ("CONN_MAX_AGE", "POOL")}
+        max_age = options["max_age"] or configured["CONN_MAX_AGE"] or 60
+
+        modes = [
+            ("fresh", {"CONN_MAX_AGE": 0, "POOL": None}),
+            ("persistent", {"CONN_MAX_AGE": max_age, "POOL": None}),
+        ]
+        if settings_dict["ENGINE"] == "main.db.postgresql_pool":
+            modes.append(("pooled", {"CONN_MAX_AGE": 0, "POOL": configured["POOL"]}))
+
+        try:
+            for name, overrides in modes:
+                connections.close_all()
+                settings_dict.update(overrides)
+                samples = self.run(options["requests"], options["threads"])
+                self.stdout.write(
+                    f"{name:<11} p50={percentile(samples, 0.5) * 1000:.2f}ms "
+                    f"p99={percentile(samples, 0.99) * 1000:.2f}ms "
+                    f"mean={statistics.mean(samples) * 1000:.2f}ms"
+                )
+        finally:
+            connections.close_all()
+            settings_dict.update(configured)
+
+    def run(self, total, threads):
+        per_thread = max(1, total // threads)
+        with ThreadPoolExecutor(threads) as executor:
+            results = executor.map(self.worker, [per_thread] * threads)
+        return [sample for samples in results for sample in samples]
+
+    def worker(self, count):
+        # Thread-local connection wrappers share the settings dict updated
+        # in handle(), so each run picks up its mode's overrides.
+        samples = []
+        try:
+            for _ in range(count):
+                started = time.perf_counter()
+                request_started.send(sender=self.__class__)
+                list(partner_list_queryset(Partner.objects.all())[:50])
+                request_finished.send(sender=self.__class__)
+                samples.append(time.perf_counter() - started)
+        finally:
+            connection.close()
+        return samples
@@ -0,0 +1,139 @@
+import json
+import platform
+from datetime import datetime, timezone
+
+import django
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from main.benchmarking import compare, dashboard_cases, measure, verified_client
+from main.testing import temporary_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database and measure latency, query count and "
+        "peak memory of the dashboard's hot endpoints. Results can be written "
+        "as JSON and compared against an earlier run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=1000,
+            help="Applications to seed; other models are scaled from it.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument(
+            "--warm-cache",
+            action="store_true",
+            help="Keep the cache between requests instead of starting empty.",
+        )
+        parser.add_argument("--case", action="append", help="Only run these cases.")
+        parser.add_argument("--output", help="Write results to this JSON file.")
+        parser.add_argument("--compare", help="JSON file of a baseline run.")
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.2,
+            help="Relative slowdown or memory growth reported as a regression.",
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                baseline = json.load(f)
+
+        # The seeded rows must not reach the running site through the cache
+        # it shares, so the whole run gets a cache of its own.
+        with temporary_cache():
+            setup_test_environment()
+            old_name = connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, serialize=False
+            )
+            try:
+                results = self.run(options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                teardown_test_environment()
+
+        report = {
+            "meta": {
+                "rows": options["rows"],
+                "seed": options["seed"],
+                "repeat": options["repeat"],
+                "warm_cache": options["warm_cache"],
+                "vendor": connection.vendor,
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "created_at": datetime.now(timezone.utc).isoformat(),
+            },
+            "results": results,
+        }
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+
+        if baseline is not None:
+            self.compare(baseline, report, options["threshold"])
+
+    def run(self, options):
+        rows = options["rows"]
+        call_command(
+            "seed_db",
+            seed=options["seed"],
+            partners=max(10, rows // 10),
+            legal_entities=max(10, rows // 10),
+            incomes=rows // 2,
+            outcomes=rows // 2,
+            applications=max(1, rows),
+            workers=1,
+            method="bulk",
+            verbosity=0,
+        )
+
+        try:
+            cases = dashboard_cases()
+        except ValueError as e:
+            raise CommandError(e) from e
+        if options["case"]:
+            unknown = set(options["case"]) - set(cases)
+            if unknown:
+                raise CommandError(f"Unknown cases: {', '.join(sorted(unknown))}")
+            cases = {name: cases[name] for name in options["case"]}
+
+        client = verified_client()
+        results = {}
+        width = max(len(name) for name in cases)
+        for name, url in cases.items():
+            results[name] = result = measure(
+                client, url, options["repeat"], options["warm_cache"]
+            )
+            self.stdout.write(
+                f"{name:<{width}}  p50={result['p50_ms']:>8.2f}ms  "
+                f"p95={result['p95_ms']:>8.2f}ms  queries={result['queries']:>3}  "
+                f"peak={result['peak_kb']:>8.1f}KB"
+            )
+        return results
+
+    def compare(self, baseline, report, threshold):
+        for key in ("rows", "seed", "repeat", "warm_cache", "vendor"):
+            if baseline["meta"].get(key) != report["meta"][key]:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"Baseline {key} differs: {baseline['meta'].get(key)} "
+                        f"vs {report['meta'][key]}"
+                    )
+                )
+
+        regressions = compare(baseline["results"], report["results"], threshold)
+        for case, message in regressions:
+            self.stdout.write(self.style.ERROR(f"{case}: {message}"))
+        if regressions:
+            raise CommandError(f"{len(regressions)} regression(s) against baseline")
+        self.stdout.write(self.style.SUCCESS("No regressions against baseline"))
@@ -0,0 +1,196 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from main.discrepancy import (
+    application_rows,
+    income_rows,
+    outcome_rows,
+    partner_querysets,
+)
+from main.models import Application, Income, LegalEntity, Outcome, Partner
+from main.pagination import KeysetPaginator
+from main.querysets import (
+    application_list_queryset,
+    application_paginator,
+    filter_applications,
+    income_list_queryset,
+    legal_entity_list_queryset,
+    outcome_list_queryset,
+    payment_paginator,
+)
+
+TABLE_SCAN_PATTERNS = {
+    "postgresql": re.compile(r"Seq Scan on (\w+)"),
+    "sqlite": re.compile(r"\bSCAN (\w+)\b(?! USING)"),
+}
+# Scans reading a whole index: fine under a LIMIT when the index supplies the
+# order, as it stops after one page, a full scan otherwise.
+INDEX_SCAN_PATTERNS = {
+    "postgresql": re.compile(
+        r"Index (?:Only )?Scan (?:Backward )?using \w+ on (\w+).*\n(?!\s+Index Cond)"
+    ),
+    "sqlite": re.compile(r"\bSCAN (\w+) USING (?:COVERING )?INDEX\b"),
+}
+TEMP_SORT_PATTERNS = {
+    "postgresql": re.compile(r"(?m)^\s*(?:->\s+)?(?:Incremental )?Sort\b"),
+    "sqlite": re.compile(r"USE TEMP B-TREE FOR (?:RIGHT PART OF )?ORDER BY"),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Run EXPLAIN on the queries the dashboard views execute, including "
+        "the keyset page windows after a cursor and the partner ledger, and "
+        "flag full table scans, full index scans and temporary sorts. Run it "
+        "against a seeded database: on near-empty tables the planner prefers "
+        "sequential scans regardless of indexes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verbose-plans",
+            action="store_true",
+            help="Print the full plan for every query.",
+        )
+        parser.add_argument(
+            "--ignore-table",
+            action="append",
+            default=[],
+            help="Do not flag full scans of this table.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor not in TABLE_SCAN_PATTERNS:
+            raise CommandError(f"Unsupported database vendor: {connection.vendor}")
+
+        flagged = []
+        for name, queryset, sorts in self.view_queries():
+            plan = queryset.explain()
+            problems = self.problems(plan, queryset, sorts, options["ignore_table"])
+            if problems:
+                flagged.append(name)
+                self.stdout.write(self.style.WARNING(f"{name}: {'; '.join(problems)}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{name}: ok"))
+            if options["verbose_plans"]:
+                self.stdout.write(plan)
+
+        if flagged:
+            raise CommandError(
+                f"{len(flagged)} queries use full scans or temporary sorts"
+            )
+
+    def problems(self, plan, queryset, sorts, ignored_tables):
+        def tables(patterns):
+            found = set(patterns[connection.vendor].findall(plan))
+            return sorted(found.difference(ignored_tables))
+
+        problems = []
+        scanned = tables(TABLE_SCAN_PATTERNS)
+        if scanned:
+            problems.append(f"full scan of {', '.join(scanned)}")
+        sorted_by_temp = TEMP_SORT_PATTERNS[connection.vendor].search(plan)
+        if sorted_by_temp and not sorts:
+            problems.append("temporary sort")
+        # An ordered index scan of a page window stops after the page.
+        if sorted_by_temp or queryset.query.high_mark is None:
+            index_scanned = tables(INDEX_SCAN_PATTERNS)
+            if index_scanned:
+                problems.append(f"full index scan of {', '.join(index_scanned)}")
+        return problems
+
+    def windows(self, name, paginator, sorts=False):
+        """The first page window and the window after its first row."""
+        yield f"{name}, first page", paginator.window(), sorts
+        page = paginator.page()
+        if page.object_list:
+            key = paginator.decode_cursor(paginator.encode_cursor(page.object_list[0]))
+            yield f"{name}, after cursor", paginator.window(key), sorts
+
+    def view_queries(self):
+        executor = Partner.objects.filter(is_executor=True).first()
+        customer = Partner.objects.filter(is_executor=False).first()
+        legal_entity = LegalEntity.objects.first()
+        latest = Application.objects.order_by("-created_date").first()
+        if not (executor and customer and legal_entity and latest):
+            raise CommandError("The database has no data to explain against")
+
+        applications = application_list_queryset(Application.objects.all())
+        application_filters = {
+            "default": {},
+            "customer": {"customer": customer},
+            "executor": {"executor": executor},
+            "legal_entity": {"legal_entity": legal_entity},
+            "date_range": {
+                "start_date": timezone.localdate(latest.created_date),
+                "end_date": timezone.localdate(latest.created_date),
+            },
+        }
+        for filter_name, filters in application_filters.items():
+            for sort_by_sum in (None, "asc", "desc"):
+                yield from self.windows(
+                    f"application_list[{filter_name}, sort_by_sum={sort_by_sum}]",
+                    application_paginator(
+                        filter_applications(applications, **filters), sort_by_sum
+                    ),
+                    # No single index orders the rows of a legal entity, which
+                    # is a receiver or a sender, or a date range by sum; they
+                    # are sorted after the filter narrowed them down.
+                    sorts=filter_name == "legal_entity"
+                    or (filter_name == "date_range" and sort_by_sum is not None),
+                )
+
+        payment_lists = {
+            "income_list": (
+                income_list_queryset(Income.objects.all()),
+                {"executor": executor},
+            ),
+            "outcome_list": (
+                outcome_list_queryset(Outcome.objects.all()),
+                {"customer": customer},
+            ),
+        }
+        sorts = {
+            "default": {},
+            "amount": {"sort_by_amount": "asc"},
+            "-amount": {"sort_by_amount": "desc"},
+            "created_at": {"sort_by_created_at": "asc"},
+        }
+        for list_name, (queryset, partner_filter) in payment_lists.items():
+            for filter_name, filters in (("all", {}), ("partner", partner_filter)):
+                for sort_name, sort in sorts.items():
+                    yield from self.windows(
+                        f"{list_name}[{filter_name}, {sort_name}]",
+                        payment_paginator(queryset.filter(**filters), **sort),
+                    )
+
+        yield from self.windows(
+            "legal_entities_list",
+            KeysetPaginator(
+                legal_entity_list_queryset(LegalEntity.objects.all()), "name"
+            ),
+        )
+        yield (
+            "legal_entities_data[partner]",
+            LegalEntity.objects.filter(partner=executor)
+            .order_by("name")
+            .values("id", "name"),
+            False,
+        )
+
+        for role, partner in (("executor", executor), ("customer", customer)):
+            ledger_applications, incomes, outcomes = partner_querysets(partner.pk, role)
+            yield (
+                f"partner_data_whole[{role}, applications]",
+                application_rows(ledger_applications),
+                False,
+            )
+            yield f"partner_data_whole[{role}, incomes]", income_rows(incomes), False
+            yield (
+                f"partner_data_whole[{role}, outcomes]",
+                outcome_rows(outcomes),
+                False,
+            )
@@ -0,0 +1,65 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.importing import (
+    BUILDERS,
+    IMPORT_CHUNK_SIZE,
+    ImportFileError,
+    import_rows,
+    read_rows,
+)
+
+ERRORS_SHOWN = 20
+
+
+class Command(BaseCommand):
+    help = (
+        "Import applications, incomes or outcomes from a CSV or XLSX file. "
+        "Partners and legal entities are referenced by name."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(BUILDERS))
+        parser.add_argument("path")
+        parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+        parser.add_argument(
+            "--strict",
+            action="store_true",
+            help="Write nothing if any row is invalid.",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Only validate the rows."
+        )
+        parser.add_argument("--errors", help="Write every row error to this CSV file.")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["path"], "rb") as file:
+                report = import_rows(
+                    options["kind"],
+                    read_rows(file, options["path"]),
+                    chunk_size=options["chunk_size"],
+                    strict=options["strict"],
+                    dry_run=options["dry_run"],
+                )
+        except (OSError, ImportFileError) as e:
+            raise CommandError(e) from e
+
+        for number, message in report.errors[:ERRORS_SHOWN]:
+            self.stderr.write(f"row {number}: {message}")
+        if len(report.errors) > ERRORS_SHOWN:
+            self.stderr.write(f"... {len(report.errors) - ERRORS_SHOWN} more")
+        if options["errors"]:
+            with open(options["errors"], "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["row", "error"])
+                writer.writerows(report.errors)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Read {report.rows} rows, created {report.created}, "
+                f"{len(report.errors)} invalid in {report.elapsed:.2f}s "
+                f"({report.rate:.0f} rows/s)"
+            )
+        )
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main import balances
+
+
+class Command(BaseCommand):
+    help = "Recompute PartnerBalance rows from incomes, outcomes and applications."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report partners whose stored balance has drifted.",
+        )
+        parser.add_argument(
+            "--partner",
+            action="append",
+            dest="partner_ids",
+            help="Limit to this partner id. May be repeated.",
+        )
+
+    def handle(self, *args, **options):
+        drifted = balances.rebuild(
+            partner_ids=options["partner_ids"], dry_run=options["check"]
+        )
+        for partner_id in drifted:
+            self.stdout.write(f"Drift: {partner_id}")
+
+        if options["check"]:
+            if drifted:
+                raise CommandError(f"{len(drifted)} partner balances have drifted")
+            self.stdout.write(self.style.SUCCESS("All partner balances are in sync"))
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f"Rebuilt {len(drifted)} partner balances")
+            )
@@ -0,0 +1,66 @@
+import time
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from main.models import ApplicationChoices, Partner
+from main.recalculation import recalculate_applications
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute sum_with_executors_commission, uncargo_sum, "
+        "referral_percentage and clean_income for matching applications."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--executor", help="Executor partner id.")
+        parser.add_argument("--customer", help="Customer partner id.")
+        parser.add_argument(
+            "--start-date",
+            type=date.fromisoformat,
+            help="Created on or after (YYYY-MM-DD).",
+        )
+        parser.add_argument(
+            "--end-date",
+            type=date.fromisoformat,
+            help="Created on or before (YYYY-MM-DD).",
+        )
+        parser.add_argument(
+            "--status",
+            choices=[choice.value for choice in ApplicationChoices],
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            help="Update in primary-key batches of this size instead of one UPDATE.",
+        )
+
+    def handle(self, *args, **options):
+        filters = {
+            "start_date": options["start_date"],
+            "end_date": options["end_date"],
+            "status": options["status"],
+        }
+        for role in ("executor", "customer"):
+            if options[role]:
+                filters[role] = self.get_partner(options[role])
+
+        started = time.monotonic()
+        updated = recalculate_applications(chunk_size=options["chunk_size"], **filters)
+        elapsed = time.monotonic() - started
+
+        rate = updated / elapsed if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Recalculated {updated} applications in {elapsed:.2f}s "
+                f"({rate:.0f} rows/s)"
+            )
+        )
+
+    def get_partner(self, partner_id):
+        try:
+            return Partner.objects.get(pk=partner_id)
+        except (Partner.DoesNotExist, ValidationError) as e:
+            raise CommandError(f"Unknown partner: {partner_id}") from e
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main import reporting
+
+
+class Command(BaseCommand):
+    help = (
+        "Fold applications changed since the last run into the daily and "
+        "monthly reporting rollups. Meant to run from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Rebuild every rollup from scratch instead.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        refreshed = reporting.refresh(full=options["full"])
+        elapsed = time.monotonic() - started
+        if refreshed is None:
+            message = f"Rebuilt all rollups in {elapsed:.2f}s"
+        else:
+            message = f"Refreshed {refreshed} day(s) in {elapsed:.2f}s"
+        self.stdout.write(self.style.SUCCESS(message))
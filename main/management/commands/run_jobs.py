@@ -0,0 +1,171 @@
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, close_old_connections, connections
+
+from main import jobs
+from main.caching import is_process_local
+from main.models import Job
+from main.workers import init_worker
+
+logger = logging.getLogger(__name__)
+
+PURGE_INTERVAL = 3600
+
+
+def _stop(signum, frame):
+    raise KeyboardInterrupt
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background jobs in a pool of worker processes. Several "
+        "workers may run against the same database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=2,
+            help="Jobs run at once by this worker.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds between checks of the queue.",
+        )
+        parser.add_argument(
+            "--kind",
+            action="append",
+            dest="kinds",
+            choices=sorted(jobs.JOBS),
+            help="Only run jobs of this kind. May be repeated.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once no job is due instead of waiting for more.",
+        )
+
+    def handle(self, *args, **options):
+        if is_process_local():
+            # Jobs invalidate cached pages by bumping generation tokens,
+            # which the web processes would never see.
+            raise CommandError(
+                "The default cache is local to each process. Configure a "
+                "cache shared with the web processes to run jobs."
+            )
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        processes = options["processes"]
+        signal.signal(signal.SIGTERM, _stop)
+        # Children are spawned rather than forked so none inherits this
+        # process's database connection.
+        connections.close_all()
+        pool = self.pool(processes)
+        running = {}
+        stopping = False
+        self.purged_at = 0.0
+        self.stdout.write(f"Worker {worker} running {processes} job(s) at a time")
+        while True:
+            try:
+                try:
+                    if stopping:
+                        close_old_connections()
+                        jobs.heartbeat(running.values())
+                    else:
+                        self.tick(worker, processes, pool, running, options["kinds"])
+                except DatabaseError:
+                    # Keep running jobs going through a database hiccup.
+                    logger.warning("Job queue unavailable", exc_info=True)
+                if (options["once"] or stopping) and not running:
+                    pool.shutdown()
+                    return
+
+                if not running:
+                    time.sleep(options["poll_interval"])
+                    continue
+                done, _ = wait(
+                    running,
+                    timeout=options["poll_interval"],
+                    return_when=FIRST_COMPLETED,
+                )
+                for future in done:
+                    job_id = running.pop(future, None)
+                    if job_id is None:
+                        # Already failed along with a broken pool
+                        continue
+                    try:
+                        status = future.result()
+                    except BrokenProcessPool:
+                        pool = self.recover(pool, processes, running)
+                        jobs.fail(Job.objects.get(pk=job_id), "Worker process died")
+                    except Exception as e:
+                        jobs.fail(
+                            Job.objects.get(pk=job_id), f"{type(e).__name__}: {e}"
+                        )
+                    else:
+                        self.stdout.write(f"Job {job_id}: {status}")
+            except KeyboardInterrupt:
+                if stopping:
+                    self.stdout.write(f"Terminating {len(running)} running job(s)")
+                    self.terminate(pool, running)
+                    return
+                stopping = True
+                self.stop(running)
+
+    def stop(self, running):
+        """Return jobs that never started to the queue; let the others finish.
+
+        A job released while a child process still runs it could be claimed
+        and run a second time by another worker.
+        """
+        cancelled = [future for future in running if future.cancel()]
+        jobs.release([running.pop(future) for future in cancelled])
+        self.stdout.write(
+            f"Stopping: returned {len(cancelled)} job(s) to the queue, waiting "
+            f"for {len(running)} running job(s). Interrupt again to terminate them."
+        )
+
+    def terminate(self, pool, running):
+        # ProcessPoolExecutor has no public way to stop busy children before
+        # Python 3.14. Their jobs are only failed, and so retried, once the
+        # children are gone.
+        for process in list((pool._processes or {}).values()):
+            process.kill()
+        pool.shutdown(wait=True, cancel_futures=True)
+        for job_id in running.values():
+            jobs.fail(Job.objects.get(pk=job_id), "Worker was terminated")
+
+    def tick(self, worker, processes, pool, running, kinds):
+        close_old_connections()
+        if time.monotonic() - self.purged_at > PURGE_INTERVAL:
+            jobs.purge()
+            self.purged_at = time.monotonic()
+        jobs.requeue_stale()
+        jobs.heartbeat(running.values())
+        for job_id in jobs.claim(worker, processes - len(running), kinds):
+            running[pool.submit(jobs.execute, job_id)] = job_id
+
+    def pool(self, processes):
+        return ProcessPoolExecutor(
+            processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+        )
+
+    def recover(self, pool, processes, running):
+        # Every job of a broken pool is lost; fail them all and start over.
+        pool.shutdown(wait=False, cancel_futures=True)
+        for job_id in running.values():
+            jobs.fail(Job.objects.get(pk=job_id), "Worker process died")
+        running.clear()
+        return self.pool(processes)
@@ -0,0 +1,122 @@
+import multiprocessing
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from main import balances
+from main.caching import bump_generation
+from main.models import Application, Income, LegalEntity, Outcome, Partner
+from main.seeding import BUILDERS, seed_chunk
+
+
+def _seed_task(task):
+    return seed_chunk(*task)
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with reproducible synthetic partners, legal "
+        "entities, incomes, outcomes and applications. Rows are derived from "
+        "--seed, so seeding twice with the same seed collides; pick another "
+        "seed to add more data."
+    )
+
+    def add_arguments(self, parser):
+        for kind in BUILDERS:
+            parser.add_argument(
+                f"--{kind.replace('_', '-')}",
+                dest=kind,
+                type=int,
+                default=25,
+                help=f"Number of {kind.replace('_', ' ')} to create.",
+            )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--chunk-size", type=int, default=5000)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Processes inserting chunks in parallel. Defaults to the CPU "
+            "count on PostgreSQL and 1 on SQLite, which serialises writers.",
+        )
+        parser.add_argument(
+            "--method",
+            choices=["bulk", "copy"],
+            help="bulk_create or PostgreSQL COPY. Defaults to copy on PostgreSQL.",
+        )
+        parser.add_argument(
+            "--no-balances",
+            action="store_true",
+            help="Skip rebuilding partner balances afterwards.",
+        )
+
+    def handle(self, *args, **options):
+        postgresql = connection.vendor == "postgresql"
+        method = options["method"] or ("copy" if postgresql else "bulk")
+        if method == "copy" and not postgresql:
+            raise CommandError("COPY is only available on PostgreSQL.")
+        workers = options["workers"] or (os.cpu_count() if postgresql else 1)
+
+        counts = {kind: options[kind] for kind in BUILDERS}
+        references = counts["legal_entities"] + counts["incomes"]
+        references += counts["outcomes"] + counts["applications"]
+        if references and counts["partners"] < 2:
+            raise CommandError("At least two partners are needed: one of each role.")
+        if counts["applications"] and not counts["legal_entities"]:
+            raise CommandError("Applications need at least one legal entity.")
+
+        # Forked workers must open their own connections.
+        connections.close_all()
+        pool = None
+        if workers > 1:
+            pool = multiprocessing.get_context("fork").Pool(workers)
+        try:
+            for kind in BUILDERS:
+                self.seed(pool, kind, counts, method, options)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        if not options["no_balances"]:
+            started = time.monotonic()
+            balances.rebuild()
+            if options["verbosity"]:
+                self.stdout.write(
+                    f"Rebuilt partner balances in {time.monotonic() - started:.2f}s"
+                )
+        bump_generation(Partner, LegalEntity, Income, Outcome, Application)
+
+    def seed(self, pool, kind, counts, method, options):
+        total, chunk_size = counts[kind], options["chunk_size"]
+        tasks = [
+            (
+                kind,
+                start,
+                min(start + chunk_size, total),
+                options["seed"],
+                counts,
+                method,
+            )
+            for start in range(0, total, chunk_size)
+        ]
+        started = time.monotonic()
+        results = (
+            pool.imap_unordered(_seed_task, tasks) if pool else map(_seed_task, tasks)
+        )
+        created = 0
+        for rows in results:
+            created += rows
+            if options["verbosity"] > 1:
+                self.stdout.write(f"  {kind}: {created}/{total}")
+        if not options["verbosity"]:
+            return
+        elapsed = time.monotonic() - started
+        rate = created / elapsed if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {created} {kind.replace('_', ' ')} in {elapsed:.2f}s "
+                f"({rate:.0f} rows/s)"
+            )
+        )
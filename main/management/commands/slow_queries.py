@@ -0,0 +1,110 @@
+import statistics
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from main.profiling import read_records
+
+SORT_KEYS = {
+    "p95": lambda stats: stats["p95_ms"],
+    "total": lambda stats: stats["total_ms"],
+    "queries": lambda stats: stats["queries"],
+    "sql": lambda stats: stats["sql_ms"],
+}
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize(records):
+    """Aggregate profile records per view."""
+    by_view = defaultdict(list)
+    for record in records:
+        by_view[record["view"]].append(record)
+
+    summary = {}
+    for view, rows in by_view.items():
+        durations = [row["duration_ms"] for row in rows]
+        duplicates = {}
+        for row in rows:
+            for duplicate in row["duplicates"]:
+                entry = duplicates.setdefault(
+                    duplicate["sql"], {"max_count": 0, "requests": 0, "ms": 0.0}
+                )
+                entry["max_count"] = max(entry["max_count"], duplicate["count"])
+                entry["requests"] += 1
+                entry["ms"] += duplicate["ms"]
+        summary[view] = {
+            "requests": len(rows),
+            "p50_ms": statistics.median(durations),
+            "p95_ms": _percentile(durations, 0.95),
+            "total_ms": sum(durations),
+            "queries": statistics.mean(row["queries"] for row in rows),
+            "sql_ms": statistics.mean(row["sql_ms"] for row in rows),
+            "template_ms": statistics.mean(row["template_ms"] for row in rows),
+            "kb": statistics.mean(row["response_bytes"] for row in rows) / 1024,
+            "duplicates": duplicates,
+        }
+    return summary
+
+
+class Command(BaseCommand):
+    help = (
+        "Report the slowest main views and their repeated (N+1) queries from "
+        "the request profile log written by RequestProfileMiddleware."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--file",
+            default=settings.REQUEST_PROFILE_LOG,
+            help="Profile log to read; rotated backups are read too.",
+        )
+        parser.add_argument("--sort", choices=sorted(SORT_KEYS), default="p95")
+        parser.add_argument("--limit", type=int, default=10)
+        parser.add_argument(
+            "--min-repeats",
+            type=int,
+            default=3,
+            help="Report queries run at least this many times in one request.",
+        )
+
+    def handle(self, *args, **options):
+        summary = summarize(read_records(options["file"]))
+        if not summary:
+            raise CommandError(f"No profile records in {options['file']}")
+
+        worst = sorted(
+            summary.items(), key=lambda item: SORT_KEYS[options["sort"]](item[1])
+        )[::-1][: options["limit"]]
+        width = max(len(view) for view, _ in worst)
+        self.stdout.write(self.style.MIGRATE_HEADING("Worst endpoints"))
+        for view, stats in worst:
+            self.stdout.write(
+                f"{view:<{width}}  n={stats['requests']:<5} "
+                f"p50={stats['p50_ms']:>8.1f}ms  p95={stats['p95_ms']:>8.1f}ms  "
+                f"queries={stats['queries']:>6.1f}  sql={stats['sql_ms']:>7.1f}ms  "
+                f"templates={stats['template_ms']:>7.1f}ms  size={stats['kb']:>7.1f}KB"
+            )
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Repeated queries"))
+        repeated = sorted(
+            (
+                (entry["max_count"], view, sql, entry)
+                for view, stats in summary.items()
+                for sql, entry in stats["duplicates"].items()
+                if entry["max_count"] >= options["min_repeats"]
+            ),
+            key=lambda item: item[0],
+            reverse=True,
+        )
+        if not repeated:
+            self.stdout.write("None")
+        for count, view, sql, entry in repeated[: options["limit"]]:
+            self.stdout.write(
+                f"{view}: up to {count}x per request in {entry['requests']} "
+                f"request(s), {entry['ms']:.1f}ms total\n    {sql[:200]}"
+            )
@@ -0,0 +1,241 @@
+import contextlib
+import functools
+import json
+import logging
+import re
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.utils.functional import SimpleLazyObject
+from django_otp import DEVICE_ID_SESSION_KEY
+from django_otp.middleware import OTPMiddleware
+
+from .caching import bump_tokens, current_tokens, is_process_local
+from .profiling import RequestProfile
+
+logger = logging.getLogger(__name__)
+profile_logger = logging.getLogger("main.profiling")
+
+OTP_VERIFIED_SESSION_KEY = "main_otp_verified"
+DEVICES_TOKEN_KEY = "main:otp-devices:{}"
+AUTH_TABLES = (
+    "django_session",
+    "auth_",
+    "otp_",
+    "two_factor_",
+    "user_sessions_",
+)
+AUTH_TABLE_RE = re.compile(
+    '["`](?:{})'.format("|".join(re.escape(table) for table in AUTH_TABLES))
+)
+
+
+@contextlib.asynccontextmanager
+async def async_execute_wrapper(wrapper):
+    """``connection.execute_wrapper`` for async code.
+
+    Connections belong to threads, and the async ORM and ``sync_to_async``
+    run queries in the request's sync thread, not in the event loop's, so
+    the wrapper goes on the connection of that thread.
+    """
+    wrappers = await sync_to_async(lambda: connection.execute_wrappers)()
+    wrappers.append(wrapper)
+    try:
+        yield
+    finally:
+        wrappers.remove(wrapper)
+
+
+def bump_user_devices(user_id):
+    bump_tokens(DEVICES_TOKEN_KEY.format(user_id))
+
+
+class CachedOTPMiddleware(OTPMiddleware):
+    """OTPMiddleware that remembers the verified device on the session.
+
+    Within ``OTP_VERIFICATION_CACHE_TTL`` seconds the device is not loaded
+    unless something reads it; ``user.is_verified()`` is answered from the
+    session. Adding or removing a device of the user drops the entry.
+
+    That takes a cache shared by all processes; with a process-local one the
+    device is checked against the database on every request, as usual.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        user = getattr(request, "user", None)
+        if user is not None:
+            # Nothing is loaded until the view asks, as in __call__.
+            request.user = SimpleLazyObject(
+                functools.partial(self._verify_user, request, user)
+            )
+        return await self.get_response(request)
+
+    def _verify_user(self, request, user):
+        if not user.is_authenticated or is_process_local():
+            return super()._verify_user(request, user)
+
+        persistent_id = request.session.get(DEVICE_ID_SESSION_KEY)
+        cached = request.session.get(OTP_VERIFIED_SESSION_KEY)
+        (devices_token,) = current_tokens(DEVICES_TOKEN_KEY.format(user.pk))
+        if (
+            persistent_id
+            and cached
+            and cached["device"] == persistent_id
+            and cached["user"] == user.pk
+            and cached["devices"] == devices_token
+            and cached["expires"] > time.time()
+        ):
+            user.otp_device = SimpleLazyObject(
+                lambda: self._device_from_persistent_id(persistent_id)
+            )
+            user.is_verified = lambda: True
+            return user
+
+        user = super()._verify_user(request, user)
+        if user.otp_device is not None:
+            request.session[OTP_VERIFIED_SESSION_KEY] = {
+                "device": persistent_id,
+                "user": user.pk,
+                "devices": devices_token,
+                "expires": time.time() + settings.OTP_VERIFICATION_CACHE_TTL,
+            }
+        else:
+            request.session.pop(OTP_VERIFIED_SESSION_KEY, None)
+        return user
+
+
+class AuthQueryCounter:
+    def __init__(self):
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if AUTH_TABLE_RE.search(sql):
+            self.queries += 1
+        return execute(sql, params, many, context)
+
+
+class AuthQueryCountMiddleware:
+    """Count the session, user and OTP queries each request costs.
+
+    Enabled by ``AUTH_QUERY_COUNTING``. The count is logged at debug level
+    and, with ``DEBUG`` on, returned in the ``X-Auth-Queries`` response
+    header. Install it first so it also sees the session being loaded and
+    saved.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.AUTH_QUERY_COUNTING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        counter = AuthQueryCounter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        return self.report(counter, request, response)
+
+    async def __acall__(self, request):
+        counter = AuthQueryCounter()
+        async with async_execute_wrapper(counter):
+            response = await self.get_response(request)
+        return self.report(counter, request, response)
+
+    def report(self, counter, request, response):
+        logger.debug("%s: %d auth queries", request.path, counter.queries)
+        if settings.DEBUG:
+            response.headers["X-Auth-Queries"] = str(counter.queries)
+        return response
+
+
+class RequestProfileMiddleware:
+    """Record query count, SQL time, template time and size of main views.
+
+    Enabled by ``REQUEST_PROFILING``. Streaming responses are measured when
+    their content has been consumed, so the queries they run lazily count.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile = RequestProfile()
+        token = profile.activate()
+        try:
+            with connection.execute_wrapper(profile):
+                response = self.get_response(request)
+        finally:
+            profile.deactivate(token)
+        return self.measure(profile, request, response)
+
+    async def __acall__(self, request):
+        profile = RequestProfile()
+        token = profile.activate()
+        try:
+            async with async_execute_wrapper(profile):
+                response = await self.get_response(request)
+        finally:
+            profile.deactivate(token)
+        return self.measure(profile, request, response)
+
+    def measure(self, profile, request, response):
+        match = request.resolver_match
+        if match is None or match.namespace != "main":
+            return response
+        if response.streaming:
+            stream = self.astream if response.is_async else self.stream
+            response.streaming_content = stream(
+                response.streaming_content, profile, request, response
+            )
+        else:
+            profile.response_bytes = len(response.content)
+            self.log(profile, request, response)
+        return response
+
+    def stream(self, chunks, profile, request, response):
+        with connection.execute_wrapper(profile):
+            for chunk in chunks:
+                profile.response_bytes += len(chunk)
+                yield chunk
+        self.log(profile, request, response)
+
+    async def astream(self, chunks, profile, request, response):
+        async with async_execute_wrapper(profile):
+            async for chunk in chunks:
+                profile.response_bytes += len(chunk)
+                yield chunk
+        self.log(profile, request, response)
+
+    def log(self, profile, request, response):
+        profile_logger.info(json.dumps(profile.as_record(request, response)))
@@ -0,0 +1,86 @@
+# Generated by Django 4.2.14 on 2026-10-18 10:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="application",
+            index=models.Index(
+                fields=["created_date", "id"], name="main_app_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="application",
+            index=models.Index(fields=["initial_sum", "id"], name="main_app_sum_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="application",
+            index=models.Index(
+                fields=["executor", "created_date"], name="main_app_exec_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="application",
+            index=models.Index(
+                fields=["customer", "created_date"], name="main_app_cust_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="application",
+            index=models.Index(
+                fields=["receiver", "created_date"], name="main_app_recv_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="application",
+            index=models.Index(
+                fields=["sender", "created_date"], name="main_app_send_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="income",
+            index=models.Index(
+                fields=["executor", "created_at"], name="main_income_exec_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="income",
+            index=models.Index(
+                fields=["executor", "amount"], name="main_income_exec_amount_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="outcome",
+            index=models.Index(
+                fields=["customer", "created_at"], name="main_outcome_cust_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="outcome",
+            index=models.Index(
+                fields=["customer", "amount"], name="main_outcome_cust_amount_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="partner",
+            index=models.Index(
+                condition=models.Q(("is_executor", True)),
+                fields=["name"],
+                name="main_partner_executor_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="partner",
+            index=models.Index(
+                condition=models.Q(("is_executor", False)),
+                fields=["name"],
+                name="main_partner_customer_idx",
+            ),
+        ),
+    ]
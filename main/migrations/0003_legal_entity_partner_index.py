@@ -0,0 +1,18 @@
+# Generated by Django 4.2.14 on 2026-10-18 10:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0002_dashboard_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="legalentity",
+            index=models.Index(
+                fields=["partner", "name"], name="main_legal_partner_name_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.14 on 2026-10-18 10:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_balances(apps, schema_editor):
+    from main.balances import rebuild
+
+    rebuild(apps=apps)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0003_legal_entity_partner_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PartnerBalance",
+            fields=[
+                (
+                    "partner",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="balance",
+                        serialize=False,
+                        to="main.partner",
+                    ),
+                ),
+                ("executor_applications", models.IntegerField(default=0)),
+                ("executor_income", models.FloatField(default=0)),
+                ("executor_outcome", models.FloatField(default=0)),
+                ("executor_discrepancy", models.FloatField(default=0)),
+                ("customer_applications", models.IntegerField(default=0)),
+                ("customer_income", models.FloatField(default=0)),
+                ("customer_outcome", models.FloatField(default=0)),
+                ("customer_discrepancy", models.FloatField(default=0)),
+            ],
+        ),
+        migrations.RunPython(build_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 4.2.14 on 2026-10-18 10:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0004_partner_balance"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="application",
+            name="clean_income",
+            field=models.DecimalField(decimal_places=2, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name="application",
+            name="initial_sum",
+            field=models.DecimalField(decimal_places=2, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name="application",
+            name="referral_percentage",
+            field=models.DecimalField(decimal_places=2, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name="application",
+            name="sum_with_executors_commission",
+            field=models.DecimalField(decimal_places=2, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name="application",
+            name="uncargo_sum",
+            field=models.DecimalField(decimal_places=2, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name="income",
+            name="amount",
+            field=models.DecimalField(decimal_places=2, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name="outcome",
+            name="amount",
+            field=models.DecimalField(decimal_places=2, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name="partnerbalance",
+            name="customer_discrepancy",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name="partnerbalance",
+            name="customer_income",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name="partnerbalance",
+            name="customer_outcome",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name="partnerbalance",
+            name="executor_discrepancy",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name="partnerbalance",
+            name="executor_income",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name="partnerbalance",
+            name="executor_outcome",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+    ]
@@ -0,0 +1,130 @@
+# Generated by Django 4.2.14 on 2026-10-18 10:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0005_decimal_money"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ApplicationDailyRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bucket", models.DateField()),
+                (
+                    "dimension",
+                    models.CharField(
+                        choices=[
+                            ("executor", "Исполнитель"),
+                            ("customer", "Заказчик"),
+                            ("status", "Статус"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("status", models.CharField(blank=True, max_length=50)),
+                ("applications", models.IntegerField()),
+                ("initial_sum", models.DecimalField(decimal_places=2, max_digits=18)),
+                ("uncargo_sum", models.DecimalField(decimal_places=2, max_digits=18)),
+                ("clean_income", models.DecimalField(decimal_places=2, max_digits=18)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ApplicationMonthlyRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bucket", models.DateField()),
+                (
+                    "dimension",
+                    models.CharField(
+                        choices=[
+                            ("executor", "Исполнитель"),
+                            ("customer", "Заказчик"),
+                            ("status", "Статус"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("status", models.CharField(blank=True, max_length=50)),
+                ("applications", models.IntegerField()),
+                ("initial_sum", models.DecimalField(decimal_places=2, max_digits=18)),
+                ("uncargo_sum", models.DecimalField(decimal_places=2, max_digits=18)),
+                ("clean_income", models.DecimalField(decimal_places=2, max_digits=18)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="RollupWatermark",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=50, primary_key=True, serialize=False),
+                ),
+                ("value", models.DateTimeField(null=True)),
+                ("refreshed_at", models.DateTimeField(null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="application",
+            index=models.Index(fields=["updated_at"], name="main_app_updated_idx"),
+        ),
+        migrations.AddField(
+            model_name="applicationmonthlyrollup",
+            name="partner",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="main.partner",
+            ),
+        ),
+        migrations.AddField(
+            model_name="applicationdailyrollup",
+            name="partner",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="main.partner",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="applicationmonthlyrollup",
+            index=models.Index(
+                fields=["dimension", "bucket"], name="main_rollup_month_dim_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="applicationmonthlyrollup",
+            index=models.Index(fields=["bucket"], name="main_rollup_month_bucket_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="applicationdailyrollup",
+            index=models.Index(
+                fields=["dimension", "bucket"], name="main_rollup_day_dim_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="applicationdailyrollup",
+            index=models.Index(fields=["bucket"], name="main_rollup_day_bucket_idx"),
+        ),
+    ]
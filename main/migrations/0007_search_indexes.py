@@ -0,0 +1,40 @@
+from django.db import migrations
+
+# SQLite gets FTS5 tables from main.search.ensure_sqlite_index after migrate.
+POSTGRESQL_INDEXES = [
+    (
+        "main_app_comment_fts_idx",
+        "main_application USING gin (to_tsvector('russian', comment))",
+    ),
+    ("main_partner_name_trgm_idx", "main_partner USING gin (name gin_trgm_ops)"),
+    ("main_legal_name_trgm_idx", "main_legalentity USING gin (name gin_trgm_ops)"),
+    (
+        "main_legal_tax_trgm_idx",
+        "main_legalentity USING gin (tax_number gin_trgm_ops)",
+    ),
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, definition in POSTGRESQL_INDEXES:
+        schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {definition}")
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _ in POSTGRESQL_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0006_reporting_rollups"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
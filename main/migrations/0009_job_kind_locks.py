@@ -0,0 +1,22 @@
+# Generated by Django 4.2.14 on 2026-10-18 11:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0008_jobs"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="JobKindLock",
+            fields=[
+                (
+                    "kind",
+                    models.CharField(max_length=50, primary_key=True, serialize=False),
+                ),
+                ("locked_at", models.DateTimeField(null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 4.2.14 on 2026-10-18 11:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0009_job_kind_locks"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="income",
+            name="main_income_exec_created_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="income",
+            name="main_income_exec_amount_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="outcome",
+            name="main_outcome_cust_created_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="outcome",
+            name="main_outcome_cust_amount_idx",
+        ),
+        migrations.AddIndex(
+            model_name="income",
+            index=models.Index(
+                fields=["created_at", "id"], name="main_income_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="income",
+            index=models.Index(fields=["amount", "id"], name="main_income_amount_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="income",
+            index=models.Index(
+                fields=["executor", "created_at", "id"],
+                name="main_income_exec_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="income",
+            index=models.Index(
+                fields=["executor", "amount", "id"], name="main_income_exec_amount_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="outcome",
+            index=models.Index(
+                fields=["created_at", "id"], name="main_outcome_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="outcome",
+            index=models.Index(fields=["amount", "id"], name="main_outcome_amount_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="outcome",
+            index=models.Index(
+                fields=["customer", "created_at", "id"],
+                name="main_outcome_cust_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="outcome",
+            index=models.Index(
+                fields=["customer", "amount", "id"], name="main_outcome_cust_amount_idx"
+            ),
+        ),
+    ]
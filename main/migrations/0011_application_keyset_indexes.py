@@ -0,0 +1,46 @@
+# Generated by Django 4.2.14 on 2026-10-18 11:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0010_payment_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="application",
+            name="main_app_exec_created_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="application",
+            name="main_app_cust_created_idx",
+        ),
+        migrations.AddIndex(
+            model_name="application",
+            index=models.Index(
+                fields=["executor", "created_date", "id"],
+                name="main_app_exec_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="application",
+            index=models.Index(
+                fields=["customer", "created_date", "id"],
+                name="main_app_cust_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="application",
+            index=models.Index(
+                fields=["executor", "initial_sum", "id"], name="main_app_exec_sum_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="application",
+            index=models.Index(
+                fields=["customer", "initial_sum", "id"], name="main_app_cust_sum_idx"
+            ),
+        ),
+    ]
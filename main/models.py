@@ -2,6 +2,8 @@ from enum import Enum
 
 from django.db import models
 
+from .money import MONEY_TOTAL_MAX_DIGITS, money_field
+
 
 class Partner(models.Model):
     id = models.UUIDField(primary_key=True)
@@ -11,6 +13,20 @@ class Partner(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, null=False)
     updated_at = models.DateTimeField(auto_now=True, null=False)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["name"],
+                condition=models.Q(is_executor=True),
+                name="main_partner_executor_idx",
+            ),
+            models.Index(
+                fields=["name"],
+                condition=models.Q(is_executor=False),
+                name="main_partner_customer_idx",
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -18,10 +34,24 @@ class Partner(models.Model):
 class Income(models.Model):
     id = models.UUIDField(primary_key=True)
     executor = models.ForeignKey("Partner", on_delete=models.CASCADE, null=False)
-    amount = models.FloatField(null=False)
+    amount = money_field(null=False)
     created_at = models.DateTimeField(auto_now_add=True, null=False)
     updated_at = models.DateTimeField(auto_now=True, null=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="main_income_created_idx"),
+            models.Index(fields=["amount", "id"], name="main_income_amount_idx"),
+            models.Index(
+                fields=["executor", "created_at", "id"],
+                name="main_income_exec_created_idx",
+            ),
+            models.Index(
+                fields=["executor", "amount", "id"],
+                name="main_income_exec_amount_idx",
+            ),
+        ]
+
     def __str__(self):
         return self.amount
 
@@ -29,10 +59,24 @@ class Income(models.Model):
 class Outcome(models.Model):
     id = models.UUIDField(primary_key=True)
     customer = models.ForeignKey("Partner", on_delete=models.CASCADE, null=False)
-    amount = models.FloatField(null=False)
+    amount = money_field(null=False)
     created_at = models.DateTimeField(auto_now_add=True, null=False)
     updated_at = models.DateTimeField(auto_now=True, null=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="main_outcome_created_idx"),
+            models.Index(fields=["amount", "id"], name="main_outcome_amount_idx"),
+            models.Index(
+                fields=["customer", "created_at", "id"],
+                name="main_outcome_cust_created_idx",
+            ),
+            models.Index(
+                fields=["customer", "amount", "id"],
+                name="main_outcome_cust_amount_idx",
+            ),
+        ]
+
     def __str__(self):
         return self.amount
 
@@ -46,6 +90,13 @@ class LegalEntity(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, null=False)
     updated_at = models.DateTimeField(auto_now=True, null=False)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["partner", "name"], name="main_legal_partner_name_idx"
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -71,7 +122,7 @@ class Application(models.Model):
     executor = models.ForeignKey(
         "Partner", on_delete=models.SET_NULL, related_name="partner_executor", null=True
     )
-    initial_sum = models.FloatField(null=False)
+    initial_sum = money_field(null=False)
     receiver = models.ForeignKey(
         "LegalEntity",
         on_delete=models.SET_NULL,
@@ -85,7 +136,7 @@ class Application(models.Model):
         null=True,
     )
     executor_commission = models.FloatField(null=False)
-    sum_with_executors_commission = models.FloatField(null=False)
+    sum_with_executors_commission = money_field(null=False)
     giving_side = models.ForeignKey(
         "Partner",
         on_delete=models.SET_NULL,
@@ -93,10 +144,170 @@ class Application(models.Model):
         null=True,
     )
     commission_with_interest = models.FloatField(null=False)
-    uncargo_sum = models.FloatField(null=False)
-    referral_percentage = models.FloatField(null=False)
-    clean_income = models.FloatField(null=False)
+    uncargo_sum = money_field(null=False)
+    referral_percentage = money_field(null=False)
+    clean_income = money_field(null=False)
     comment = models.CharField(max_length=1500, null=False)
     is_documents = models.BooleanField(default=False, null=False)
     created_at = models.DateTimeField(auto_now_add=True, null=False)
     updated_at = models.DateTimeField(auto_now=True, null=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_date", "id"], name="main_app_created_idx"),
+            models.Index(fields=["initial_sum", "id"], name="main_app_sum_idx"),
+            models.Index(
+                fields=["executor", "created_date", "id"],
+                name="main_app_exec_created_idx",
+            ),
+            models.Index(
+                fields=["customer", "created_date", "id"],
+                name="main_app_cust_created_idx",
+            ),
+            models.Index(
+                fields=["executor", "initial_sum", "id"], name="main_app_exec_sum_idx"
+            ),
+            models.Index(
+                fields=["customer", "initial_sum", "id"], name="main_app_cust_sum_idx"
+            ),
+            models.Index(
+                fields=["receiver", "created_date"], name="main_app_recv_created_idx"
+            ),
+            models.Index(
+                fields=["sender", "created_date"], name="main_app_send_created_idx"
+            ),
+            models.Index(fields=["updated_at"], name="main_app_updated_idx"),
+        ]
+
+
+class PartnerBalance(models.Model):
+    partner = models.OneToOneField(
+        "Partner",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="balance",
+    )
+    executor_applications = models.IntegerField(default=0, null=False)
+    executor_income = money_field(default=0, null=False)
+    executor_outcome = money_field(default=0, null=False)
+    executor_discrepancy = money_field(default=0, null=False)
+    customer_applications = models.IntegerField(default=0, null=False)
+    customer_income = money_field(default=0, null=False)
+    customer_outcome = money_field(default=0, null=False)
+    customer_discrepancy = money_field(default=0, null=False)
+
+    def totals(self, role):
+        role = "executor" if role == "executor" else "customer"
+        return {
+            "total_applications": getattr(self, f"{role}_applications"),
+            "total_income": getattr(self, f"{role}_income"),
+            "total_outcome": getattr(self, f"{role}_outcome"),
+            "discrepancy": getattr(self, f"{role}_discrepancy"),
+        }
+
+
+class RollupDimension(models.TextChoices):
+    EXECUTOR = "executor", "Исполнитель"
+    CUSTOMER = "customer", "Заказчик"
+    STATUS = "status", "Статус"
+
+
+class ApplicationRollup(models.Model):
+    """Application totals of one bucket for one executor, customer or status."""
+
+    bucket = models.DateField(null=False)
+    dimension = models.CharField(
+        choices=RollupDimension.choices, max_length=10, null=False
+    )
+    # Set for the executor and customer dimensions; null means "no partner".
+    partner = models.ForeignKey(
+        "Partner", on_delete=models.CASCADE, related_name="+", null=True
+    )
+    status = models.CharField(max_length=50, blank=True, null=False)
+    applications = models.IntegerField(null=False)
+    initial_sum = money_field(max_digits=MONEY_TOTAL_MAX_DIGITS, null=False)
+    uncargo_sum = money_field(max_digits=MONEY_TOTAL_MAX_DIGITS, null=False)
+    clean_income = money_field(max_digits=MONEY_TOTAL_MAX_DIGITS, null=False)
+
+    class Meta:
+        abstract = True
+
+
+class ApplicationDailyRollup(ApplicationRollup):
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["dimension", "bucket"], name="main_rollup_day_dim_idx"
+            ),
+            models.Index(fields=["bucket"], name="main_rollup_day_bucket_idx"),
+        ]
+
+
+class ApplicationMonthlyRollup(ApplicationRollup):
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["dimension", "bucket"], name="main_rollup_month_dim_idx"
+            ),
+            models.Index(fields=["bucket"], name="main_rollup_month_bucket_idx"),
+        ]
+
+
+class RollupWatermark(models.Model):
+    name = models.CharField(max_length=50, primary_key=True)
+    # Highest Application.updated_at folded into the rollups.
+    value = models.DateTimeField(null=True)
+    refreshed_at = models.DateTimeField(null=True)
+
+
+class JobStatus(models.TextChoices):
+    QUEUED = "queued", "В очереди"
+    RUNNING = "running", "Выполняется"
+    SUCCEEDED = "succeeded", "Выполнено"
+    FAILED = "failed", "Ошибка"
+
+
+class Job(models.Model):
+    """A unit of background work for ``manage.py run_jobs``, see ``main.jobs``."""
+
+    id = models.UUIDField(primary_key=True)
+    kind = models.CharField(max_length=50, null=False)
+    params = models.JSONField(default=dict, null=False)
+    # Set to skip enqueueing a job while an identical one is still queued.
+    key = models.CharField(max_length=255, blank=True, null=False)
+    status = models.CharField(
+        choices=JobStatus.choices,
+        default=JobStatus.QUEUED,
+        max_length=10,
+        null=False,
+    )
+    run_after = models.DateTimeField(null=False)
+    attempts = models.IntegerField(default=0, null=False)
+    max_attempts = models.IntegerField(default=1, null=False)
+    progress = models.IntegerField(default=0, null=False)
+    total = models.IntegerField(null=True)
+    result = models.JSONField(null=True)
+    error = models.TextField(blank=True, null=False)
+    worker = models.CharField(max_length=100, blank=True, null=False)
+    # Touched by the worker while the job runs; a stale one means it died.
+    heartbeat_at = models.DateTimeField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True, null=False)
+    started_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_after"], name="main_job_status_idx"),
+            models.Index(
+                fields=["kind", "key"],
+                condition=models.Q(status="queued"),
+                name="main_job_queued_key_idx",
+            ),
+        ]
+
+
+class JobKindLock(models.Model):
+    """Row locked while a worker claims a job of a kind with a concurrency limit."""
+
+    kind = models.CharField(max_length=50, primary_key=True)
+    locked_at = models.DateTimeField(null=True)
@@ -0,0 +1,124 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.apps import apps
+from django.db.models import (
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    OuterRef,
+    Subquery,
+    Value,
+)
+from django.db.models.functions import Cast, Coalesce, Now, Round
+
+MONEY_MAX_DIGITS = 14
+# Sums over many rows, e.g. the reporting rollups
+MONEY_TOTAL_MAX_DIGITS = 18
+MONEY_DECIMAL_PLACES = 2
+CENT = Decimal("0.01")
+
+DERIVED_FIELDS = (
+    "sum_with_executors_commission",
+    "uncargo_sum",
+    "referral_percentage",
+    "clean_income",
+)
+
+
+def money_field(max_digits=MONEY_MAX_DIGITS, **kwargs):
+    return DecimalField(
+        max_digits=max_digits, decimal_places=MONEY_DECIMAL_PLACES, **kwargs
+    )
+
+
+def to_decimal(value):
+    """Convert floats through ``str`` so 0.1 stays 0.1 instead of its binary form."""
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+def to_money(value):
+    return to_decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def derived_amounts(
+    initial_sum, executor_commission, commission_with_interest, referral_rate
+):
+    """Return the derived application amounts, rounded to cents.
+
+    ``referral_rate`` is the executor's ``referral_percentage``, as in
+    ``derived_expressions``, whichever code path writes the row.
+    """
+    initial_sum = to_decimal(initial_sum)
+    sum_with_executors_commission = (
+        initial_sum * (100 - to_decimal(executor_commission)) / 100
+    )
+    uncargo_sum = initial_sum * (100 - to_decimal(commission_with_interest)) / 100
+    referral_percentage = initial_sum * to_decimal(referral_rate) / 100
+    clean_income = sum_with_executors_commission - uncargo_sum - referral_percentage
+    return {
+        "sum_with_executors_commission": to_money(sum_with_executors_commission),
+        "uncargo_sum": to_money(uncargo_sum),
+        "referral_percentage": to_money(referral_percentage),
+        "clean_income": to_money(clean_income),
+    }
+
+
+def _percentage(expression):
+    return Cast(expression, DecimalField(max_digits=9, decimal_places=4))
+
+
+def executor_referral_rate():
+    """The ``referral_percentage`` of an application row's executor, 0 without one."""
+    Partner = apps.get_model("main", "Partner")
+    return Coalesce(
+        Subquery(
+            Partner.objects.filter(pk=OuterRef("executor_id")).values(
+                "referral_percentage"
+            )[:1]
+        ),
+        Value(0.0),
+    )
+
+
+def derived_expressions(referral_rate=None):
+    """SQL counterparts of ``derived_amounts`` over an application row.
+
+    ``referral_rate`` defaults to ``executor_referral_rate()``.
+    """
+    if referral_rate is None:
+        referral_rate = executor_referral_rate()
+    output_field = money_field()
+    initial_sum = F("initial_sum")
+    hundred = Value(Decimal(100), output_field=DecimalField())
+    sum_with_executors_commission = (
+        initial_sum * (hundred - _percentage(F("executor_commission"))) / hundred
+    )
+    uncargo_sum = (
+        initial_sum * (hundred - _percentage(F("commission_with_interest"))) / hundred
+    )
+    referral_percentage = initial_sum * _percentage(referral_rate) / hundred
+    clean_income = sum_with_executors_commission - uncargo_sum - referral_percentage
+
+    def rounded(expression):
+        return Round(
+            ExpressionWrapper(expression, output_field=output_field),
+            MONEY_DECIMAL_PLACES,
+            output_field=output_field,
+        )
+
+    return {
+        "sum_with_executors_commission": rounded(sum_with_executors_commission),
+        "uncargo_sum": rounded(uncargo_sum),
+        "referral_percentage": rounded(referral_percentage),
+        "clean_income": rounded(clean_income),
+    }
+
+
+def recalculate(queryset, referral_rate=None):
+    """Recompute the derived columns of every row in ``queryset`` in one UPDATE.
+
+    ``updated_at`` is bumped too, since ``update()`` skips ``auto_now``.
+    """
+    return queryset.update(**derived_expressions(referral_rate), updated_at=Now())
@@ -0,0 +1,130 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, prev_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+
+class KeysetPaginator:
+    """Cursor pagination over a ``(field, pk)`` ordering.
+
+    Every page is fetched with a ``WHERE (field, pk) < (value, pk)`` style
+    condition instead of OFFSET, so the cost of a page does not depend on
+    how deep the user has paged.
+    """
+
+    def __init__(self, queryset, field, descending=False, per_page=50):
+        self.queryset = queryset
+        self.field = field
+        self.descending = descending
+        self.per_page = per_page
+        self.model_field = queryset.model._meta.get_field(field)
+        self.pk_field = queryset.model._meta.pk
+
+    def encode_cursor(self, obj):
+        payload = [
+            self.field,
+            self.model_field.value_to_string(obj),
+            str(obj.pk),
+        ]
+        raw = json.dumps(payload, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        """Return ``(value, pk)`` or ``None`` for a missing or foreign cursor."""
+        if not cursor:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            field, value, pk = json.loads(raw)
+        except (binascii.Error, ValueError, TypeError):
+            return None
+        if field != self.field:
+            return None
+        try:
+            return self.model_field.to_python(value), self.pk_field.to_python(pk)
+        except ValidationError:
+            return None
+
+    def cursor_key(self, after=None, before=None):
+        """Identify the page ``page(after, before)`` returns, e.g. for caching.
+
+        Cursors that don't decode all name the first page.
+        """
+        before_key = self.decode_cursor(before)
+        if before_key is not None:
+            return (self.field, self.descending, "before", *before_key)
+        after_key = self.decode_cursor(after) or ()
+        return (self.field, self.descending, "after", *after_key)
+
+    def _ordering(self, reverse):
+        descending = self.descending != reverse
+        prefix = "-" if descending else ""
+        return [f"{prefix}{self.field}", f"{prefix}pk"]
+
+    def _seek(self, value, pk, reverse):
+        lookup = "lt" if self.descending != reverse else "gt"
+        # The redundant bound on the field alone lets the planner start the
+        # index scan at the cursor; the OR on its own is only a filter.
+        return Q(**{f"{self.field}__{lookup}e": value}) & (
+            Q(**{f"{self.field}__{lookup}": value})
+            | Q(**{self.field: value, f"pk__{lookup}": pk})
+        )
+
+    def window(self, key=None, reverse=False):
+        """Return the sliced queryset for the page next to ``key``.
+
+        One extra row is fetched to tell whether there is a further page.
+        """
+        queryset = self.queryset.order_by(*self._ordering(reverse))
+        if key is not None:
+            queryset = queryset.filter(self._seek(*key, reverse=reverse))
+        return queryset[: self.per_page + 1]
+
+    def page(self, after=None, before=None):
+        before_key = self.decode_cursor(before)
+        after_key = None if before_key else self.decode_cursor(after)
+        reverse = before_key is not None
+        key = before_key or after_key
+
+        rows = list(self.window(key, reverse))
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if reverse:
+            rows.reverse()
+
+        if not rows:
+            return KeysetPage(rows)
+
+        if reverse:
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, key is not None
+
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode_cursor(rows[-1]) if has_next else None,
+            prev_cursor=self.encode_cursor(rows[0]) if has_previous else None,
+        )
@@ -0,0 +1,125 @@
+"""Per-request SQL, template and response size measurements.
+
+``RequestProfileMiddleware`` collects a ``RequestProfile`` for every request
+to a ``main`` view and logs it as one JSON line to the ``main.profiling``
+logger, which settings route to a rotating file. ``manage.py slow_queries``
+reads the files back.
+"""
+
+import json
+import re
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.template.backends.django import DjangoTemplates
+from django.template.backends.django import Template as DjangoTemplate
+
+_current = ContextVar("request_profile", default=None)
+
+# Collapse the placeholders of IN (...) lists so lookups of different sizes
+# count as the same query.
+_PLACEHOLDER_LIST = re.compile(r"\((?:%s, )+%s\)")
+DUPLICATES_KEPT = 10
+
+
+def normalize_sql(sql):
+    return _PLACEHOLDER_LIST.sub("(%s, ...)", sql)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql = Counter()
+        self.sql_ms = defaultdict(float)
+        self.template_ms = 0.0
+        self.response_bytes = 0
+
+    @classmethod
+    def current(cls):
+        return _current.get()
+
+    def activate(self):
+        return _current.set(self)
+
+    @staticmethod
+    def deactivate(token):
+        _current.reset(token)
+
+    def __call__(self, execute, sql, params, many, context):
+        """Execute wrapper timing every query."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            key = normalize_sql(sql)
+            self.sql[key] += 1
+            self.sql_ms[key] += (time.perf_counter() - started) * 1000
+
+    def as_record(self, request, response):
+        duplicates = [
+            {"sql": sql, "count": count, "ms": round(self.sql_ms[sql], 3)}
+            for sql, count in self.sql.most_common(DUPLICATES_KEPT)
+            if count > 1
+        ]
+        match = request.resolver_match
+        return {
+            "time": time.time(),
+            "view": f"{match.namespace}:{match.url_name}",
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "duration_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "queries": sum(self.sql.values()),
+            "sql_ms": round(sum(self.sql_ms.values()), 3),
+            "template_ms": round(self.template_ms, 3),
+            "response_bytes": self.response_bytes,
+            "duplicates": duplicates,
+        }
+
+
+class ProfiledTemplate(DjangoTemplate):
+    def render(self, context=None, request=None):
+        profile = RequestProfile.current()
+        if profile is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            profile.template_ms += (time.perf_counter() - started) * 1000
+
+
+class ProfilingDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates whose templates add their render time to the profile."""
+
+    def from_string(self, template_code):
+        return ProfiledTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return ProfiledTemplate(template.template, self)
+
+
+def read_records(path):
+    """Yield profile records from ``path`` and its rotated backups, oldest first."""
+    path = Path(path)
+    backups = sorted(
+        (
+            backup
+            for backup in path.parent.glob(f"{path.name}.*")
+            if backup.suffix[1:].isdigit()
+        ),
+        key=lambda backup: int(backup.suffix[1:]),
+        reverse=True,
+    )
+    for file in [*backups, path]:
+        if not file.exists():
+            continue
+        with file.open() as lines:
+            for line in lines:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
@@ -0,0 +1,183 @@
+"""Queryset shapes for the list views and JSON endpoints.
+
+Each function joins exactly the relations its template or payload reads
+and defers the columns it never touches, so rendering a page costs one
+query no matter how many rows it shows.
+"""
+
+import datetime
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .forms import ApplicationFilterForm
+from .models import Application
+from .pagination import KeysetPaginator
+from .search import search_applications
+
+APPLICATION_LIST_FIELDS = (
+    "id",
+    "status",
+    "created_date",
+    "resolving_date",
+    "initial_sum",
+    "executor_commission",
+    "sum_with_executors_commission",
+    "commission_with_interest",
+    "uncargo_sum",
+    "referral_percentage",
+    "clean_income",
+    "comment",
+    "is_documents",
+    "created_at",
+    "customer__name",
+    "executor__name",
+    "giving_side__name",
+    "receiver__name",
+    "sender__name",
+)
+
+# Same columns and headings as the application_list table.
+APPLICATION_EXPORT_COLUMNS = (
+    ("id", "Id"),
+    ("status", "Статус"),
+    ("created_date", "Дата приема"),
+    ("resolving_date", "Дата исполнения"),
+    ("customer__name", "Заказчик"),
+    ("executor__name", "Исполнитель"),
+    ("initial_sum", "Сумма приема"),
+    ("receiver__name", "Принимающий"),
+    ("sender__name", "Отправитель"),
+    ("executor_commission", "Комиссия исполняющего"),
+    ("sum_with_executors_commission", "Сумма с комиссией исполнителя"),
+    ("giving_side__name", "Сторона выдающая"),
+    ("commission_with_interest", "Комиссия вместе с нашим интересом"),
+    ("uncargo_sum", "Сумма отгрузки"),
+    ("referral_percentage", "% Рефералки"),
+    ("clean_income", "Чистый доход"),
+    ("comment", "Комментарий"),
+    ("is_documents", "Документы"),
+    ("created_at", "Дата создания"),
+)
+
+
+def application_list_queryset(queryset):
+    return queryset.select_related(
+        "customer", "executor", "giving_side", "receiver", "sender"
+    ).only(*APPLICATION_LIST_FIELDS)
+
+
+def day_start(day):
+    """Midnight starting ``day`` in the current time zone."""
+    return datetime.datetime.combine(
+        day, datetime.time.min, tzinfo=timezone.get_current_timezone()
+    )
+
+
+def filter_applications(
+    queryset,
+    customer=None,
+    executor=None,
+    legal_entity=None,
+    start_date=None,
+    end_date=None,
+    q=None,
+):
+    """Apply ``ApplicationFilterForm`` filters; ``q`` also orders by search rank."""
+    if customer:
+        queryset = queryset.filter(customer=customer)
+    if executor:
+        queryset = queryset.filter(executor=executor)
+    if legal_entity:
+        queryset = queryset.filter(Q(receiver=legal_entity) | Q(sender=legal_entity))
+    # Dates bound local days; comparing the column to midnights keeps the
+    # created_date indexes usable, unlike created_date__date.
+    if start_date:
+        queryset = queryset.filter(created_date__gte=day_start(start_date))
+    if end_date:
+        queryset = queryset.filter(
+            created_date__lt=day_start(end_date + datetime.timedelta(days=1))
+        )
+    if q:
+        queryset = search_applications(queryset, q)
+    return queryset
+
+
+def sorts_by_sum(sort_by_sum):
+    return sort_by_sum in ("asc", "desc")
+
+
+def _application_sort(sort_by_sum):
+    if sorts_by_sum(sort_by_sum):
+        return "initial_sum", sort_by_sum == "desc"
+    return "created_date", True
+
+
+def application_paginator(queryset, sort_by_sum=None, per_page=50):
+    field, descending = _application_sort(sort_by_sum)
+    return KeysetPaginator(queryset, field, descending=descending, per_page=per_page)
+
+
+def application_export_queryset(queryset, sort_by_sum=None, ranked=False):
+    """Rows of ``APPLICATION_EXPORT_COLUMNS`` in ``application_list`` order.
+
+    With ``ranked``, search results keep their rank order unless sorted by sum.
+    """
+    if not ranked or sorts_by_sum(sort_by_sum):
+        field, descending = _application_sort(sort_by_sum)
+        prefix = "-" if descending else ""
+        queryset = queryset.order_by(f"{prefix}{field}", f"{prefix}pk")
+    return queryset.values_list(*(column for column, _ in APPLICATION_EXPORT_COLUMNS))
+
+
+def application_export_rows(params):
+    """Export rows of the applications ``application_list`` shows for ``params``."""
+    applications = Application.objects.all()
+    filter_form = ApplicationFilterForm(params)
+    searching = False
+    if filter_form.is_valid():
+        applications = filter_applications(applications, **filter_form.cleaned_data)
+        searching = bool(filter_form.cleaned_data["q"])
+    return application_export_queryset(
+        applications, params.get("sort_by_sum"), ranked=searching
+    )
+
+
+def payment_paginator(
+    queryset, sort_by_amount=None, sort_by_created_at=None, per_page=50
+):
+    """Keyset pages of incomes or outcomes, newest first unless sorted.
+
+    Sorting by date wins over sorting by amount.
+    """
+    if sort_by_created_at:
+        field, descending = "created_at", sort_by_created_at == "desc"
+    elif sort_by_amount:
+        field, descending = "amount", sort_by_amount == "desc"
+    else:
+        field, descending = "created_at", True
+    return KeysetPaginator(queryset, field, descending=descending, per_page=per_page)
+
+
+def income_list_queryset(queryset):
+    return queryset.select_related("executor").only(
+        "id", "amount", "created_at", "executor__name"
+    )
+
+
+def outcome_list_queryset(queryset):
+    return queryset.select_related("customer").only(
+        "id", "amount", "created_at", "customer__name"
+    )
+
+
+def legal_entity_list_queryset(queryset):
+    return queryset.select_related("partner").only(
+        "id", "name", "tax_number", "legal_entity_percentage", "partner__name"
+    )
+
+
+def partner_list_queryset(queryset):
+    return queryset.only("id", "name", "referral_percentage", "is_executor").order_by(
+        "name"
+    )
@@ -0,0 +1,48 @@
+from django.db import transaction
+
+from . import money
+from .caching import bump_generation
+from .models import Application
+from .querysets import filter_applications
+
+
+def applications_to_recalculate(
+    executor=None, customer=None, start_date=None, end_date=None, status=None
+):
+    applications = filter_applications(
+        Application.objects.exclude(executor=None),
+        customer=customer,
+        executor=executor,
+        start_date=start_date,
+        end_date=end_date,
+    )
+    if status:
+        applications = applications.filter(status=status)
+    return applications
+
+
+def recalculate_applications(chunk_size=None, progress=None, **filters):
+    """Recompute derived amounts with the executor's current referral rate.
+
+    Without ``chunk_size`` this is a single ``UPDATE``; with it, rows are
+    updated in primary-key batches, each in its own transaction, so long
+    runs do not hold locks on the whole table, and ``progress`` is called
+    with the rows done and the total after each batch. Returns the row count.
+    """
+    applications = applications_to_recalculate(**filters)
+    if not chunk_size:
+        updated = money.recalculate(applications)
+    else:
+        updated = 0
+        total = applications.count() if progress else None
+        pks = applications.order_by("pk").values_list("pk", flat=True)
+        # Each batch is read on its own rather than from one open cursor, so
+        # no read snapshot spans the writes.
+        while batch := list(pks[:chunk_size]):
+            with transaction.atomic():
+                updated += money.recalculate(Application.objects.filter(pk__in=batch))
+            if progress:
+                progress(updated, total)
+            pks = pks.filter(pk__gt=batch[-1])
+    bump_generation(Application)
+    return updated
@@ -0,0 +1,279 @@
+"""Daily and monthly application rollups for reporting.
+
+``ApplicationDailyRollup`` holds, per day of ``created_date``, the totals of
+every executor, every customer and every status; the monthly table is summed
+from the daily one. A day is always recomputed as a whole, so an application
+moving to another partner or status can't be counted twice.
+
+``refresh`` finds the days to recompute from applications whose
+``updated_at`` is past the stored watermark. Deleted rows leave no such
+trace, so the delete signals refresh their days when the transaction
+commits. Reports only ever read the rollup tables.
+"""
+
+import datetime
+import threading
+import weakref
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+from .models import (
+    Application,
+    ApplicationDailyRollup,
+    ApplicationMonthlyRollup,
+    RollupDimension,
+    RollupWatermark,
+)
+
+WATERMARK = "applications"
+# Rows committed late with an older updated_at are still picked up as long
+# as their transaction took less than this.
+WATERMARK_OVERLAP = datetime.timedelta(minutes=5)
+DAYS_PER_QUERY = 100
+MEASURES = ("initial_sum", "uncargo_sum", "clean_income")
+DIMENSION_FIELDS = {
+    RollupDimension.EXECUTOR: "executor_id",
+    RollupDimension.CUSTOMER: "customer_id",
+    RollupDimension.STATUS: "status",
+}
+NO_NAMES = {
+    RollupDimension.EXECUTOR: "Нет исполнителя",
+    RollupDimension.CUSTOMER: "Нет заказчика",
+    RollupDimension.STATUS: "Без статуса",
+}
+ROLLUPS = {"day": ApplicationDailyRollup, "month": ApplicationMonthlyRollup}
+
+# Weak reference to the days waiting for the current transaction, see
+# refresh_days_on_commit().
+_pending = threading.local()
+
+
+def _midnight(day):
+    return datetime.datetime.combine(
+        day, datetime.time.min, tzinfo=timezone.get_current_timezone()
+    )
+
+
+def _next_month(month):
+    return (month + datetime.timedelta(days=32)).replace(day=1)
+
+
+def _ranges(starts, step):
+    """Merge consecutive ``starts`` into ``[start, end)`` ranges."""
+    ranges = []
+    for start in sorted(starts):
+        if ranges and ranges[-1][1] == start:
+            ranges[-1][1] = step(start)
+        else:
+            ranges.append([start, step(start)])
+    return ranges
+
+
+def _created_on(days):
+    condition = Q()
+    for start, end in _ranges(days, lambda day: day + datetime.timedelta(days=1)):
+        condition |= Q(
+            created_date__gte=_midnight(start), created_date__lt=_midnight(end)
+        )
+    return condition
+
+
+def _daily(applications):
+    applications = applications.order_by().annotate(period=TruncDate("created_date"))
+    for dimension, field in DIMENSION_FIELDS.items():
+        rows = applications.values("period", field).annotate(
+            applications=Count("pk"), **{measure: Sum(measure) for measure in MEASURES}
+        )
+        is_status = dimension == RollupDimension.STATUS
+        for row in rows:
+            yield ApplicationDailyRollup(
+                bucket=row["period"],
+                dimension=dimension,
+                partner_id=None if is_status else row[field],
+                status=row[field] if is_status else "",
+                applications=row["applications"],
+                **{measure: row[measure] for measure in MEASURES},
+            )
+
+
+def _monthly(daily):
+    rows = (
+        daily.order_by()
+        .annotate(period=TruncMonth("bucket"))
+        .values("period", "dimension", "partner_id", "status")
+        .annotate(
+            applications_total=Sum("applications"),
+            **{f"{measure}_total": Sum(measure) for measure in MEASURES},
+        )
+    )
+    for row in rows:
+        yield ApplicationMonthlyRollup(
+            bucket=row["period"],
+            dimension=row["dimension"],
+            partner_id=row["partner_id"],
+            status=row["status"],
+            applications=row["applications_total"],
+            **{measure: row[f"{measure}_total"] for measure in MEASURES},
+        )
+
+
+def _lock():
+    watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(
+        name=WATERMARK
+    )
+    return watermark
+
+
+def _refresh_days(days):
+    days = iter(sorted(days))
+    months = set()
+    while batch := list(islice(days, DAYS_PER_QUERY)):
+        ApplicationDailyRollup.objects.filter(bucket__in=batch).delete()
+        ApplicationDailyRollup.objects.bulk_create(
+            _daily(Application.objects.filter(_created_on(batch))), batch_size=1000
+        )
+        months.update(day.replace(day=1) for day in batch)
+
+    ranges = _ranges(months, _next_month)
+    for start, end in ranges:
+        ApplicationMonthlyRollup.objects.filter(
+            bucket__gte=start, bucket__lt=end
+        ).delete()
+        ApplicationMonthlyRollup.objects.bulk_create(
+            _monthly(
+                ApplicationDailyRollup.objects.filter(bucket__gte=start, bucket__lt=end)
+            ),
+            batch_size=1000,
+        )
+
+
+def refresh_days(days):
+    """Recompute the rollups of ``days`` and the months they fall in."""
+    days = set(days)
+    if not days:
+        return
+    with transaction.atomic():
+        watermark = _lock()
+        _refresh_days(days)
+        watermark.refreshed_at = timezone.now()
+        watermark.save(update_fields=["refreshed_at"])
+
+
+def refresh_days_on_commit(days):
+    """Refresh ``days`` once, when the current transaction commits.
+
+    Deleting many applications calls this for each row; the days pile up
+    and the first commit hook refreshes them all, the others find nothing
+    left. Outside a transaction the refresh runs right away.
+
+    Only the transaction's commit hooks hold the pending days. A commit or a
+    rollback drops the hooks and the days with them, so days of a rolled
+    back transaction never reach the next one.
+    """
+    pending = getattr(_pending, "ref", lambda: None)()
+    if pending is None:
+        pending = _PendingDays()
+        _pending.ref = weakref.ref(pending)
+    pending.days.update(days)
+    transaction.on_commit(pending)
+
+
+class _PendingDays:
+    def __init__(self):
+        self.days = set()
+
+    def __call__(self):
+        days, self.days = self.days, set()
+        if days:
+            refresh_days(days)
+
+
+def application_days(applications):
+    """The days of ``created_date`` of ``applications``."""
+    return set(
+        applications.annotate(day=TruncDate("created_date"))
+        .order_by()
+        .values_list("day", flat=True)
+        .distinct()
+    )
+
+
+def refresh(full=False):
+    """Fold applications changed since the watermark into the rollups.
+
+    Returns the number of days recomputed, or ``None`` after a full rebuild.
+    """
+    with transaction.atomic():
+        watermark = _lock()
+        latest = Application.objects.aggregate(latest=Max("updated_at"))["latest"]
+        if full or watermark.value is None:
+            ApplicationDailyRollup.objects.all().delete()
+            ApplicationMonthlyRollup.objects.all().delete()
+            ApplicationDailyRollup.objects.bulk_create(
+                _daily(Application.objects.all()), batch_size=1000
+            )
+            ApplicationMonthlyRollup.objects.bulk_create(
+                _monthly(ApplicationDailyRollup.objects.all()), batch_size=1000
+            )
+            refreshed = None
+        else:
+            days = set(
+                Application.objects.filter(
+                    updated_at__gte=watermark.value - WATERMARK_OVERLAP
+                )
+                .annotate(day=TruncDate("created_date"))
+                .order_by()
+                .values_list("day", flat=True)
+                .distinct()
+            )
+            _refresh_days(days)
+            refreshed = len(days)
+
+        watermark.value = latest or watermark.value
+        watermark.refreshed_at = timezone.now()
+        watermark.save()
+    return refreshed
+
+
+def refreshed_at():
+    return (
+        RollupWatermark.objects.filter(name=WATERMARK)
+        .values_list("refreshed_at", flat=True)
+        .first()
+    )
+
+
+def report(period, dimension, start_date=None, end_date=None):
+    """Rollup rows of ``dimension`` per ``period`` bucket, oldest first."""
+    rows = ROLLUPS[period].objects.filter(dimension=dimension)
+    if start_date and period == "month":
+        start_date = start_date.replace(day=1)
+    if start_date:
+        rows = rows.filter(bucket__gte=start_date)
+    if end_date:
+        rows = rows.filter(bucket__lte=end_date)
+    rows = rows.order_by("bucket", "partner__name", "status").values_list(
+        "bucket", "partner_id", "partner__name", "status", "applications", *MEASURES
+    )
+    return [
+        {
+            "bucket": bucket,
+            "partner_id": partner_id,
+            "name": name or status or NO_NAMES[dimension],
+            "applications": applications,
+            **dict(zip(MEASURES, measures)),
+        }
+        for bucket, partner_id, name, status, applications, *measures in rows
+    ]
+
+
+def totals(rows):
+    result = dict.fromkeys(("applications", *MEASURES), 0)
+    for row in rows:
+        for key in result:
+            result[key] += row[key]
+    return result
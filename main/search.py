@@ -0,0 +1,192 @@
+"""Ranked search over applications, partners and legal entities.
+
+On PostgreSQL, application comments are matched with full-text search
+against a GIN index on ``to_tsvector('russian', comment)``, and partner and
+legal entity names and tax numbers by trigram word similarity against
+``gin_trgm_ops`` indexes (migration 0007). SQLite gets FTS5 tables with the
+trigram tokenizer, kept in sync by triggers that ``ensure_sqlite_index``
+installs after every migrate, since Django drops triggers whenever it
+rebuilds a table. Other databases fall back to ``icontains``.
+"""
+
+import logging
+
+from django.db import connection, connections
+from django.db.models import Case, F, Func, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Greatest
+
+from .models import Application, LegalEntity, Partner
+
+logger = logging.getLogger(__name__)
+
+MIN_QUERY_LENGTH = 3
+SEARCH_LIMIT = 100
+FULL_TEXT_CONFIG = "russian"
+SEARCH_FIELDS = {
+    Application: ("comment",),
+    Partner: ("name",),
+    LegalEntity: ("name", "tax_number"),
+}
+
+
+def _columns(model):
+    return [model._meta.get_field(field).column for field in SEARCH_FIELDS[model]]
+
+
+def fts_table(model):
+    return f"{model._meta.db_table}_search"
+
+
+def _fts_query(text):
+    """FTS5 query matching rows containing every word of ``text``."""
+    words = [word for word in text.split() if len(word) >= MIN_QUERY_LENGTH]
+    return " ".join('"{}"'.format(word.replace('"', '""')) for word in words)
+
+
+def _sqlite_match(model, text):
+    query = _fts_query(text)
+    if not query:
+        return Q(pk__in=[]), Value(0.0)
+    table = connection.ops.quote_name(model._meta.db_table)
+    fts = connection.ops.quote_name(fts_table(model))
+    matches = RawSQL(
+        f"SELECT t.{connection.ops.quote_name(model._meta.pk.column)} "
+        f"FROM {table} t JOIN {fts} ON {fts}.rowid = t.rowid "
+        f"WHERE {fts} MATCH %s",
+        [query],
+    )
+    # A correlated bm25() subquery would rerun the full-text query for every
+    # matching row; local runs settle for matches before non-matches.
+    condition = Q(pk__in=matches)
+    return condition, Case(When(condition, then=1.0), default=0.0)
+
+
+def _postgres_match(model, text):
+    from django.contrib.postgres.search import (
+        SearchQuery,
+        SearchRank,
+        SearchVectorExact,
+        SearchVectorField,
+        TrigramWordSimilarity,
+    )
+
+    if model is Application:
+        # Must match the indexed expression exactly.
+        document = Func(
+            F("comment"),
+            template=f"to_tsvector('{FULL_TEXT_CONFIG}', %(expressions)s)",
+            output_field=SearchVectorField(),
+        )
+        query = SearchQuery(text, config=FULL_TEXT_CONFIG, search_type="websearch")
+        return Q(SearchVectorExact(document, query)), SearchRank(document, query)
+
+    fields = SEARCH_FIELDS[model]
+    condition = Q()
+    for field in fields:
+        condition |= Q(**{f"{field}__trigram_word_similar": text})
+    ranks = [TrigramWordSimilarity(text, field) for field in fields]
+    return condition, Greatest(*ranks) if len(ranks) > 1 else ranks[0]
+
+
+def _fallback_match(model, text):
+    condition = Q()
+    for field in SEARCH_FIELDS[model]:
+        condition |= Q(**{f"{field}__icontains": text})
+    return condition, Value(0.0)
+
+
+def match(model, text):
+    """Return ``(condition, rank)`` expressions for rows of ``model`` matching ``text``."""
+    if connection.vendor == "postgresql":
+        return _postgres_match(model, text)
+    if connection.vendor == "sqlite":
+        return _sqlite_match(model, text)
+    return _fallback_match(model, text)
+
+
+def matching_ids(model, text):
+    condition, _ = match(model, text)
+    return model.objects.filter(condition).values("pk")
+
+
+def search_legal_entities(queryset, text):
+    """Legal entities by name, tax number or partner name, best first."""
+    condition, rank = match(LegalEntity, text)
+    condition |= Q(partner__in=matching_ids(Partner, text))
+    return (
+        queryset.filter(condition)
+        .annotate(search_rank=rank)
+        .order_by("-search_rank", "name")
+    )
+
+
+def search_applications(queryset, text):
+    """Applications by comment or by a partner or legal entity, best first."""
+    condition, rank = match(Application, text)
+    partners = matching_ids(Partner, text)
+    legal_entities = matching_ids(LegalEntity, text)
+    condition |= (
+        Q(customer__in=partners)
+        | Q(executor__in=partners)
+        | Q(sender__in=legal_entities)
+        | Q(receiver__in=legal_entities)
+    )
+    return (
+        queryset.filter(condition)
+        .annotate(search_rank=rank)
+        .order_by("-search_rank", "-created_date", "-pk")
+    )
+
+
+def ensure_sqlite_index(using):
+    """Create missing FTS5 tables and triggers and rebuild their contents."""
+    database = connections[using]
+    if database.vendor != "sqlite":
+        return
+    quote = database.ops.quote_name
+    with database.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"
+        )
+        existing = {name for (name,) in cursor.fetchall()}
+        for model in SEARCH_FIELDS:
+            table, fts = model._meta.db_table, fts_table(model)
+            triggers = [f"{fts}_insert", f"{fts}_delete", f"{fts}_update"]
+            if table not in existing or {fts, *triggers} <= existing:
+                continue
+
+            columns = _columns(model)
+            names = ", ".join(quote(column) for column in columns)
+            new = ", ".join(f"new.{quote(column)}" for column in columns)
+            old = ", ".join(f"old.{quote(column)}" for column in columns)
+            delete = (
+                f"INSERT INTO {quote(fts)} ({quote(fts)}, rowid, {names}) "
+                f"VALUES ('delete', old.rowid, {old});"
+            )
+            insert = (
+                f"INSERT INTO {quote(fts)} (rowid, {names}) VALUES (new.rowid, {new});"
+            )
+            for trigger in triggers:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {quote(trigger)}")
+            cursor.execute(f"DROP TABLE IF EXISTS {quote(fts)}")
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {quote(fts)} USING fts5({names}, "
+                f"content='{table}', tokenize='trigram')"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER {quote(triggers[0])} AFTER INSERT ON {quote(table)} "
+                f"BEGIN {insert} END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER {quote(triggers[1])} AFTER DELETE ON {quote(table)} "
+                f"BEGIN {delete} END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER {quote(triggers[2])} AFTER UPDATE OF {names} "
+                f"ON {quote(table)} BEGIN {delete} {insert} END"
+            )
+            cursor.execute(
+                f"INSERT INTO {quote(fts)} ({quote(fts)}) VALUES ('rebuild')"
+            )
+            logger.info("Rebuilt search index %s", fts)
@@ -0,0 +1,180 @@
+"""Reproducible synthetic data for load testing.
+
+Every row is derived from ``(seed, model, index)`` alone, so chunks can be
+generated in any order, by any process, and still reference each other:
+partner ``i`` has the same id and referral percentage wherever it is looked
+up. Even-indexed partners are executors, odd-indexed ones customers.
+Faker output is expensive, so names and texts are drawn from pools built
+once per process.
+"""
+
+import csv
+import hashlib
+import io
+import random
+import uuid
+from functools import lru_cache
+
+from django.db import connection
+from faker import Faker
+
+from .models import Application, ApplicationChoices, Income, LegalEntity, Outcome
+from .models import Partner
+from .money import derived_amounts
+
+POOL_SIZE = 1000
+STATUSES = [choice.value for choice in ApplicationChoices]
+
+
+def _rng(seed, label, index):
+    return random.Random(f"{seed}:{label}:{index}")
+
+
+def _uuid(seed, label, index):
+    digest = hashlib.md5(f"{seed}:{label}:{index}".encode()).digest()
+    return uuid.UUID(bytes=digest, version=4)
+
+
+@lru_cache
+def _pools(seed):
+    fake = Faker("ru_RU")
+    fake.seed_instance(seed)
+    return {
+        "companies": [fake.company() for _ in range(POOL_SIZE)],
+        "tax_numbers": [fake.ssn() for _ in range(POOL_SIZE)],
+        "comments": [fake.text(max_nb_chars=200) for _ in range(POOL_SIZE)],
+    }
+
+
+def partner_id(seed, index):
+    return _uuid(seed, "partner", index)
+
+
+def partner_referral_percentage(seed, index):
+    return _rng(seed, "partner", index).randint(0, 100)
+
+
+def _executor_index(rng, counts):
+    return 2 * rng.randrange((counts["partners"] + 1) // 2)
+
+
+def _customer_index(rng, counts):
+    return 2 * rng.randrange(counts["partners"] // 2) + 1
+
+
+def _legal_entity_id(seed, rng, counts):
+    return _uuid(seed, "legal_entity", rng.randrange(counts["legal_entities"]))
+
+
+def build_partner(seed, index, counts):
+    companies = _pools(seed)["companies"]
+    return Partner(
+        id=partner_id(seed, index),
+        name=f"{companies[index % POOL_SIZE]} {seed}-{index}",
+        referral_percentage=partner_referral_percentage(seed, index),
+        is_executor=index % 2 == 0,
+    )
+
+
+def build_legal_entity(seed, index, counts):
+    rng = _rng(seed, "legal_entity", index)
+    pools = _pools(seed)
+    return LegalEntity(
+        id=_uuid(seed, "legal_entity", index),
+        name=f"{rng.choice(pools['companies'])} {seed}-{index}",
+        partner_id=partner_id(seed, rng.randrange(counts["partners"])),
+        tax_number=rng.choice(pools["tax_numbers"]),
+        legal_entity_percentage=rng.randint(0, 100),
+    )
+
+
+def build_income(seed, index, counts):
+    rng = _rng(seed, "income", index)
+    return Income(
+        id=_uuid(seed, "income", index),
+        executor_id=partner_id(seed, _executor_index(rng, counts)),
+        amount=rng.randint(0, 100),
+    )
+
+
+def build_outcome(seed, index, counts):
+    rng = _rng(seed, "outcome", index)
+    return Outcome(
+        id=_uuid(seed, "outcome", index),
+        customer_id=partner_id(seed, _customer_index(rng, counts)),
+        amount=rng.randint(500, 10000),
+    )
+
+
+def build_application(seed, index, counts):
+    rng = _rng(seed, "application", index)
+    executor = _executor_index(rng, counts)
+    rate = partner_referral_percentage(seed, executor)
+    initial_sum = rng.randint(5000, 15000)
+    commission_with_interest = rng.randint(500, 2000)
+    return Application(
+        id=_uuid(seed, "application", index),
+        status=rng.choice(STATUSES),
+        customer_id=partner_id(seed, _customer_index(rng, counts)),
+        executor_id=partner_id(seed, executor),
+        giving_side_id=partner_id(seed, _executor_index(rng, counts)),
+        receiver_id=_legal_entity_id(seed, rng, counts),
+        sender_id=_legal_entity_id(seed, rng, counts),
+        initial_sum=initial_sum,
+        executor_commission=rate,
+        commission_with_interest=commission_with_interest,
+        comment=rng.choice(_pools(seed)["comments"]),
+        is_documents=rng.random() < 0.5,
+        **derived_amounts(initial_sum, rate, commission_with_interest, rate),
+    )
+
+
+# In insertion order: each model only references the ones before it.
+BUILDERS = {
+    "partners": build_partner,
+    "legal_entities": build_legal_entity,
+    "incomes": build_income,
+    "outcomes": build_outcome,
+    "applications": build_application,
+}
+
+
+def _copy_value(value):
+    return r"\N" if value is None else value
+
+
+def copy_rows(model, objs):
+    """Insert ``objs`` with PostgreSQL ``COPY ... FROM STDIN``."""
+    fields = model._meta.concrete_fields
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for obj in objs:
+        writer.writerow(
+            [
+                _copy_value(
+                    field.get_db_prep_save(field.pre_save(obj, True), connection)
+                )
+                for field in fields
+            ]
+        )
+    buffer.seek(0)
+
+    quote_name = connection.ops.quote_name
+    columns = ", ".join(quote_name(field.column) for field in fields)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {quote_name(model._meta.db_table)} ({columns}) "
+            f"FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer,
+        )
+
+
+def seed_chunk(kind, start, stop, seed, counts, method="bulk"):
+    """Build rows ``start:stop`` of ``kind`` and insert them; return the count."""
+    build = BUILDERS[kind]
+    objs = [build(seed, index, counts) for index in range(start, stop)]
+    if method == "copy":
+        copy_rows(type(objs[0]), objs)
+    else:
+        type(objs[0]).objects.bulk_create(objs)
+    return len(objs)
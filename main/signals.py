@@ -0,0 +1,212 @@
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import (
+    post_delete,
+    post_migrate,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+from django_otp.models import Device
+
+from . import balances, jobs, reporting, search
+from .caching import bump_generation
+from .middleware import bump_user_devices
+from .money import to_decimal
+from .models import (
+    Application,
+    Income,
+    LegalEntity,
+    Outcome,
+    Partner,
+    PartnerBalance,
+)
+
+
+def _previous(sender, instance, *fields):
+    if instance.pk is None:
+        return None
+    return sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+@receiver(pre_save, sender=Partner)
+def remember_partner(sender, instance, **kwargs):
+    instance._recalculation_previous = _previous(
+        sender, instance, "referral_percentage"
+    )
+
+
+@receiver(post_save, sender=Partner)
+def create_partner_balance(sender, instance, created, **kwargs):
+    if created:
+        PartnerBalance.objects.get_or_create(partner=instance)
+
+
+@receiver(post_save, sender=Partner)
+def recalculate_partner_applications(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_recalculation_previous", None)
+    if previous and previous["referral_percentage"] != instance.referral_percentage:
+        transaction.on_commit(
+            lambda: jobs.enqueue(
+                "recalculate_applications",
+                {"executor": str(instance.pk)},
+                key=f"executor:{instance.pk}",
+            )
+        )
+
+
+@receiver(pre_delete, sender=Partner)
+def remember_partner_counterparties(sender, instance, **kwargs):
+    # Deleting a partner nulls its applications through SET_NULL, which
+    # sends no signals, so the counterparties are recomputed afterwards.
+    instance._balance_counterparties = list(
+        Application.objects.filter(executor_id=instance.pk)
+        .exclude(customer_id=None)
+        .values_list("customer_id", flat=True)
+        .union(
+            Application.objects.filter(customer_id=instance.pk)
+            .exclude(executor_id=None)
+            .values_list("executor_id", flat=True)
+        )
+    )
+
+
+@receiver(post_delete, sender=Partner)
+def rebuild_partner_counterparties(sender, instance, **kwargs):
+    counterparties = getattr(instance, "_balance_counterparties", None)
+    if counterparties:
+        balances.rebuild(partner_ids=counterparties)
+
+
+@receiver(pre_delete, sender=Partner)
+def remember_partner_rollup_days(sender, instance, **kwargs):
+    # The partner's applications move to the "no partner" rollups without
+    # touching updated_at.
+    instance._rollup_days = reporting.application_days(
+        Application.objects.filter(
+            Q(executor_id=instance.pk) | Q(customer_id=instance.pk)
+        )
+    )
+
+
+@receiver(post_delete, sender=Partner)
+def refresh_partner_rollups(sender, instance, **kwargs):
+    days = getattr(instance, "_rollup_days", None)
+    if days:
+        reporting.refresh_days_on_commit(days)
+
+
+@receiver(pre_save, sender=Income)
+def remember_income(sender, instance, **kwargs):
+    instance._balance_previous = _previous(sender, instance, "executor_id", "amount")
+
+
+@receiver(post_save, sender=Income)
+def update_income_balance(sender, instance, **kwargs):
+    previous = getattr(instance, "_balance_previous", None)
+    if previous and previous["executor_id"] == instance.executor_id:
+        balances.apply_income(
+            instance.executor_id, to_decimal(instance.amount) - previous["amount"]
+        )
+        return
+    if previous:
+        balances.apply_income(previous["executor_id"], -previous["amount"])
+    balances.apply_income(instance.executor_id, to_decimal(instance.amount))
+
+
+@receiver(post_delete, sender=Income)
+def delete_income_balance(sender, instance, **kwargs):
+    balances.apply_income(instance.executor_id, -to_decimal(instance.amount))
+
+
+@receiver(pre_save, sender=Outcome)
+def remember_outcome(sender, instance, **kwargs):
+    instance._balance_previous = _previous(sender, instance, "customer_id", "amount")
+
+
+@receiver(post_save, sender=Outcome)
+def update_outcome_balance(sender, instance, **kwargs):
+    previous = getattr(instance, "_balance_previous", None)
+    if previous and previous["customer_id"] == instance.customer_id:
+        balances.apply_outcome(
+            instance.customer_id, to_decimal(instance.amount) - previous["amount"]
+        )
+        return
+    if previous:
+        balances.apply_outcome(previous["customer_id"], -previous["amount"])
+    balances.apply_outcome(instance.customer_id, to_decimal(instance.amount))
+
+
+@receiver(post_delete, sender=Outcome)
+def delete_outcome_balance(sender, instance, **kwargs):
+    balances.apply_outcome(instance.customer_id, -to_decimal(instance.amount))
+
+
+@receiver(pre_save, sender=Application)
+def remember_application(sender, instance, **kwargs):
+    instance._balance_previous = _previous(
+        sender, instance, "executor_id", "customer_id"
+    )
+
+
+@receiver(post_save, sender=Application)
+def update_application_balance(sender, instance, **kwargs):
+    previous = getattr(instance, "_balance_previous", None)
+    if previous == {
+        "executor_id": instance.executor_id,
+        "customer_id": instance.customer_id,
+    }:
+        return
+    if previous:
+        balances.apply_application(
+            instance.pk, previous["executor_id"], previous["customer_id"], -1
+        )
+    balances.apply_application(
+        instance.pk, instance.executor_id, instance.customer_id, 1
+    )
+
+
+@receiver(post_delete, sender=Application)
+def delete_application_balance(sender, instance, **kwargs):
+    balances.apply_application(
+        instance.pk, instance.executor_id, instance.customer_id, -1
+    )
+
+
+@receiver(post_delete, sender=Application)
+def refresh_application_rollups(sender, instance, **kwargs):
+    reporting.refresh_days_on_commit([timezone.localdate(instance.created_date)])
+
+
+@receiver(post_save, sender=Partner)
+@receiver(post_delete, sender=Partner)
+@receiver(post_save, sender=LegalEntity)
+@receiver(post_delete, sender=LegalEntity)
+@receiver(post_save, sender=Income)
+@receiver(post_delete, sender=Income)
+@receiver(post_save, sender=Outcome)
+@receiver(post_delete, sender=Outcome)
+@receiver(post_save, sender=Application)
+@receiver(post_delete, sender=Application)
+def invalidate_cached_rows(sender, **kwargs):
+    bump_generation(sender)
+
+
+def invalidate_otp_verification(sender, instance, **kwargs):
+    bump_user_devices(instance.user_id)
+
+
+# Each installed django_otp plugin has a device model of its own.
+for device_model in apps.get_models():
+    if issubclass(device_model, Device):
+        post_save.connect(invalidate_otp_verification, sender=device_model)
+        post_delete.connect(invalidate_otp_verification, sender=device_model)
+
+
+@receiver(post_migrate)
+def ensure_search_index(sender, using, **kwargs):
+    if sender.name == "main":
+        search.ensure_sqlite_index(using)
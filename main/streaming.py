@@ -0,0 +1,108 @@
+import csv
+import io
+import json
+from collections.abc import AsyncIterator, Iterator
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+STREAM_CHUNK_SIZE = 2000
+
+
+def _dumps(value):
+    return json.dumps(value, cls=DjangoJSONEncoder)
+
+
+def json_array(items, batch_size=STREAM_CHUNK_SIZE):
+    """Encode ``items`` as a JSON array, one batch of elements per chunk."""
+    items = iter(items)
+    separator = "["
+    while batch := list(islice(items, batch_size)):
+        yield separator + ",".join(_dumps(item) for item in batch)
+        separator = ","
+    yield "[]" if separator == "[" else "]"
+
+
+def json_object(members):
+    """Encode ``(key, value)`` pairs as a JSON object.
+
+    Iterator values are streamed as arrays. ``members`` is consumed lazily,
+    so a generator may yield values computed while earlier arrays streamed.
+    """
+    separator = "{"
+    for key, value in members:
+        yield f"{separator}{_dumps(key)}:"
+        if isinstance(value, Iterator):
+            yield from json_array(value)
+        else:
+            yield _dumps(value)
+        separator = ","
+    yield "{}" if separator == "{" else "}"
+
+
+async def ajson_array(items, batch_size=STREAM_CHUNK_SIZE):
+    """``json_array`` over an async iterator."""
+    separator = "["
+    batch = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield separator + ",".join(_dumps(item) for item in batch)
+            separator = ","
+            batch = []
+    if batch:
+        yield separator + ",".join(_dumps(item) for item in batch)
+        separator = ","
+    yield "[]" if separator == "[" else "]"
+
+
+async def ajson_object(members):
+    """``json_object`` over an async iterator of pairs.
+
+    Async iterator values are streamed as arrays.
+    """
+    separator = "{"
+    async for key, value in members:
+        yield f"{separator}{_dumps(key)}:"
+        if isinstance(value, AsyncIterator):
+            async for chunk in ajson_array(value):
+                yield chunk
+        else:
+            yield _dumps(value)
+        separator = ","
+    yield "{}" if separator == "{" else "}"
+
+
+class StreamingJsonResponse(StreamingHttpResponse):
+    def __init__(self, chunks, **kwargs):
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(chunks, **kwargs)
+
+
+def csv_rows(header, rows, batch_size=STREAM_CHUNK_SIZE):
+    """Encode ``rows`` as CSV, one batch of rows per chunk.
+
+    The header goes out before ``rows`` is first consumed, so the client gets
+    bytes before the query runs. A byte order mark lets Excel detect UTF-8.
+    """
+    rows = iter(rows)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(header)
+    while True:
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        writer.writerows(batch)
+
+
+class StreamingCsvResponse(StreamingHttpResponse):
+    def __init__(self, chunks, filename, **kwargs):
+        kwargs.setdefault("content_type", "text/csv; charset=utf-8")
+        super().__init__(chunks, **kwargs)
+        self["Content-Disposition"] = f'attachment; filename="{filename}"'
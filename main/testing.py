@@ -0,0 +1,47 @@
+import tempfile
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+
+
+@contextmanager
+def temporary_cache():
+    """Point the default cache at a new file cache, deleted afterwards.
+
+    The cache is shared between processes like the configured one, but
+    nothing written to it reaches the running site.
+    """
+    with tempfile.TemporaryDirectory() as location:
+        with override_settings(
+            CACHES={
+                "default": {
+                    "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                    "LOCATION": location,
+                }
+            }
+        ):
+            yield
+
+
+class QueryCountAssertionsMixin:
+    """TestCase mixin for catching N+1 regressions in views and querysets."""
+
+    def assertConstantQueries(self, func, add_rows, rounds=2):
+        """Assert ``func`` runs the same number of queries as rows are added.
+
+        ``add_rows`` is called before every measurement to grow the data set;
+        a view that loads relations per row fails on the second round.
+        """
+        counts = []
+        for _ in range(rounds):
+            add_rows()
+            with CaptureQueriesContext(connection) as context:
+                func()
+            counts.append(len(context.captured_queries))
+        self.assertEqual(
+            len(set(counts)),
+            1,
+            f"Query count grew with row count: {counts}",
+        )
+        return counts[0]
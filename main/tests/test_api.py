@@ -0,0 +1,95 @@
+import datetime
+import json
+import uuid
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from main import api
+from main.benchmarking import verified_client
+from main.models import Income, Partner
+
+
+def partner(name, is_executor=True):
+    return Partner.objects.create(
+        id=uuid.uuid4(), name=name, referral_percentage=5, is_executor=is_executor
+    )
+
+
+class ApiListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.executor = partner("Исполнитель")
+        cls.customer = partner("Заказчик", is_executor=False)
+        cls.incomes = [
+            Income.objects.create(id=uuid.uuid4(), executor=cls.executor, amount=10),
+            Income.objects.create(
+                id=uuid.uuid4(), executor=partner("Другой"), amount=5
+            ),
+        ]
+
+    def setUp(self):
+        self.client = verified_client()
+
+    def get(self, resource, status=200, **params):
+        response = self.client.get(reverse("main:api_list", args=[resource]), params)
+        self.assertEqual(response.status_code, status)
+        if response.streaming:
+            return json.loads(b"".join(response.streaming_content))
+        return json.loads(response.content)
+
+    def test_fields_and_count(self):
+        data = self.get("partners", fields="name,is_executor", is_executor="true")
+        self.assertEqual(data["count"], 2)
+        self.assertEqual(
+            sorted(row["name"] for row in data["results"]), ["Другой", "Исполнитель"]
+        )
+        self.assertEqual(set(data["results"][0]), {"id", "name", "is_executor"})
+
+    def test_partner_scope(self):
+        data = self.get("incomes", partner_id=self.executor.pk)
+        self.assertEqual(data["count"], 1)
+        self.assertEqual(data["results"][0]["id"], str(self.incomes[0].pk))
+
+    def test_invalid_parameters(self):
+        for params in (
+            {"fields": "nope"},
+            {"partner_id": "nope"},
+            {"updated_since": "yesterday"},
+            {"is_executor": "maybe"},
+        ):
+            self.assertIn("error", self.get("partners", status=400, **params), params)
+        response = self.client.get(reverse("main:api_list", args=["nope"]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_not_modified(self):
+        response = self.client.get(reverse("main:api_list", args=["partners"]))
+        response = self.client.get(
+            reverse("main:api_list", args=["partners"]),
+            HTTP_IF_NONE_MATCH=response["ETag"],
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_updated_since(self):
+        since = timezone.now()
+        old = since - api.UPDATED_SINCE_OVERLAP - datetime.timedelta(seconds=1)
+        # Saved before the sync, committed after it: still sent.
+        late = since - datetime.timedelta(seconds=30)
+        Partner.objects.filter(pk=self.customer.pk).update(updated_at=late)
+        Partner.objects.exclude(pk=self.customer.pk).update(updated_at=old)
+        self.executor.save()
+
+        data = self.get("partners", updated_since=since.isoformat())
+        self.assertEqual(data["count"], 3)
+        self.assertEqual(
+            [row["id"] for row in data["results"]],
+            [str(self.customer.pk), str(self.executor.pk)],
+        )
+
+    def test_naive_updated_since_is_in_the_current_time_zone(self):
+        since = timezone.localtime() + api.UPDATED_SINCE_OVERLAP
+        data = self.get(
+            "partners", updated_since=since.replace(tzinfo=None).isoformat()
+        )
+        self.assertEqual(data["results"], [])
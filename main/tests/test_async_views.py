@@ -0,0 +1,73 @@
+import json
+import uuid
+from decimal import Decimal
+
+from django.test import AsyncClient, TestCase
+from django.urls import reverse
+
+from main.benchmarking import verified_client
+from main.models import Income, Partner
+
+
+def partner(name, is_executor):
+    return Partner.objects.create(
+        id=uuid.uuid4(), name=name, referral_percentage=0, is_executor=is_executor
+    )
+
+
+class AsyncPartnerViewsTests(TestCase):
+    """The discrepancy endpoints served as async views, as under ASGI."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.executor = partner("Исполнитель", True)
+        cls.other_executor = partner("Алый исполнитель", True)
+        partner("Клиент", False)
+        for amount in ("10.50", "20"):
+            Income.objects.create(
+                id=uuid.uuid4(), executor=cls.executor, amount=Decimal(amount)
+            )
+
+    def setUp(self):
+        self.async_client = AsyncClient()
+        self.async_client.cookies = verified_client().cookies
+
+    async def content(self, response):
+        self.assertEqual(response.status_code, 200)
+        if response.streaming:
+            return b"".join([chunk async for chunk in response.streaming_content])
+        return response.content
+
+    async def test_partner_data(self):
+        response = await self.async_client.get(
+            reverse("main:partner_data"), {"role": "executor"}
+        )
+        data = json.loads(await self.content(response))
+        self.assertEqual(
+            [row["name"] for row in data["partners"]],
+            ["Алый исполнитель", "Исполнитель"],
+        )
+
+    async def test_partner_data_whole_streams_the_ledger(self):
+        response = await self.async_client.get(
+            reverse("main:partner_data_whole"),
+            {"partner_id": self.executor.pk, "role": "executor"},
+        )
+        self.assertTrue(response.streaming)
+        data = json.loads(await self.content(response))
+        self.assertCountEqual(
+            [row["amount"] for row in data["incomes"]], ["10.50", "20.00"]
+        )
+        self.assertEqual(data["outcomes"], [])
+
+    async def test_partner_data_whole_rejects_bad_ids(self):
+        response = await self.async_client.get(
+            reverse("main:partner_data_whole"), {"partner_id": "nope"}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.content), {"error": "Invalid partner_id"})
+
+    async def test_unverified_users_are_redirected(self):
+        for name in ("partner_data", "partner_data_whole"):
+            response = await AsyncClient().get(reverse(f"main:{name}"))
+            self.assertEqual(response.status_code, 302, name)
@@ -0,0 +1,113 @@
+from decimal import Decimal
+
+from django.test import TestCase
+
+from main import balances
+from main.models import Application, Income, Outcome, Partner, PartnerBalance
+
+from .utils import COUNTS, save_seeded
+
+
+class BalanceDeltaTests(TestCase):
+    """The deltas applied by signals add up to what ``rebuild`` computes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        for kind in ("partners", "legal_entities"):
+            save_seeded(kind, 0, COUNTS[kind])
+        cls.applications = save_seeded("applications", 0, 12)
+        cls.incomes = save_seeded("incomes", 0, 10)
+        cls.outcomes = save_seeded("outcomes", 0, 10)
+
+    def assertBalancesMatchRebuild(self):
+        self.assertEqual(balances.rebuild(dry_run=True), [])
+
+    def test_creating_rows(self):
+        self.assertEqual(PartnerBalance.objects.count(), COUNTS["partners"])
+        self.assertBalancesMatchRebuild()
+
+    def test_changing_amounts(self):
+        for income in self.incomes[:3]:
+            income.amount += 7
+            income.save()
+        for outcome in self.outcomes[:3]:
+            outcome.amount = Decimal("0.01")
+            outcome.save()
+        self.assertBalancesMatchRebuild()
+
+    def test_moving_rows_between_partners(self):
+        executors = list(Partner.objects.filter(is_executor=True))
+        customers = list(Partner.objects.filter(is_executor=False))
+        income = self.incomes[0]
+        income.executor = next(p for p in executors if p.pk != income.executor_id)
+        income.save()
+        outcome = self.outcomes[0]
+        outcome.customer = next(p for p in customers if p.pk != outcome.customer_id)
+        outcome.save()
+        for application in self.applications[:4]:
+            application.executor = next(
+                p for p in executors if p.pk != application.executor_id
+            )
+            application.save()
+        application = self.applications[4]
+        application.customer = None
+        application.save()
+        self.assertBalancesMatchRebuild()
+
+    def test_deleting_rows(self):
+        for obj in [*self.applications[:5], *self.incomes[:2], *self.outcomes[:2]]:
+            obj.delete()
+        self.assertBalancesMatchRebuild()
+
+    def test_deleting_partners(self):
+        Application.objects.filter(customer=None).delete()
+        for partner in Partner.objects.all()[:2]:
+            partner.delete()
+        self.assertEqual(PartnerBalance.objects.count(), COUNTS["partners"] - 2)
+        self.assertBalancesMatchRebuild()
+
+    def test_rebuild_fixes_drift(self):
+        partner = Partner.objects.filter(is_executor=True).first()
+        PartnerBalance.objects.filter(partner=partner).update(
+            executor_income=123, executor_discrepancy=-5
+        )
+        PartnerBalance.objects.exclude(partner=partner).first().delete()
+        drifted = balances.rebuild(dry_run=True)
+        self.assertIn(partner.pk, drifted)
+        self.assertEqual(len(drifted), 2)
+
+        self.assertCountEqual(balances.rebuild(), drifted)
+        self.assertEqual(PartnerBalance.objects.count(), COUNTS["partners"])
+        self.assertBalancesMatchRebuild()
+        balance = PartnerBalance.objects.get(partner=partner)
+        total = sum(
+            Income.objects.filter(executor=partner).values_list("amount", flat=True)
+        )
+        self.assertEqual(balance.executor_income, total)
+
+    def test_rebuild_only_given_partners(self):
+        partners = list(Partner.objects.values_list("pk", flat=True)[:2])
+        PartnerBalance.objects.update(customer_outcome=99999)
+        self.assertCountEqual(balances.rebuild(partners), partners)
+        self.assertEqual(balances.rebuild(partners, dry_run=True), [])
+        self.assertEqual(
+            len(balances.rebuild(dry_run=True)), COUNTS["partners"] - len(partners)
+        )
+
+    def test_outcomes_reach_executors_of_the_customer(self):
+        application = self.applications[0]
+        before = PartnerBalance.objects.get(partner_id=application.executor_id)
+        Outcome.objects.create(
+            id="00000000-0000-0000-0000-000000000001",
+            customer_id=application.customer_id,
+            amount=Decimal("10.50"),
+        )
+        after = PartnerBalance.objects.get(partner_id=application.executor_id)
+        self.assertEqual(
+            after.executor_outcome - before.executor_outcome, Decimal("10.50")
+        )
+        self.assertEqual(
+            after.executor_discrepancy - before.executor_discrepancy,
+            Decimal("-10.50"),
+        )
+        self.assertBalancesMatchRebuild()
@@ -0,0 +1,59 @@
+import os
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from main.benchmarking import measure, verified_client
+from main.management.commands import benchmark_dashboard
+
+from .utils import COUNTS, TemporaryCacheMixin, save_seeded
+
+
+class MeasureTests(TemporaryCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        for kind in ("partners", "legal_entities"):
+            save_seeded(kind, 0, COUNTS[kind])
+        save_seeded("incomes", 0, 3)
+        self.client = verified_client()
+        self.url = reverse("main:income_list")
+
+    def test_cold_runs_leave_the_cache_alone(self):
+        cache.set("site", "kept")
+        result = measure(self.client, self.url, repeat=2)
+        self.assertEqual(cache.get("site"), "kept")
+        # Nothing else was written to it.
+        self.assertEqual(len(os.listdir(settings.CACHES["default"]["LOCATION"])), 1)
+        self.assertGreater(result["queries"], 0)
+
+    def test_warm_runs_use_the_cache(self):
+        cold = measure(self.client, self.url, repeat=2)
+        warm = measure(self.client, self.url, repeat=2, warm_cache=True)
+        self.assertLess(warm["queries"], cold["queries"])
+
+
+class BenchmarkDashboardTests(TestCase):
+    def test_runs_against_its_own_cache(self):
+        configured = settings.CACHES["default"]
+        seen = []
+
+        def run(command, options):
+            seen.append(settings.CACHES["default"])
+            return {}
+
+        creation = connection.creation
+        with mock.patch.object(
+            benchmark_dashboard.Command, "run", run
+        ), mock.patch.object(creation, "create_test_db"), mock.patch.object(
+            creation, "destroy_test_db"
+        ), mock.patch.object(
+            benchmark_dashboard, "setup_test_environment"
+        ), mock.patch.object(benchmark_dashboard, "teardown_test_environment"):
+            call_command("benchmark_dashboard", verbosity=0)
+        self.assertNotEqual(seen[0]["LOCATION"], configured.get("LOCATION"))
+        self.assertEqual(settings.CACHES["default"], configured)
@@ -0,0 +1,130 @@
+import uuid
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from main import caching
+from main.benchmarking import verified_client
+from main.caching import bump_generation, cached_rows, is_process_local
+from main.models import Income, Partner
+
+from .utils import TemporaryCacheMixin, local_cache
+
+
+class CachedRowsTests(TemporaryCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.builds = 0
+
+    def build(self):
+        self.builds += 1
+        return [self.builds]
+
+    def rows(self, *key, models=(Income,)):
+        return cached_rows("test", models, self.build, *key)
+
+    def test_hit_and_miss(self):
+        self.assertFalse(is_process_local())
+        self.assertEqual(self.rows("a"), [1])
+        self.assertEqual(self.rows("a"), [1])
+        self.assertEqual(self.rows({"page": 2}), [2])
+        self.assertEqual(self.rows({"page": 2}), [2])
+        self.assertEqual(self.builds, 2)
+
+    def test_model_instances_count_by_pk(self):
+        partner = Partner(id=uuid.uuid4(), name="Исполнитель")
+        self.rows({"executor": partner})
+        self.rows({"executor": Partner(id=partner.pk, name="Другое имя")})
+        self.assertEqual(self.builds, 1)
+
+    def test_bump_after_commit(self):
+        self.rows("a")
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_generation(Income)
+        self.assertEqual(self.rows("a"), [2])
+
+    def test_no_bump_before_commit(self):
+        self.rows("a")
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            bump_generation(Income)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.rows("a"), [1])
+
+    def test_other_models_keep_their_rows(self):
+        self.rows("a", models=(Partner,))
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_generation(Income)
+        self.assertEqual(self.rows("a", models=(Partner,)), [1])
+
+    def test_evicted_token_is_replaced(self):
+        self.rows("a")
+        cache.delete(caching._generation_key(Income))
+        self.assertEqual(self.rows("a"), [2])
+        self.assertEqual(self.rows("a"), [2])
+
+    def test_large_results_are_not_stored(self):
+        with mock.patch.object(caching, "MAX_CACHED_ROWS", 0):
+            self.rows("a")
+            self.rows("a")
+        self.assertEqual(self.builds, 2)
+
+    @local_cache
+    def test_process_local_cache_stores_nothing(self):
+        self.assertTrue(is_process_local())
+        self.rows("a")
+        self.rows("a")
+        self.assertEqual(self.builds, 2)
+
+
+class ListPageCacheTests(TemporaryCacheMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.executor = Partner.objects.create(
+            id=uuid.uuid4(), name="Исполнитель", referral_percentage=0, is_executor=True
+        )
+        cls.income = Income.objects.create(
+            id=uuid.uuid4(), executor=cls.executor, amount=10
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.client = verified_client()
+
+    def amounts(self, **params):
+        response = self.client.get(reverse("main:income_list"), params)
+        self.assertEqual(response.status_code, 200)
+        return [income.amount for income in response.context["incomes"]]
+
+    def test_pages_are_served_from_the_cache(self):
+        self.assertEqual(self.amounts(), [10])
+        # update() sends no signals, so nothing invalidates the page.
+        Income.objects.update(amount=20)
+        self.assertEqual(self.amounts(), [10])
+        # Unknown parameters don't make a new cache entry.
+        self.assertEqual(self.amounts(junk="1"), [10])
+        self.assertEqual(self.amounts(sort_by_amount="desc"), [20])
+
+    def test_saving_invalidates(self):
+        self.amounts()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.income.amount = 30
+            self.income.save()
+            Income.objects.create(id=uuid.uuid4(), executor=self.executor, amount=5)
+        self.assertEqual(self.amounts(), [5, 30])
+
+    def test_deleting_invalidates(self):
+        self.amounts()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.income.delete()
+        self.assertEqual(self.amounts(), [])
+
+    def test_renaming_a_partner_invalidates(self):
+        response = self.client.get(reverse("main:income_list"))
+        self.assertContains(response, "Исполнитель")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.executor.name = "Переименован"
+            self.executor.save()
+        response = self.client.get(reverse("main:income_list"))
+        self.assertContains(response, "Переименован")
@@ -0,0 +1,133 @@
+import uuid
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from main.choices import ChoiceProvider, CachedModelChoiceField
+from main.forms import ApplicationForm
+from main.models import LegalEntity, Partner
+
+from .utils import TemporaryCacheMixin, local_cache
+
+
+def partner(name, is_executor=True):
+    return Partner.objects.create(
+        id=uuid.uuid4(), name=name, referral_percentage=5, is_executor=is_executor
+    )
+
+
+def legal_entity(name, owner):
+    return LegalEntity.objects.create(
+        id=uuid.uuid4(),
+        name=name,
+        partner=owner,
+        tax_number="1",
+        legal_entity_percentage=0,
+    )
+
+
+class ChoiceProviderTests(TemporaryCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.executor = partner("Исполнитель")
+            self.customer = partner("Заказчик", is_executor=False)
+            self.entity = legal_entity("Альфа", self.executor)
+        self.executors = self.provider(is_executor=True)
+        self.legal_entities = ChoiceProvider(
+            f"test-{uuid.uuid4()}", LegalEntity, ("id", "name", "partner_id")
+        )
+
+    def provider(self, **filters):
+        # A name of its own, so no other test's rows are found in the cache.
+        return ChoiceProvider(
+            f"test-{uuid.uuid4()}",
+            Partner,
+            ("id", "name", "referral_percentage", "is_executor"),
+            **filters,
+        )
+
+    def queries(self, func):
+        with CaptureQueriesContext(connection) as captured:
+            result = func()
+        return result, len(captured)
+
+    def test_rows_are_read_once(self):
+        choices, queries = self.queries(self.executors.choices)
+        self.assertEqual(choices, [(str(self.executor.pk), "Исполнитель")])
+        self.assertEqual(queries, 1)
+        self.assertEqual(self.queries(self.executors.choices), (choices, 0))
+        instance, queries = self.queries(lambda: self.executors.get(self.executor.pk))
+        self.assertEqual(
+            (instance.pk, instance.name), (self.executor.pk, "Исполнитель")
+        )
+        self.assertEqual(queries, 0)
+
+    def test_other_processes_read_the_shared_cache(self):
+        self.executors.choices()
+        # A provider without the in-memory copy, as in another worker.
+        other = ChoiceProvider(
+            self.executors.name, Partner, self.executors.fields, is_executor=True
+        )
+        self.assertEqual(self.queries(other.choices)[1], 0)
+
+    def test_partner_save_refreshes(self):
+        self.executors.choices()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.executor.name = "Переименован"
+            self.executor.save()
+            partner("Новый")
+        choices, queries = self.queries(self.executors.choices)
+        self.assertEqual([name for _, name in choices], ["Новый", "Переименован"])
+        self.assertEqual(queries, 1)
+
+    def test_partner_delete_refreshes(self):
+        self.executors.choices()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.executor.delete()
+        self.assertEqual(self.executors.choices(), [])
+        self.assertIsNone(self.executors.get(self.executor.pk))
+
+    def test_legal_entity_save_refreshes(self):
+        limit = {"partner_id": self.executor.pk}
+        self.assertEqual(
+            self.legal_entities.choices(**limit), [(str(self.entity.pk), "Альфа")]
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.entity.partner = self.customer
+            self.entity.save()
+        self.assertEqual(self.legal_entities.choices(**limit), [])
+        self.assertEqual(
+            self.legal_entities.choices(partner_id=self.customer.pk),
+            [(str(self.entity.pk), "Альфа")],
+        )
+
+    def test_no_refresh_before_commit(self):
+        self.executors.choices()
+        with self.captureOnCommitCallbacks(execute=False):
+            partner("Новый")
+        self.assertEqual(self.queries(self.executors.choices)[1], 0)
+
+    @local_cache
+    def test_process_local_cache_reads_every_time(self):
+        self.executors.choices()
+        self.assertEqual(self.queries(self.executors.choices)[1], 1)
+
+    def test_field_validates_from_the_cache(self):
+        field = CachedModelChoiceField(self.executors)
+        field.clean(str(self.executor.pk))
+        value, queries = self.queries(lambda: field.clean(str(self.executor.pk)))
+        self.assertEqual(value.pk, self.executor.pk)
+        self.assertEqual(queries, 0)
+
+    def test_form_choices_refresh(self):
+        def executor_choices():
+            return [name for _, name in ApplicationForm().fields["executor"].choices]
+
+        self.assertIn("Исполнитель", executor_choices())
+        _, queries = self.queries(executor_choices)
+        self.assertEqual(queries, 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            partner("Новый")
+        self.assertIn("Новый", executor_choices())
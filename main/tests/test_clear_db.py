@@ -0,0 +1,55 @@
+from django.contrib.auth.models import Permission, User
+from django.test import TestCase
+from django_otp.plugins.otp_totp.models import TOTPDevice
+
+import clear_db
+from main.caching import cached_rows
+from main.models import Application, Income, LegalEntity, Partner, PartnerBalance
+
+from .utils import COUNTS, TemporaryCacheMixin, save_seeded
+
+
+class TruncateDatabaseTests(TemporaryCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        for kind in ("partners", "legal_entities"):
+            save_seeded(kind, 0, COUNTS[kind])
+        save_seeded("incomes", 0, 5)
+        save_seeded("applications", 0, 5)
+        self.user = User.objects.create_user("operator")
+        TOTPDevice.objects.create(user=self.user, name="phone")
+
+    def truncate(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            clear_db.truncate_database(**kwargs)
+
+    def test_empties_main_tables(self):
+        self.truncate()
+        for model in (Partner, LegalEntity, Income, Application, PartnerBalance):
+            self.assertFalse(model.objects.exists(), model.__name__)
+
+    def test_keeps_users_by_default(self):
+        self.truncate()
+        self.assertTrue(User.objects.filter(pk=self.user.pk).exists())
+        self.assertTrue(TOTPDevice.objects.filter(user=self.user).exists())
+
+    def test_include_auth(self):
+        self.truncate(include_auth=True)
+        self.assertFalse(User.objects.exists())
+        self.assertFalse(TOTPDevice.objects.exists())
+        # Migrations own permissions and content types.
+        self.assertTrue(Permission.objects.exists())
+
+    def test_resets_sequences(self):
+        self.truncate(include_auth=True)
+        self.assertEqual(User.objects.create_user("first").pk, 1)
+
+    def test_cached_rows_are_dropped(self):
+        def partners():
+            return cached_rows(
+                "test", (Partner,), lambda: list(Partner.objects.values_list("pk"))
+            )
+
+        self.assertTrue(partners())
+        self.truncate()
+        self.assertEqual(partners(), [])
@@ -0,0 +1,117 @@
+import uuid
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+
+from main.discrepancy import partner_ledger_members
+from main.models import Application, ApplicationChoices, Income, Outcome, Partner
+
+
+async def _ledger(partner_id, role):
+    ledger = {}
+    async for key, value in partner_ledger_members(partner_id, role, chunk_size=2):
+        if hasattr(value, "__aiter__"):
+            value = [row async for row in value]
+        ledger[key] = value
+    return ledger
+
+
+ledger = async_to_sync(_ledger)
+
+
+def partner(name, is_executor):
+    return Partner.objects.create(
+        id=uuid.uuid4(), name=name, referral_percentage=0, is_executor=is_executor
+    )
+
+
+def application(executor, customer, uncargo_sum=100):
+    return Application.objects.create(
+        id=uuid.uuid4(),
+        status=ApplicationChoices.AWAITING.value,
+        executor=executor,
+        customer=customer,
+        initial_sum=uncargo_sum,
+        executor_commission=0,
+        sum_with_executors_commission=uncargo_sum,
+        commission_with_interest=0,
+        uncargo_sum=uncargo_sum,
+        referral_percentage=0,
+        clean_income=0,
+        comment="",
+    )
+
+
+class PartnerLedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.executor = partner("Исполнитель", True)
+        cls.other_executor = partner("Другой исполнитель", True)
+        cls.customer = partner("Клиент", False)
+        cls.other_customer = partner("Другой клиент", False)
+        application(cls.executor, cls.customer, uncargo_sum=70)
+        application(cls.executor, cls.customer)
+        application(cls.other_executor, cls.other_customer)
+        for amount in ("100.50", "50"):
+            Income.objects.create(
+                id=uuid.uuid4(), executor=cls.executor, amount=Decimal(amount)
+            )
+        Income.objects.create(id=uuid.uuid4(), executor=cls.other_executor, amount=7)
+        Outcome.objects.create(id=uuid.uuid4(), customer=cls.customer, amount=30)
+        Outcome.objects.create(id=uuid.uuid4(), customer=cls.other_customer, amount=9)
+
+    def test_executor_ledger(self):
+        data = ledger(self.executor.pk, "executor")
+        self.assertEqual(
+            list(data),
+            [
+                "incomes",
+                "outcomes",
+                "applications",
+                "total_applications",
+                "total_income",
+                "total_outcome",
+                "discrepancy",
+            ],
+        )
+        self.assertCountEqual(
+            [(row["name"], row["amount"]) for row in data["incomes"]],
+            [("Исполнитель", Decimal("100.50")), ("Исполнитель", Decimal("50.00"))],
+        )
+        # Outcomes of the customers the executor worked for, with their amount.
+        self.assertEqual(
+            [(row["customer"], row["name"], row["amount"]) for row in data["outcomes"]],
+            [(self.customer.pk, "Клиент", Decimal("30.00"))],
+        )
+        self.assertCountEqual(
+            [(row["customer"], row["amount"]) for row in data["applications"]],
+            [("Клиент", Decimal("70.00")), ("Клиент", Decimal("100.00"))],
+        )
+        self.assertEqual(data["total_applications"], 2)
+        self.assertEqual(data["total_income"], Decimal("150.50"))
+        self.assertEqual(data["total_outcome"], Decimal("30.00"))
+        self.assertEqual(data["discrepancy"], Decimal("120.50"))
+
+    def test_customer_ledger(self):
+        data = ledger(self.customer.pk, "customer")
+        self.assertEqual(len(data["incomes"]), 2)
+        self.assertEqual(len(data["outcomes"]), 1)
+        self.assertEqual(data["total_applications"], 2)
+        self.assertEqual(data["total_income"], Decimal("150.50"))
+        self.assertEqual(data["discrepancy"], Decimal("120.50"))
+
+    def test_missing_partner_names(self):
+        orphan = application(self.executor, None)
+        rows = ledger(self.executor.pk, "executor")["applications"]
+        self.assertIn(
+            "Нет заказчика",
+            [row["customer"] for row in rows if row["id"] == orphan.pk],
+        )
+
+    def test_partner_without_rows(self):
+        data = ledger(uuid.uuid4(), "executor")
+        self.assertEqual(data["incomes"], [])
+        self.assertEqual(data["applications"], [])
+        self.assertEqual(data["total_applications"], 0)
+        self.assertEqual(data["discrepancy"], 0)
@@ -0,0 +1,84 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase
+
+from main.management.commands.explain_views import (
+    INDEX_SCAN_PATTERNS,
+    TABLE_SCAN_PATTERNS,
+    TEMP_SORT_PATTERNS,
+    Command,
+)
+from main.models import Income
+
+from .utils import COUNTS, Seeder
+
+
+class ExplainViewsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seeder = Seeder()
+        for kind, count in COUNTS.items():
+            seeder.add(kind, count or 10)
+
+    def explain(self):
+        out = StringIO()
+        try:
+            call_command("explain_views", stdout=out)
+        finally:
+            self.output = out.getvalue()
+
+    def test_view_queries_use_indexes(self):
+        self.explain()
+        self.assertIn("income_list[partner, -amount], after cursor: ok", self.output)
+        self.assertIn("partner_data_whole[executor, outcomes]: ok", self.output)
+
+    def test_flags_scans_and_sorts(self):
+        queries = [
+            # updated_at has no index.
+            ("sorted", Income.objects.order_by("updated_at")[:10], False),
+            ("expected sort", Income.objects.order_by("updated_at")[:10], True),
+            # The whole index, as nothing limits the scan.
+            ("unlimited", Income.objects.order_by("created_at", "id"), False),
+            ("page", Income.objects.order_by("created_at", "id")[:10], False),
+        ]
+        with mock.patch.object(Command, "view_queries", return_value=queries):
+            with self.assertRaisesMessage(
+                CommandError, "3 queries use full scans or temporary sorts"
+            ):
+                self.explain()
+        self.assertIn("sorted: full scan of main_income; temporary sort", self.output)
+        self.assertIn("expected sort: full scan of main_income\n", self.output)
+        self.assertIn("unlimited: full index scan of main_income", self.output)
+        self.assertIn("page: ok", self.output)
+
+    def test_expected_sorts_are_not_flagged(self):
+        self.explain()
+        self.assertIn(
+            "application_list[legal_entity, sort_by_sum=None], first page: ok",
+            self.output,
+        )
+
+
+class PostgresPlanPatternTests(SimpleTestCase):
+    plan = """Limit  (cost=0.29..4.31 rows=51 width=64)
+  ->  Index Scan using main_income_created_idx on main_income  (cost=0.29..8.31)
+        Filter: (amount > 0)
+  ->  Index Scan using main_partner_pkey on main_partner  (cost=0.28..0.30)
+        Index Cond: (id = main_income.executor_id)
+  ->  Sort  (cost=10.00..10.50 rows=200 width=64)
+        Sort Key: main_outcome.amount
+        ->  Seq Scan on main_outcome  (cost=0.00..4.00 rows=200 width=64)"""
+
+    def test_patterns(self):
+        self.assertEqual(
+            TABLE_SCAN_PATTERNS["postgresql"].findall(self.plan), ["main_outcome"]
+        )
+        self.assertEqual(
+            INDEX_SCAN_PATTERNS["postgresql"].findall(self.plan), ["main_income"]
+        )
+        self.assertIsNotNone(TEMP_SORT_PATTERNS["postgresql"].search(self.plan))
+        self.assertIsNone(
+            TEMP_SORT_PATTERNS["postgresql"].search(self.plan.replace("Sort ", "S "))
+        )
@@ -0,0 +1,82 @@
+import csv
+import io
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from main.benchmarking import verified_client
+from main.models import Application, Job
+from main.querysets import APPLICATION_EXPORT_COLUMNS
+from main.seeding import partner_id
+
+from .utils import COUNTS, SEED, Seeder, local_cache
+
+
+@local_cache
+class ApplicationExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seeder = Seeder()
+        seeder.add("partners", COUNTS["partners"])
+        seeder.add("legal_entities", COUNTS["legal_entities"])
+        seeder.add("applications", 30)
+
+    def setUp(self):
+        self.client = verified_client()
+        self.url = reverse("main:application_export")
+
+    def export(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        content = b"".join(response.streaming_content).decode()
+        self.assertTrue(content.startswith("\ufeff"))
+        return response, list(csv.reader(io.StringIO(content[1:])))
+
+    def test_all_applications(self):
+        response, (header, *rows) = self.export()
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertEqual(
+            response["Content-Disposition"], 'attachment; filename="applications.csv"'
+        )
+        self.assertEqual(header, [heading for _, heading in APPLICATION_EXPORT_COLUMNS])
+        self.assertEqual(len(rows), Application.objects.count())
+
+    def test_names_are_joined(self):
+        application = Application.objects.select_related(
+            "customer", "executor", "receiver"
+        ).first()
+        _, (header, *rows) = self.export()
+        (row,) = [row for row in rows if row[0] == str(application.pk)]
+        columns = dict(zip(header, row))
+        self.assertEqual(columns["Заказчик"], application.customer.name)
+        self.assertEqual(columns["Исполнитель"], application.executor.name)
+        self.assertEqual(columns["Принимающий"], application.receiver.name)
+
+    def test_rows_come_from_one_query(self):
+        response = self.client.get(self.url)
+        with CaptureQueriesContext(connection) as captured:
+            b"".join(response.streaming_content)
+        self.assertEqual(len(captured), 1)
+
+    def test_filters_and_sort_follow_the_list(self):
+        executor = partner_id(SEED, 0)
+        _, (_, *rows) = self.export(executor=executor, sort_by_sum="desc")
+        expected = Application.objects.filter(executor=executor).order_by(
+            "-initial_sum", "-pk"
+        )
+        self.assertTrue(rows)
+        self.assertEqual(
+            [row[0] for row in rows],
+            [str(pk) for pk in expected.values_list("pk", flat=True)],
+        )
+
+    def test_background_export_keeps_the_filters(self):
+        executor = partner_id(SEED, 0)
+        response = self.client.get(self.url, {"executor": executor, "background": "1"})
+        job = Job.objects.get(kind="export_applications")
+        self.assertRedirects(
+            response, reverse("main:job_detail", args=[job.pk]), target_status_code=200
+        )
+        self.assertEqual(job.params, {"query": f"executor={executor}"})
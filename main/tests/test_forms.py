@@ -0,0 +1,134 @@
+import uuid
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+
+from main.benchmarking import verified_client
+from main.forms import ApplicationForm, EditConflict
+from main.models import Application, ApplicationChoices, LegalEntity, Partner
+from main.money import derived_amounts
+
+from .utils import local_cache
+
+
+@local_cache
+class SaveChangesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        executor = Partner.objects.create(
+            id=uuid.uuid4(), name="Исполнитель", referral_percentage=1, is_executor=True
+        )
+        customer = Partner.objects.create(
+            id=uuid.uuid4(), name="Клиент", referral_percentage=0, is_executor=False
+        )
+        cls.application = Application.objects.create(
+            id=uuid.uuid4(),
+            status=ApplicationChoices.AWAITING.value,
+            customer=customer,
+            executor=executor,
+            giving_side=executor,
+            sender=cls.legal_entity("ООО Отправитель", customer),
+            receiver=cls.legal_entity("ООО Получатель", executor),
+            initial_sum=1000,
+            executor_commission=1.5,
+            commission_with_interest=2.25,
+            comment="Комментарий",
+            **derived_amounts(1000, 1.5, 2.25, executor.referral_percentage),
+        )
+
+    @staticmethod
+    def legal_entity(name, partner):
+        return LegalEntity.objects.create(
+            id=uuid.uuid4(),
+            name=name,
+            partner=partner,
+            tax_number="1",
+            legal_entity_percentage=0,
+        )
+
+    def form_data(self, **changes):
+        """What the edit page posts back for the stored application."""
+        application = Application.objects.get(pk=self.application.pk)
+        form = ApplicationForm(instance=application)
+        data = {
+            name: form[name].value()
+            for name in form.fields
+            if form[name].value() is not None
+        }
+        data.update(changes)
+        return data
+
+    def form(self, data):
+        application = Application.objects.get(pk=self.application.pk)
+        form = ApplicationForm(data, instance=application)
+        self.assertTrue(form.is_valid(), form.errors)
+        return form
+
+    def test_changed_fields_are_saved(self):
+        before = self.application.updated_at
+        form = self.form(self.form_data(initial_sum="2000", comment="Новый"))
+        self.assertEqual(
+            set(form.changed_fields()),
+            {
+                "initial_sum",
+                "comment",
+                "sum_with_executors_commission",
+                "uncargo_sum",
+                "referral_percentage",
+                "clean_income",
+            },
+        )
+        form.save_changes()
+
+        application = Application.objects.get(pk=self.application.pk)
+        self.assertEqual(application.initial_sum, Decimal("2000.00"))
+        self.assertEqual(application.comment, "Новый")
+        self.assertEqual(application.uncargo_sum, Decimal("1955.00"))
+        self.assertGreater(application.updated_at, before)
+
+    def test_unchanged_form_writes_nothing(self):
+        form = self.form(self.form_data())
+        self.assertEqual(form.changed_fields(), [])
+        with self.assertNumQueries(0):
+            form.save_changes()
+
+    def test_stale_form_raises_edit_conflict(self):
+        stale = self.form_data(comment="Второй")
+        self.form(self.form_data(comment="Первый")).save_changes()
+
+        with self.assertRaises(EditConflict):
+            self.form(stale).save_changes()
+        self.assertEqual(
+            Application.objects.get(pk=self.application.pk).comment, "Первый"
+        )
+
+    def test_missing_version_is_a_conflict(self):
+        with self.assertRaises(EditConflict):
+            self.form(self.form_data(comment="Новый", version="")).save_changes()
+
+    def test_view_shows_conflict_and_saves_on_retry(self):
+        client = verified_client()
+        url = reverse("main:application_update", args=[self.application.pk])
+        stale = self.form_data(comment="Второй")
+        self.form(self.form_data(comment="Первый")).save_changes()
+
+        response = client.post(url, stale)
+        self.assertEqual(response.status_code, 200)
+        form = response.context["form"]
+        self.assertEqual(len(form.non_field_errors()), 1)
+        self.assertEqual(form["comment"].value(), "Второй")
+        self.assertEqual(
+            Application.objects.get(pk=self.application.pk).comment, "Первый"
+        )
+
+        retry = {name: form[name].value() for name in stale}
+        retry["version"] = form["version"].value()
+        self.assertRedirects(
+            client.post(url, retry),
+            reverse("main:application_list"),
+            fetch_redirect_response=False,
+        )
+        self.assertEqual(
+            Application.objects.get(pk=self.application.pk).comment, "Второй"
+        )
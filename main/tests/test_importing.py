@@ -0,0 +1,177 @@
+import io
+import uuid
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase
+
+from main.importing import ImportFileError, import_rows, read_rows
+from main.models import (
+    Application,
+    ApplicationChoices,
+    Income,
+    LegalEntity,
+    Outcome,
+    Partner,
+    PartnerBalance,
+)
+
+
+class ImportRowsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.executor = Partner.objects.create(
+            id=uuid.uuid4(), name="Исполнитель", referral_percentage=1, is_executor=True
+        )
+        cls.customer = Partner.objects.create(
+            id=uuid.uuid4(), name="Клиент", referral_percentage=0, is_executor=False
+        )
+        cls.sender = LegalEntity.objects.create(
+            id=uuid.uuid4(),
+            name="ООО Отправитель",
+            partner=cls.customer,
+            tax_number="1",
+            legal_entity_percentage=0,
+        )
+        cls.receiver = LegalEntity.objects.create(
+            id=uuid.uuid4(),
+            name="ООО Получатель",
+            partner=cls.executor,
+            tax_number="2",
+            legal_entity_percentage=0,
+        )
+
+    def application_row(self, **values):
+        row = {
+            "status": ApplicationChoices.AWAITING.value,
+            "customer": "Клиент",
+            "executor": "Исполнитель",
+            "giving_side": "Исполнитель",
+            "sender": "ООО Отправитель",
+            "receiver": "ООО Получатель",
+            "initial_sum": "1000",
+            "executor_commission": "1,5",
+            "commission_with_interest": "2.25",
+        }
+        row.update(values)
+        return row
+
+    def test_valid_rows_are_created(self):
+        report = import_rows(
+            "incomes",
+            [
+                {"executor": "Исполнитель", "amount": "1 234,50"},
+                {"executor": " Исполнитель ", "amount": "0.125"},
+            ],
+        )
+        self.assertEqual((report.rows, report.created, report.errors), (2, 2, []))
+        self.assertCountEqual(
+            Income.objects.values_list("amount", flat=True),
+            [Decimal("1234.50"), Decimal("0.13")],
+        )
+        self.assertEqual(
+            PartnerBalance.objects.get(partner=self.executor).executor_income,
+            Decimal("1234.63"),
+        )
+
+    def test_applications_get_derived_amounts(self):
+        report = import_rows("applications", [self.application_row()])
+        self.assertEqual(report.errors, [])
+        application = Application.objects.get()
+        self.assertEqual(application.sender, self.sender)
+        self.assertEqual(application.sum_with_executors_commission, Decimal("985.00"))
+        # The executor's referral percentage of 1, not the commission
+        self.assertEqual(application.referral_percentage, Decimal("10.00"))
+        self.assertEqual(application.clean_income, Decimal("-2.50"))
+        self.assertFalse(application.is_documents)
+
+    def test_row_errors_carry_line_numbers(self):
+        report = import_rows(
+            "applications",
+            [
+                self.application_row(),
+                self.application_row(executor="X"),
+                self.application_row(customer="Исполнитель"),
+                self.application_row(receiver="ООО Отправитель"),
+                self.application_row(initial_sum="много"),
+                self.application_row(status="Потеряна"),
+                self.application_row(executor_commission=""),
+            ],
+        )
+        self.assertEqual(report.rows, 7)
+        self.assertEqual(report.created, 1)
+        # Line 1 is the header.
+        self.assertEqual(
+            report.errors,
+            [
+                (3, "executor: unknown partner 'X'"),
+                (4, "customer: 'Исполнитель' is not a customer"),
+                (5, "receiver: 'ООО Отправитель' belongs to another partner"),
+                (6, "initial_sum: not a number: 'много'"),
+                (7, "status: unknown status 'Потеряна'"),
+                (8, "executor_commission: required"),
+            ],
+        )
+        self.assertEqual(Application.objects.count(), 1)
+
+    def test_out_of_range_amount(self):
+        report = import_rows("outcomes", [{"customer": "Клиент", "amount": "1e20"}])
+        self.assertEqual(report.errors, [(2, "amount: out of range: '1e20'")])
+
+    def test_strict_writes_nothing_on_errors(self):
+        rows = [
+            {"customer": "Клиент", "amount": "10"},
+            {"customer": "Никто", "amount": "10"},
+        ]
+        report = import_rows("outcomes", rows, strict=True)
+        self.assertEqual(report.created, 0)
+        self.assertEqual(len(report.errors), 1)
+        self.assertFalse(Outcome.objects.exists())
+        self.assertEqual(
+            PartnerBalance.objects.get(partner=self.customer).customer_outcome, 0
+        )
+
+    def test_strict_writes_valid_files(self):
+        rows = [{"customer": "Клиент", "amount": "10"}] * 3
+        report = import_rows("outcomes", rows, chunk_size=2, strict=True)
+        self.assertEqual(report.created, 3)
+        self.assertEqual(Outcome.objects.count(), 3)
+
+    def test_dry_run_writes_nothing(self):
+        progress = []
+        rows = [{"executor": "Исполнитель", "amount": "5"}] * 3
+        report = import_rows(
+            "incomes", rows, chunk_size=2, dry_run=True, progress=progress.append
+        )
+        self.assertEqual((report.rows, report.created, report.errors), (3, 0, []))
+        self.assertEqual(progress, [2, 3])
+        self.assertFalse(Income.objects.exists())
+
+    def test_missing_columns(self):
+        with self.assertRaisesMessage(
+            ImportFileError, "Missing columns: executor, amount"
+        ):
+            import_rows("incomes", [{"customer": "Клиент"}])
+
+    def test_optional_columns_may_be_missing(self):
+        row = self.application_row()
+        self.assertNotIn("comment", row)
+        self.assertEqual(import_rows("applications", [row]).created, 1)
+
+    def test_empty_file(self):
+        report = import_rows("incomes", [])
+        self.assertEqual((report.rows, report.created), (0, 0))
+
+
+class ReadRowsTests(SimpleTestCase):
+    def test_csv(self):
+        file = io.BytesIO("\ufeffExecutor, Amount \nИсполнитель,10\n".encode())
+        self.assertEqual(
+            list(read_rows(file, "incomes.CSV")),
+            [{"executor": "Исполнитель", "amount": "10"}],
+        )
+
+    def test_unsupported_suffix(self):
+        with self.assertRaisesMessage(ImportFileError, "Unsupported file type: .txt"):
+            read_rows(io.BytesIO(), "incomes.txt")
+        with self.assertRaisesMessage(ImportFileError, "Unsupported file type: data"):
+            read_rows(io.BytesIO(), "data")
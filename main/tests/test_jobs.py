@@ -0,0 +1,360 @@
+import io
+import shutil
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait as futures_wait
+from datetime import timedelta
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from main import jobs
+from main.management.commands import run_jobs
+from main.models import Income, Job, JobStatus, Partner
+
+from .utils import TemporaryCacheMixin
+
+
+class JobFilesMixin:
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        files = override_settings(JOB_FILES_DIR=directory)
+        files.enable()
+        self.addCleanup(files.disable)
+
+
+class QueueTests(JobFilesMixin, TestCase):
+    def claim(self, limit=10, kinds=None):
+        return jobs.claim("worker", limit, kinds)
+
+    def running(self, pk):
+        job = Job.objects.get(pk=pk)
+        self.assertEqual(job.status, JobStatus.RUNNING)
+        return job
+
+    def test_claim_takes_due_jobs_oldest_first(self):
+        later = jobs.enqueue("export_applications", {"query": "a"})
+        Job.objects.filter(pk=later.pk).update(
+            run_after=timezone.now() - timedelta(seconds=5)
+        )
+        first = jobs.enqueue("export_applications", {"query": "b"})
+        Job.objects.filter(pk=first.pk).update(
+            run_after=timezone.now() - timedelta(seconds=10)
+        )
+        future = jobs.enqueue("recalculate_applications")
+        Job.objects.filter(pk=future.pk).update(
+            run_after=timezone.now() + timedelta(minutes=1)
+        )
+
+        self.assertEqual(self.claim(), [first.pk, later.pk])
+        job = self.running(first.pk)
+        self.assertEqual((job.worker, job.attempts), ("worker", 1))
+        self.assertIsNotNone(job.heartbeat_at)
+        self.assertEqual(self.claim(), [])
+
+    def test_claim_respects_limit_and_kinds(self):
+        exports = [jobs.enqueue("export_applications") for _ in range(2)]
+        recalculation = jobs.enqueue("recalculate_applications")
+        self.assertEqual(self.claim(0), [])
+        self.assertEqual(
+            self.claim(kinds=["recalculate_applications"]), [recalculation.pk]
+        )
+        self.assertEqual(len(self.claim(1)), 1)
+        self.assertEqual(len(self.claim(1)), 1)
+        self.assertEqual(
+            Job.objects.filter(
+                pk__in=[e.pk for e in exports], status=JobStatus.RUNNING
+            ).count(),
+            2,
+        )
+
+    def test_claim_respects_concurrency(self):
+        for _ in range(3):
+            jobs.enqueue("refresh_reports")
+            jobs.enqueue("export_applications")
+        claimed = Job.objects.filter(pk__in=self.claim()).values_list("kind", flat=True)
+        self.assertCountEqual(
+            claimed, ["refresh_reports", "export_applications", "export_applications"]
+        )
+        # Limits count jobs running in every worker.
+        self.assertEqual(self.claim(), [])
+
+        running = Job.objects.filter(kind="refresh_reports", status=JobStatus.RUNNING)
+        jobs._finish(running.get(), status=JobStatus.SUCCEEDED)
+        self.assertEqual(len(self.claim()), 1)
+
+    def test_enqueue_with_key_reuses_queued_job(self):
+        job = jobs.enqueue("refresh_reports", key="all")
+        self.assertEqual(jobs.enqueue("refresh_reports", key="all"), job)
+        self.assertNotEqual(jobs.enqueue("refresh_reports", key="other"), job)
+        self.assertNotEqual(jobs.enqueue("refresh_reports"), job)
+
+        self.claim(kinds=["refresh_reports"])
+        self.running(job.pk)
+        self.assertNotEqual(jobs.enqueue("refresh_reports", key="all"), job)
+
+    def test_enqueue_saves_files(self):
+        job = jobs.enqueue(
+            "import_data",
+            {"kind": "incomes", "name": "incomes.csv"},
+            files={jobs.UPLOAD: SimpleUploadedFile("incomes.csv", b"data")},
+        )
+        self.assertEqual((jobs.job_dir(job.pk) / jobs.UPLOAD).read_bytes(), b"data")
+        self.assertEqual(job.max_attempts, jobs.JOBS["import_data"].max_attempts)
+
+    def test_fail_retries_with_backoff(self):
+        job = jobs.enqueue("export_applications")
+        for attempt in range(1, job.max_attempts):
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            self.claim()
+            job = self.running(job.pk)
+            before = timezone.now()
+            self.assertEqual(jobs.fail(job, "boom"), 1)
+
+            job.refresh_from_db()
+            self.assertEqual(
+                (job.status, job.error, job.worker), (JobStatus.QUEUED, "boom", "")
+            )
+            delay = jobs.RETRY_DELAY * 2 ** (attempt - 1)
+            self.assertGreaterEqual(job.run_after, before + delay)
+            self.assertLessEqual(job.run_after, timezone.now() + delay)
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        self.claim()
+        job = self.running(job.pk)
+        self.assertEqual(job.attempts, job.max_attempts)
+        jobs.fail(job, "boom")
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.FAILED)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_fail_without_retry(self):
+        job = jobs.enqueue("export_applications")
+        self.claim()
+        jobs.fail(self.running(job.pk), "bad params", retry=False)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (JobStatus.FAILED, 1))
+
+    def test_stale_job_object_does_not_overwrite(self):
+        job = jobs.enqueue("export_applications")
+        self.claim()
+        stale = self.running(job.pk)
+        # The worker lost the job and another one took it over.
+        jobs.fail(stale, "lost")
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        self.claim()
+        current = self.running(job.pk)
+        self.assertNotEqual(current.started_at, stale.started_at)
+
+        self.assertEqual(jobs._finish(stale, status=JobStatus.SUCCEEDED), 0)
+        self.assertEqual(jobs.fail(stale, "late", retry=False), 0)
+        self.running(job.pk)
+
+    def test_requeue_stale(self):
+        stale, alive = (
+            jobs.enqueue("export_applications"),
+            jobs.enqueue("export_applications"),
+        )
+        self.claim()
+        Job.objects.filter(pk=stale.pk).update(
+            heartbeat_at=timezone.now() - jobs.STALE_AFTER - timedelta(seconds=1)
+        )
+        jobs.heartbeat([alive.pk])
+        with self.assertLogs("main.jobs", "WARNING"):
+            jobs.requeue_stale()
+
+        stale.refresh_from_db()
+        self.assertEqual(
+            (stale.status, stale.error), (JobStatus.QUEUED, "Worker stopped responding")
+        )
+        self.running(alive.pk)
+
+    def test_release_does_not_count_the_attempt(self):
+        job = jobs.enqueue("export_applications")
+        self.claim()
+        jobs.release([job.pk])
+        job.refresh_from_db()
+        self.assertEqual(
+            (job.status, job.attempts, job.worker), (JobStatus.QUEUED, 0, "")
+        )
+        self.assertEqual(self.claim(), [job.pk])
+
+    def test_purge(self):
+        old = jobs.enqueue("export_applications")
+        recent = jobs.enqueue("export_applications")
+        queued = jobs.enqueue("export_applications")
+        jobs.job_dir(old.pk).mkdir(parents=True)
+        now = timezone.now()
+        Job.objects.filter(pk=old.pk).update(
+            status=JobStatus.FAILED, finished_at=now - jobs.JOB_RETENTION * 2
+        )
+        Job.objects.filter(pk=recent.pk).update(
+            status=JobStatus.SUCCEEDED, finished_at=now
+        )
+
+        self.assertEqual(jobs.purge(), 1)
+        self.assertFalse(jobs.job_dir(old.pk).exists())
+        self.assertCountEqual(
+            Job.objects.values_list("pk", flat=True), [recent.pk, queued.pk]
+        )
+
+
+class ExecuteTests(JobFilesMixin, TransactionTestCase):
+    # execute() closes the connection like a worker process does.
+
+    def register(self, name, func, **options):
+        jobs.job(name, name, **options)(func)
+        self.addCleanup(jobs.JOBS.pop, name)
+
+    def run_job(self, kind, params=None, files=None):
+        job = jobs.enqueue(kind, params, files=files)
+        self.assertEqual(jobs.claim("worker", 1, [kind]), [job.pk])
+        with self.assertNoLogs("main.jobs", "WARNING"):
+            status = jobs.execute(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, status)
+        return job
+
+    def test_success_stores_result_and_progress(self):
+        def count(context, up_to):
+            for done in range(1, up_to + 1):
+                context.progress(done, up_to)
+            return {"counted": up_to}
+
+        self.register("test_count", count)
+        job = self.run_job("test_count", {"up_to": 3})
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertEqual(job.result, {"counted": 3})
+        self.assertEqual((job.progress, job.total), (3, 3))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_exception_requeues(self):
+        def broken(context):
+            raise ValueError("try again")
+
+        self.register("test_broken", broken, max_attempts=2)
+        with self.assertLogs("main.jobs", "ERROR"):
+            job = jobs.enqueue("test_broken")
+            jobs.claim("worker", 1, ["test_broken"])
+            self.assertEqual(jobs.execute(job.pk), JobStatus.QUEUED)
+        job.refresh_from_db()
+        self.assertEqual(job.error, "ValueError: try again")
+        self.assertGreater(job.run_after, timezone.now())
+
+    def test_job_error_fails_at_once(self):
+        def invalid(context):
+            raise jobs.JobError("no such file")
+
+        self.register("test_invalid", invalid, max_attempts=3)
+        with self.assertLogs("main.jobs", "ERROR"):
+            job = jobs.enqueue("test_invalid")
+            jobs.claim("worker", 1, ["test_invalid"])
+            self.assertEqual(jobs.execute(job.pk), JobStatus.FAILED)
+        job.refresh_from_db()
+        self.assertEqual((job.error, job.attempts), ("JobError: no such file", 1))
+
+    # Progress written from another thread while the import's transaction is
+    # open hits the table locks of the shared in-memory test database.
+    @mock.patch.object(jobs, "PROGRESS_INTERVAL", float("inf"))
+    def test_import_data(self):
+        Partner.objects.create(
+            id=uuid.uuid4(), name="Исполнитель", referral_percentage=1, is_executor=True
+        )
+        upload = SimpleUploadedFile(
+            "incomes.csv", "executor,amount\nИсполнитель,10\nНикто,5\n".encode()
+        )
+        job = self.run_job(
+            "import_data",
+            {"kind": "incomes", "name": "incomes.csv"},
+            files={jobs.UPLOAD: upload},
+        )
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertEqual(job.result["created"], 1)
+        self.assertEqual(
+            job.result["errors"], [[3, "executor: unknown partner 'Никто'"]]
+        )
+        self.assertEqual(Income.objects.count(), 1)
+        self.assertFalse((jobs.job_dir(job.pk) / jobs.UPLOAD).exists())
+
+    def test_import_of_unsupported_file_fails(self):
+        upload = SimpleUploadedFile("incomes.txt", b"")
+        with self.assertLogs("main.jobs", "ERROR"):
+            job = jobs.enqueue(
+                "import_data",
+                {"kind": "incomes", "name": "incomes.txt"},
+                files={jobs.UPLOAD: upload},
+            )
+            jobs.claim("worker", 1, ["import_data"])
+            self.assertEqual(jobs.execute(job.pk), JobStatus.FAILED)
+
+
+class RunJobsStopTests(JobFilesMixin, TemporaryCacheMixin, TestCase):
+    """Stopping the worker never hands a started job to another worker."""
+
+    def setUp(self):
+        super().setUp()
+        self.jobs = [jobs.enqueue("export_applications") for _ in range(3)]
+        self.executed = []
+        self.finish = threading.Event()
+        self.interrupts = 1
+
+    def execute(self, job_id):
+        self.executed.append(job_id)
+        self.finish.wait(5)
+        return JobStatus.SUCCEEDED
+
+    def wait(self, futures, **kwargs):
+        if self.interrupts:
+            self.interrupts -= 1
+            raise KeyboardInterrupt
+        self.finish.set()
+        return futures_wait(futures, **kwargs)
+
+    def run_jobs(self, threads):
+        pool = ThreadPoolExecutor(threads)
+        # Stands in for the child processes terminate() kills.
+        pool._processes = {0: mock.Mock(kill=self.finish.set)}
+        self.addCleanup(pool.shutdown, cancel_futures=True)
+        self.addCleanup(self.finish.set)
+        with mock.patch.object(jobs, "execute", self.execute), mock.patch.object(
+            run_jobs, "wait", self.wait
+        ), mock.patch.object(run_jobs.Command, "pool", return_value=pool), mock.patch(
+            "signal.signal"
+        ):
+            call_command(
+                "run_jobs", processes=2, poll_interval=0.01, stdout=io.StringIO()
+            )
+
+    def status(self, job):
+        job.refresh_from_db()
+        return job.status, job.attempts
+
+    def test_started_jobs_finish_before_exit(self):
+        self.run_jobs(threads=2)
+        started, other = self.jobs[:2], self.jobs[2]
+        self.assertCountEqual(self.executed, [job.pk for job in started])
+        # The fake execute() leaves them running; release() would have queued them.
+        for job in started:
+            self.assertEqual(self.status(job), (JobStatus.RUNNING, 1))
+        self.assertEqual(self.status(other), (JobStatus.QUEUED, 0))
+
+    def test_jobs_not_started_are_released(self):
+        self.run_jobs(threads=1)
+        started, waiting = self.jobs[0], self.jobs[1]
+        self.assertEqual(self.executed, [started.pk])
+        self.assertEqual(self.status(started), (JobStatus.RUNNING, 1))
+        self.assertEqual(self.status(waiting), (JobStatus.QUEUED, 0))
+
+    def test_second_interrupt_terminates_started_jobs(self):
+        self.interrupts = 2
+        self.run_jobs(threads=2)
+        for job in self.jobs[:2]:
+            self.assertEqual(self.status(job), (JobStatus.QUEUED, 1))
+            self.assertEqual(job.error, "Worker was terminated")
@@ -0,0 +1,79 @@
+import uuid
+
+from django.test import TestCase
+from django.urls import reverse
+
+from main.benchmarking import verified_client
+from main.models import LegalEntity, Partner
+
+
+def legal_entity(name, partner):
+    return LegalEntity.objects.create(
+        id=uuid.uuid4(),
+        name=name,
+        partner=partner,
+        tax_number="1",
+        legal_entity_percentage=0,
+    )
+
+
+class PartnerLegalEntitiesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.partner, cls.other = (
+            Partner.objects.create(
+                id=uuid.uuid4(), name=name, referral_percentage=0, is_executor=True
+            )
+            for name in ("Исполнитель", "Другой")
+        )
+        cls.beta = legal_entity("Бета", cls.partner)
+        cls.alpha = legal_entity("Альфа", cls.partner)
+        legal_entity("Чужое", cls.other)
+
+    def setUp(self):
+        self.client = verified_client()
+        self.url = reverse("main:legal_entities_data")
+
+    def get(self, **headers):
+        return self.client.get(self.url, {"partner_id": self.partner.pk}, **headers)
+
+    def test_partner_legal_entities_by_name(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            [
+                {"id": str(self.alpha.pk), "name": "Альфа"},
+                {"id": str(self.beta.pk), "name": "Бета"},
+            ],
+        )
+        self.assertIn("no-cache", response["Cache-Control"])
+
+    def test_invalid_partner_id(self):
+        response = self.client.get(self.url, {"partner_id": "nope"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_not_modified(self):
+        first = self.get()
+        response = self.get(HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], first["ETag"])
+        response = self.get(HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_writes_change_the_etag(self):
+        etags = {self.get()["ETag"]}
+        self.alpha.name = "Альфа 2"
+        self.alpha.save()
+        etags.add(self.get()["ETag"])
+        # A delete can leave MAX(updated_at) where it was; the count moves.
+        LegalEntity.objects.filter(pk=self.beta.pk).delete()
+        response = self.get(HTTP_IF_NONE_MATCH=", ".join(etags))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+        self.assertEqual(len(etags | {response["ETag"]}), 3)
+
+    def test_other_partners_do_not_change_the_etag(self):
+        etag = self.get()["ETag"]
+        legal_entity("Новое чужое", self.other)
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
@@ -0,0 +1,75 @@
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase
+
+from main.models import Application
+from main.money import derived_amounts, recalculate, to_decimal, to_money
+
+from .utils import COUNTS, Seeder
+
+
+class MoneyTests(SimpleTestCase):
+    def test_floats_convert_through_str(self):
+        self.assertEqual(to_decimal(0.1), Decimal("0.1"))
+        self.assertEqual(to_decimal(Decimal("1.005")), Decimal("1.005"))
+
+    def test_to_money_rounds_half_up(self):
+        cases = {
+            "0.125": "0.13",
+            "0.124": "0.12",
+            "-0.125": "-0.13",
+            # Binary rounding would give 2.67.
+            2.675: "2.68",
+            0.1 + 0.2: "0.30",
+            7: "7.00",
+        }
+        for value, expected in cases.items():
+            with self.subTest(value=value):
+                self.assertEqual(to_money(value), Decimal(expected))
+
+    def test_derived_amounts(self):
+        self.assertEqual(
+            derived_amounts(1000, 1.5, 2.25, 0.5),
+            {
+                "sum_with_executors_commission": Decimal("985.00"),
+                "uncargo_sum": Decimal("977.50"),
+                "referral_percentage": Decimal("5.00"),
+                "clean_income": Decimal("2.50"),
+            },
+        )
+
+    def test_derived_amounts_round_each_amount(self):
+        amounts = derived_amounts(Decimal("333.33"), 1.5, 3, 0.7)
+        self.assertEqual(amounts["sum_with_executors_commission"], Decimal("328.33"))
+        self.assertEqual(amounts["uncargo_sum"], Decimal("323.33"))
+        self.assertEqual(amounts["referral_percentage"], Decimal("2.33"))
+        # Computed from the unrounded amounts: 328.33005 - 323.3301 - 2.33331
+        self.assertEqual(amounts["clean_income"], Decimal("2.67"))
+        for amount in amounts.values():
+            self.assertEqual(amount.as_tuple().exponent, -2)
+
+
+class RecalculateTests(TestCase):
+    def test_sql_matches_derived_amounts(self):
+        seeder = Seeder()
+        for kind in ("partners", "legal_entities"):
+            seeder.add(kind, COUNTS[kind])
+        seeder.add("applications", 20)
+        Application.objects.update(
+            executor_commission=12.5,
+            sum_with_executors_commission=0,
+            uncargo_sum=0,
+            referral_percentage=0,
+            clean_income=0,
+        )
+
+        self.assertEqual(recalculate(Application.objects.all()), 20)
+        for application in Application.objects.select_related("executor"):
+            expected = derived_amounts(
+                application.initial_sum,
+                application.executor_commission,
+                application.commission_with_interest,
+                application.executor.referral_percentage,
+            )
+            for field, amount in expected.items():
+                self.assertEqual(getattr(application, field), amount, field)
@@ -0,0 +1,55 @@
+import uuid
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django_otp.plugins.otp_static.models import StaticDevice
+from django_otp.plugins.otp_totp.models import TOTPDevice
+
+from main import signals
+from main.benchmarking import verified_client
+from main.models import Partner
+
+from .utils import TemporaryCacheMixin
+
+
+class CachedOTPVerificationTests(TemporaryCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = verified_client()
+        self.device = TOTPDevice.objects.get(user__username="benchmark")
+        self.url = reverse("main:legal_entities_list")
+
+    def device_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return [q for q in queries if "otp_totp_totpdevice" in q["sql"]]
+
+    def test_verification_is_remembered(self):
+        self.assertTrue(self.device_queries())
+        self.assertEqual(self.device_queries(), [])
+
+    def test_deleting_the_device_ends_verification(self):
+        self.device_queries()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.device.delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+
+    def test_adding_a_device_reloads_the_verified_one(self):
+        self.device_queries()
+        with self.captureOnCommitCallbacks(execute=True):
+            StaticDevice.objects.create(user=self.device.user, name="backup")
+        self.assertTrue(self.device_queries())
+        self.assertEqual(self.device_queries(), [])
+
+    def test_other_models_leave_verification_alone(self):
+        with mock.patch.object(signals, "bump_user_devices") as bump:
+            Partner.objects.create(
+                id=uuid.uuid4(), name="Исполнитель", referral_percentage=5
+            )
+            self.device.save()
+        bump.assert_called_once_with(self.device.user_id)
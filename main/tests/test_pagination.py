@@ -0,0 +1,86 @@
+import uuid
+from decimal import Decimal
+
+from django.test import TestCase
+
+from main.models import Income, Partner
+from main.pagination import KeysetPaginator
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        executor = Partner.objects.create(
+            id=uuid.uuid4(), name="Исполнитель", referral_percentage=1, is_executor=True
+        )
+        # Ties on amount are broken by pk.
+        for amount in (5, 1, 3, 3, 3, 2, 5):
+            Income.objects.create(
+                id=uuid.uuid4(), executor=executor, amount=Decimal(amount)
+            )
+
+    def paginator(self, descending=False):
+        return KeysetPaginator(
+            Income.objects.all(), "amount", descending=descending, per_page=3
+        )
+
+    def expected(self, descending=False):
+        prefix = "-" if descending else ""
+        return list(
+            Income.objects.order_by(f"{prefix}amount", f"{prefix}pk").values_list(
+                "pk", flat=True
+            )
+        )
+
+    def walk_forward(self, paginator):
+        pages = [paginator.page()]
+        while pages[-1].has_next:
+            pages.append(paginator.page(after=pages[-1].next_cursor))
+        return pages
+
+    def test_forward_pages_cover_every_row_once(self):
+        for descending in (False, True):
+            with self.subTest(descending=descending):
+                pages = self.walk_forward(self.paginator(descending))
+                self.assertEqual([len(page) for page in pages], [3, 3, 1])
+                self.assertFalse(pages[0].has_previous)
+                self.assertEqual(
+                    [income.pk for page in pages for income in page],
+                    self.expected(descending),
+                )
+
+    def test_backward_pages_mirror_forward_pages(self):
+        paginator = self.paginator()
+        forward = self.walk_forward(paginator)
+        backward = [forward[-1]]
+        while backward[-1].has_previous:
+            backward.append(paginator.page(before=backward[-1].prev_cursor))
+        self.assertEqual(
+            [[income.pk for income in page] for page in reversed(backward)],
+            [[income.pk for income in page] for page in forward],
+        )
+        self.assertTrue(backward[-1].has_next)
+
+    def test_invalid_cursors_start_over(self):
+        paginator = self.paginator()
+        first = [income.pk for income in paginator.page()]
+        foreign = KeysetPaginator(Income.objects.all(), "created_at", per_page=3)
+        foreign_cursor = foreign.page().next_cursor
+        for cursor in ("junk", "e30", foreign_cursor):
+            with self.subTest(cursor=cursor):
+                page = paginator.page(after=cursor)
+                self.assertEqual([income.pk for income in page], first)
+                self.assertEqual(
+                    paginator.cursor_key(after=cursor), paginator.cursor_key()
+                )
+
+    def test_cursor_key_tells_pages_apart(self):
+        paginator = self.paginator()
+        cursor = paginator.page().next_cursor
+        self.assertNotEqual(paginator.cursor_key(after=cursor), paginator.cursor_key())
+        self.assertNotEqual(
+            paginator.cursor_key(after=cursor), paginator.cursor_key(before=cursor)
+        )
+        self.assertNotEqual(
+            paginator.cursor_key(), self.paginator(descending=True).cursor_key()
+        )
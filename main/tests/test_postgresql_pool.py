@@ -0,0 +1,117 @@
+from unittest import mock
+
+import psycopg2
+from django.core import checks
+from django.db import connections
+from django.test import SimpleTestCase
+from psycopg2_pool import PoolError
+
+from main.db.postgresql_pool import base
+
+POOL = {"MIN_SIZE": 1, "MAX_SIZE": 2, "IDLE_TIMEOUT": 60, "TIMEOUT": 0.05}
+
+
+def wrapper(**settings):
+    settings_dict = {
+        **connections["default"].settings_dict,
+        "ENGINE": "main.db.postgresql_pool",
+        "NAME": "acctsys",
+        "OPTIONS": {},
+        "CONN_HEALTH_CHECKS": True,
+        "POOL": POOL,
+        **settings,
+    }
+    return base.DatabaseWrapper(settings_dict, alias="pool_test")
+
+
+def healthy_connection(autocommit=True):
+    return mock.MagicMock(autocommit=autocommit)
+
+
+def dropped_connection():
+    connection = healthy_connection()
+    cursor = connection.cursor.return_value.__enter__.return_value
+    cursor.execute.side_effect = psycopg2.OperationalError("server closed")
+    return connection
+
+
+class PooledDatabaseWrapperTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(base._pools, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pool = mock.Mock()
+        self.pool_class = mock.patch.object(
+            base, "ThreadSafeConnectionPool", return_value=self.pool
+        ).start()
+        self.addCleanup(mock.patch.stopall)
+        mock.patch.object(base.psycopg2.extras, "register_default_jsonb").start()
+
+    def test_connections_come_from_one_pool(self):
+        first, second = healthy_connection(), healthy_connection()
+        self.pool.getconn.side_effect = [first, second]
+        db = wrapper()
+        self.assertIs(db.get_new_connection({"dbname": "acctsys"}), first)
+        self.assertIs(db.get_new_connection({"dbname": "acctsys"}), second)
+        self.pool_class.assert_called_once_with(
+            minconn=1, maxconn=2, idle_timeout=60, dbname="acctsys"
+        )
+
+    def test_close_returns_the_connection(self):
+        connection = healthy_connection()
+        self.pool.getconn.return_value = connection
+        db = wrapper()
+        db.connection = db.get_new_connection({})
+        db._close()
+        self.pool.putconn.assert_called_once_with(connection)
+        connection.close.assert_not_called()
+
+    def test_dropped_connections_are_discarded(self):
+        dropped, healthy = dropped_connection(), healthy_connection()
+        self.pool.getconn.side_effect = [dropped, healthy]
+        self.assertIs(wrapper().get_new_connection({}), healthy)
+        dropped.close.assert_called_once_with()
+        self.pool.putconn.assert_called_once_with(dropped)
+
+    def test_open_transactions_are_rolled_back(self):
+        connection = healthy_connection(autocommit=False)
+        self.pool.getconn.return_value = connection
+        wrapper().get_new_connection({})
+        connection.rollback.assert_called_once_with()
+
+    def test_exhausted_pool_times_out(self):
+        self.pool.getconn.side_effect = PoolError("connection pool exhausted")
+        with self.assertRaisesMessage(
+            psycopg2.OperationalError, "Timed out waiting for a pooled"
+        ):
+            wrapper().get_new_connection({})
+        self.assertGreater(self.pool.getconn.call_count, 1)
+
+    def test_without_pool_connects_directly(self):
+        with mock.patch.object(psycopg2, "connect") as connect:
+            wrapper(POOL={}).get_new_connection({"dbname": "acctsys"})
+        connect.assert_called_once()
+        self.pool_class.assert_not_called()
+
+
+class PooledConnectionAgeCheckTests(SimpleTestCase):
+    def run_check(self, conn_max_age):
+        databases = {
+            "default": {
+                **connections["default"].settings_dict,
+                "ENGINE": "main.db.postgresql_pool",
+                "CONN_MAX_AGE": conn_max_age,
+            }
+        }
+        with mock.patch.dict(connections.settings, databases):
+            return [
+                error.id
+                for error in checks.run_checks()
+                if error.id.startswith("main.")
+            ]
+
+    def test_persistent_connections_warn(self):
+        self.assertIn("main.W002", self.run_check(60))
+
+    def test_closed_connections_pass(self):
+        self.assertNotIn("main.W002", self.run_check(0))
@@ -0,0 +1,146 @@
+import json
+import tempfile
+import uuid
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from main.benchmarking import verified_client
+from main.management.commands.slow_queries import summarize
+from main.models import LegalEntity, Partner
+from main.profiling import normalize_sql, read_records
+
+
+@override_settings(REQUEST_PROFILING=True)
+class RequestProfileMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        partner = Partner.objects.create(
+            id=uuid.uuid4(), name="Исполнитель", referral_percentage=0
+        )
+        for name in ("Альфа", "Бета"):
+            LegalEntity.objects.create(
+                id=uuid.uuid4(),
+                name=name,
+                partner=partner,
+                tax_number="1",
+                legal_entity_percentage=0,
+            )
+
+    def setUp(self):
+        # A new client loads the middleware again under the override.
+        self.client = verified_client()
+
+    def records(self, logs):
+        return [json.loads(line.split(":", 2)[2]) for line in logs.output]
+
+    def test_records_main_views(self):
+        with self.assertLogs("main.profiling", "INFO") as logs:
+            response = self.client.get(reverse("main:legal_entities_list"))
+        (record,) = self.records(logs)
+        self.assertEqual(record["view"], "main:legal_entities_list")
+        self.assertEqual(record["status"], 200)
+        self.assertGreater(record["queries"], 0)
+        self.assertGreater(record["template_ms"], 0)
+        self.assertEqual(record["response_bytes"], len(response.content))
+
+    def test_streaming_responses_are_measured_when_consumed(self):
+        url = reverse("main:legal_entities_data")
+        with self.assertLogs("main.profiling", "INFO") as logs:
+            response = self.client.get(url)
+            self.assertEqual(logs.output, [])
+            content = b"".join(response.streaming_content)
+        (record,) = self.records(logs)
+        self.assertEqual(record["view"], "main:legal_entities_data")
+        self.assertEqual(record["response_bytes"], len(content))
+
+    def test_other_apps_are_not_recorded(self):
+        with self.assertNoLogs("main.profiling", "INFO"):
+            self.client.get(reverse("two_factor:login"))
+
+    @override_settings(REQUEST_PROFILING=False)
+    def test_disabled(self):
+        with self.assertNoLogs("main.profiling", "INFO"):
+            self.client.get(reverse("main:legal_entities_list"))
+
+
+def record(view, duration_ms, queries=1, duplicates=()):
+    return {
+        "view": view,
+        "duration_ms": duration_ms,
+        "queries": queries,
+        "sql_ms": 1.0,
+        "template_ms": 1.0,
+        "response_bytes": 1024,
+        "duplicates": list(duplicates),
+    }
+
+
+class SlowQueriesTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.log = Path(directory.name) / "profile.log"
+
+    def write(self, path, records):
+        path.write_text("".join(json.dumps(r) + "\n" for r in records))
+
+    def test_normalize_sql_collapses_in_lists(self):
+        self.assertEqual(
+            normalize_sql("WHERE id IN (%s, %s, %s)"),
+            normalize_sql("WHERE id IN (%s, %s)"),
+        )
+
+    def test_reads_backups_oldest_first(self):
+        self.write(self.log, [record("main:new", 1)])
+        self.write(Path(f"{self.log}.1"), [record("main:older", 1)])
+        self.write(Path(f"{self.log}.2"), [record("main:oldest", 1)])
+        with open(f"{self.log}.1", "a") as f:
+            f.write("truncated {\n")
+        self.assertEqual(
+            [r["view"] for r in read_records(self.log)],
+            ["main:oldest", "main:older", "main:new"],
+        )
+
+    def test_summarize(self):
+        duplicate = {"sql": "SELECT 1", "count": 4, "ms": 2.0}
+        summary = summarize(
+            [
+                record("main:a", 10, queries=2),
+                record("main:a", 30, queries=6, duplicates=[duplicate]),
+                record("main:b", 5),
+            ]
+        )
+        self.assertEqual(summary["main:a"]["requests"], 2)
+        self.assertEqual(summary["main:a"]["p50_ms"], 20)
+        self.assertEqual(summary["main:a"]["queries"], 4)
+        self.assertEqual(
+            summary["main:a"]["duplicates"],
+            {"SELECT 1": {"max_count": 4, "requests": 1, "ms": 2.0}},
+        )
+
+    def test_report(self):
+        duplicate = {"sql": "SELECT partner", "count": 25, "ms": 9.0}
+        self.write(
+            self.log,
+            [
+                record("main:fast", 2),
+                record("main:slow", 200, duplicates=[duplicate]),
+            ],
+        )
+        out = self.call(sort="p95")
+        self.assertLess(out.index("main:slow"), out.index("main:fast"))
+        self.assertIn("main:slow: up to 25x per request", out)
+        self.assertIn("SELECT partner", out)
+
+    def test_empty_log(self):
+        with self.assertRaisesMessage(CommandError, "No profile records"):
+            self.call()
+
+    def call(self, **options):
+        out = StringIO()
+        call_command("slow_queries", file=str(self.log), stdout=out, **options)
+        return out.getvalue()
@@ -0,0 +1,114 @@
+import uuid
+from decimal import Decimal
+
+from django.test import TestCase
+
+from main.forms import ApplicationForm
+from main.importing import import_rows
+from main.models import Application, ApplicationChoices, LegalEntity, Partner
+from main.money import DERIVED_FIELDS
+from main.recalculation import recalculate_applications
+
+from .utils import local_cache
+
+
+@local_cache
+class DerivedAmountsTests(TestCase):
+    """Every writer derives the amounts from the executor's referral rate."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.executor = Partner.objects.create(
+            id=uuid.uuid4(), name="Исполнитель", referral_percentage=3, is_executor=True
+        )
+        cls.customer = Partner.objects.create(
+            id=uuid.uuid4(), name="Клиент", referral_percentage=0, is_executor=False
+        )
+        cls.sender, cls.receiver = (
+            LegalEntity.objects.create(
+                id=uuid.uuid4(),
+                name=name,
+                partner=partner,
+                tax_number="1",
+                legal_entity_percentage=0,
+            )
+            for name, partner in (
+                ("ООО Отправитель", cls.customer),
+                ("ООО Получатель", cls.executor),
+            )
+        )
+
+    def create_with_form(self):
+        form = ApplicationForm(
+            {
+                "status": ApplicationChoices.AWAITING.value,
+                "customer": self.customer.pk,
+                "executor": self.executor.pk,
+                "giving_side": self.executor.pk,
+                "sender": self.sender.pk,
+                "receiver": self.receiver.pk,
+                "initial_sum": "1000",
+                "executor_commission": "1.5",
+                "commission_with_interest": "2.25",
+                "comment": "Комментарий",
+            }
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        application = form.save(commit=False)
+        application.id = uuid.uuid4()
+        application.save(force_insert=True)
+        return application
+
+    def create_with_import(self):
+        report = import_rows(
+            "applications",
+            [
+                {
+                    "status": ApplicationChoices.AWAITING.value,
+                    "customer": "Клиент",
+                    "executor": "Исполнитель",
+                    "giving_side": "Исполнитель",
+                    "sender": "ООО Отправитель",
+                    "receiver": "ООО Получатель",
+                    "initial_sum": "1000",
+                    "executor_commission": "1.5",
+                    "commission_with_interest": "2.25",
+                }
+            ],
+        )
+        self.assertEqual(report.errors, [])
+        return Application.objects.latest("created_at")
+
+    def amounts(self, application):
+        application.refresh_from_db()
+        return {field: getattr(application, field) for field in DERIVED_FIELDS}
+
+    def test_writers_agree(self):
+        expected = {
+            "sum_with_executors_commission": Decimal("985.00"),
+            "uncargo_sum": Decimal("977.50"),
+            "referral_percentage": Decimal("30.00"),
+            "clean_income": Decimal("-22.50"),
+        }
+        from_form = self.create_with_form()
+        from_import = self.create_with_import()
+        self.assertEqual(self.amounts(from_form), expected)
+        self.assertEqual(self.amounts(from_import), expected)
+
+        self.assertEqual(recalculate_applications(), 2)
+        self.assertEqual(self.amounts(from_form), expected)
+        self.assertEqual(self.amounts(from_import), expected)
+
+    def test_edit_form_shows_stored_amounts(self):
+        application = self.create_with_form()
+        form = ApplicationForm(instance=application)
+        for field, amount in self.amounts(application).items():
+            self.assertEqual(form.fields[field].initial, amount, field)
+
+    def test_rate_change_is_recalculated(self):
+        application = self.create_with_form()
+        Partner.objects.filter(pk=self.executor.pk).update(referral_percentage=5)
+        self.assertEqual(recalculate_applications(chunk_size=1), 1)
+        amounts = self.amounts(application)
+        self.assertEqual(amounts["referral_percentage"], Decimal("50.00"))
+        self.assertEqual(amounts["clean_income"], Decimal("-42.50"))
@@ -0,0 +1,80 @@
+import datetime
+from unittest import mock
+
+from django.db import transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from main import reporting
+from main.models import Application, RollupDimension
+
+from .utils import COUNTS, save_seeded
+
+
+class Rollback(Exception):
+    pass
+
+
+class RollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for kind in ("partners", "legal_entities"):
+            save_seeded(kind, 0, COUNTS[kind])
+        save_seeded("applications", 0, 6)
+        cls.today = timezone.localdate()
+        cls.yesterday = cls.today - datetime.timedelta(days=1)
+        moved = Application.objects.order_by("pk")[:2]
+        Application.objects.filter(pk__in=moved).update(
+            created_date=reporting._midnight(cls.yesterday)
+            + datetime.timedelta(hours=12)
+        )
+        reporting.refresh(full=True)
+
+    def applications_on(self, day):
+        return sum(
+            row["applications"]
+            for row in reporting.report(
+                "day", RollupDimension.STATUS, start_date=day, end_date=day
+            )
+        )
+
+    def test_full_refresh(self):
+        self.assertEqual(self.applications_on(self.yesterday), 2)
+        self.assertEqual(self.applications_on(self.today), 4)
+        month = reporting.report("month", RollupDimension.EXECUTOR)
+        self.assertEqual(reporting.totals(month)["applications"], 6)
+
+    def test_changed_applications_are_folded_in(self):
+        application = Application.objects.filter(created_date__date=self.today).first()
+        application.created_date = reporting._midnight(self.yesterday)
+        application.save()
+        self.assertEqual(reporting.refresh(), 2)
+        self.assertEqual(self.applications_on(self.yesterday), 3)
+        self.assertEqual(self.applications_on(self.today), 3)
+
+    def test_delete_refreshes_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Application.objects.filter(
+                created_date__date=self.yesterday
+            ).first().delete()
+            self.assertEqual(self.applications_on(self.yesterday), 2)
+        self.assertEqual(self.applications_on(self.yesterday), 1)
+
+    def test_deletes_share_one_refresh(self):
+        with mock.patch.object(reporting, "refresh_days") as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                for application in Application.objects.all():
+                    application.delete()
+        refresh.assert_called_once_with({self.yesterday, self.today})
+
+    def test_rolled_back_days_are_dropped(self):
+        with mock.patch.object(reporting, "refresh_days") as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                try:
+                    with transaction.atomic():
+                        reporting.refresh_days_on_commit([self.yesterday])
+                        raise Rollback
+                except Rollback:
+                    pass
+                reporting.refresh_days_on_commit([self.today])
+        refresh.assert_called_once_with({self.today})
@@ -0,0 +1,144 @@
+import uuid
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from main import search
+from main.benchmarking import verified_client
+from main.models import Application, ApplicationChoices, LegalEntity, Partner
+from main.search import search_applications, search_legal_entities
+
+from .utils import local_cache
+
+
+def partner(name, is_executor):
+    return Partner.objects.create(
+        id=uuid.uuid4(), name=name, referral_percentage=0, is_executor=is_executor
+    )
+
+
+def legal_entity(name, owner, tax_number="7700000000"):
+    return LegalEntity.objects.create(
+        id=uuid.uuid4(),
+        name=name,
+        partner=owner,
+        tax_number=tax_number,
+        legal_entity_percentage=0,
+    )
+
+
+def application(executor, customer, comment, receiver=None):
+    return Application.objects.create(
+        id=uuid.uuid4(),
+        status=ApplicationChoices.AWAITING.value,
+        executor=executor,
+        customer=customer,
+        receiver=receiver,
+        initial_sum=100,
+        executor_commission=0,
+        sum_with_executors_commission=100,
+        commission_with_interest=0,
+        uncargo_sum=100,
+        referral_percentage=0,
+        clean_income=0,
+        comment=comment,
+    )
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.executor = partner("Северный логистик", True)
+        cls.customer = partner("Южная торговля", False)
+        cls.entity = legal_entity("Ромашка", cls.executor, tax_number="7712345678")
+        cls.other_entity = legal_entity("Василек", cls.customer)
+        cls.by_comment = application(
+            cls.customer, cls.customer, "Оплата поставки цемента"
+        )
+        cls.by_receiver = application(
+            cls.customer, cls.customer, "Без комментария", receiver=cls.entity
+        )
+        cls.by_executor = application(cls.executor, cls.customer, "Аванс")
+
+    def applications(self, text):
+        return list(search_applications(Application.objects.all(), text))
+
+    def legal_entities(self, text):
+        return list(search_legal_entities(LegalEntity.objects.all(), text))
+
+    def test_comment(self):
+        self.assertEqual(self.applications("цемент"), [self.by_comment])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.applications("поставки цемента"), [self.by_comment])
+        self.assertEqual(self.applications("поставки кирпича"), [])
+
+    def test_partner_and_legal_entity_names(self):
+        self.assertEqual(self.applications("логистик"), [self.by_executor])
+        self.assertEqual(self.applications("Ромашк"), [self.by_receiver])
+
+    def test_comment_matches_rank_first(self):
+        self.by_executor.comment = "Аванс логистику"
+        self.by_executor.save()
+        both = application(self.executor, self.customer, "Прочее")
+        self.assertEqual(self.applications("логистик"), [self.by_executor, both])
+
+    def test_short_words_match_nothing(self):
+        self.assertEqual(self.applications("це"), [])
+
+    def test_quotes_are_escaped(self):
+        self.assertEqual(search._fts_query('це "цемент'), '"""цемент"')
+        self.assertEqual(self.applications('"цемент'), [])
+
+    def test_index_follows_writes(self):
+        self.by_comment.comment = "Оплата поставки кирпича"
+        self.by_comment.save()
+        self.assertEqual(self.applications("цемент"), [])
+        self.assertEqual(self.applications("кирпич"), [self.by_comment])
+        self.by_comment.delete()
+        self.assertEqual(self.applications("кирпич"), [])
+
+    def test_legal_entities(self):
+        self.assertEqual(self.legal_entities("12345"), [self.entity])
+        self.assertEqual(self.legal_entities("Васил"), [self.other_entity])
+        self.assertEqual(self.legal_entities("торговл"), [self.other_entity])
+
+
+@local_cache
+class SearchViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        SearchTests.setUpTestData.__func__(cls)
+
+    def setUp(self):
+        self.client = verified_client()
+
+    def test_application_list(self):
+        response = self.client.get(reverse("main:application_list"), {"q": "цемент"})
+        self.assertEqual(list(response.context["applications"]), [self.by_comment])
+
+    def test_legal_entities_list(self):
+        response = self.client.get(reverse("main:legal_entities_list"), {"q": "Ромашк"})
+        self.assertEqual(list(response.context["legals"]), [self.entity])
+
+    def test_too_short_query(self):
+        response = self.client.get(reverse("main:legal_entities_list"), {"q": "Ро"})
+        self.assertTrue(response.context["search_form"].errors)
+        self.assertEqual(len(response.context["legals"]), 2)
+
+
+class SqliteIndexTests(TransactionTestCase):
+    """Outside a test transaction: SQLite can't roll back dropping the index."""
+
+    def test_missing_index_is_rebuilt(self):
+        executor = partner("Северный логистик", True)
+        customer = partner("Южная торговля", False)
+        found = application(executor, customer, "Оплата поставки цемента")
+        fts = connection.ops.quote_name(search.fts_table(Application))
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE {fts}")
+        search.ensure_sqlite_index("default")
+        self.assertEqual(
+            list(search_applications(Application.objects.all(), "цемент")), [found]
+        )
@@ -0,0 +1,97 @@
+from django.core.management import CommandError, call_command
+from django.db.models import F
+from django.test import TestCase
+
+from main import balances, seeding
+from main.models import Application, Income, LegalEntity, Outcome, Partner
+from main.models import PartnerBalance
+
+COUNTS = {
+    "partners": 5,
+    "legal_entities": 4,
+    "incomes": 7,
+    "outcomes": 6,
+    "applications": 9,
+}
+
+
+def seed_db(**options):
+    options = {**COUNTS, "chunk_size": 4, "verbosity": 0, **options}
+    call_command("seed_db", **options)
+
+
+def fields(obj):
+    """Field values, leaving out the timestamps set on insert."""
+    return {
+        field.attname: getattr(obj, field.attname)
+        for field in obj._meta.concrete_fields
+        if not (
+            getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+        )
+    }
+
+
+class SeedDbTests(TestCase):
+    def test_creates_the_requested_rows(self):
+        seed_db()
+        for model, kind in (
+            (Partner, "partners"),
+            (LegalEntity, "legal_entities"),
+            (Income, "incomes"),
+            (Outcome, "outcomes"),
+            (Application, "applications"),
+        ):
+            self.assertEqual(model.objects.count(), COUNTS[kind], kind)
+        self.assertEqual(PartnerBalance.objects.count(), COUNTS["partners"])
+        self.assertEqual(balances.rebuild(dry_run=True), [])
+
+    def test_partners_keep_their_roles(self):
+        seed_db()
+        self.assertFalse(Income.objects.exclude(executor__is_executor=True).exists())
+        self.assertFalse(Outcome.objects.exclude(customer__is_executor=False).exists())
+        applications = Application.objects.all()
+        self.assertFalse(applications.exclude(executor__is_executor=True).exists())
+        self.assertFalse(applications.exclude(customer__is_executor=False).exists())
+        # Amounts are derived from the executor's referral rate.
+        self.assertFalse(
+            applications.exclude(
+                executor_commission=F("executor__referral_percentage")
+            ).exists()
+        )
+
+    def test_rows_depend_on_seed_and_index_only(self):
+        for kind, build in seeding.BUILDERS.items():
+            for index in range(COUNTS[kind]):
+                self.assertEqual(
+                    fields(build(3, index, COUNTS)), fields(build(3, index, COUNTS))
+                )
+        self.assertNotEqual(seeding.partner_id(3, 0), seeding.partner_id(4, 0))
+
+    def test_chunk_size_does_not_change_rows(self):
+        seed_db(seed=5, chunk_size=1)
+        one_by_one = {obj.pk: fields(obj) for obj in Application.objects.all()}
+        Application.objects.all().delete()
+        seeding.seed_chunk("applications", 0, COUNTS["applications"], 5, COUNTS)
+        chunked = {obj.pk: fields(obj) for obj in Application.objects.all()}
+        self.assertEqual(one_by_one, chunked)
+
+    def test_another_seed_adds_rows(self):
+        seed_db(seed=1)
+        seed_db(seed=2)
+        self.assertEqual(Application.objects.count(), 2 * COUNTS["applications"])
+
+    def test_no_balances(self):
+        seed_db(no_balances=True)
+        self.assertFalse(PartnerBalance.objects.exists())
+
+    def test_references_need_both_roles(self):
+        with self.assertRaisesMessage(CommandError, "At least two partners"):
+            seed_db(partners=1)
+
+    def test_applications_need_legal_entities(self):
+        with self.assertRaisesMessage(CommandError, "need at least one legal entity"):
+            seed_db(legal_entities=0)
+
+    def test_copy_needs_postgresql(self):
+        with self.assertRaisesMessage(CommandError, "COPY is only available"):
+            seed_db(method="copy")
@@ -0,0 +1,111 @@
+import json
+import uuid
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from main.benchmarking import verified_client
+from main.models import LegalEntity, Partner
+from main.streaming import (
+    StreamingJsonResponse,
+    ajson_array,
+    ajson_object,
+    csv_rows,
+    json_array,
+    json_object,
+)
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+async def _ajoin(chunks):
+    return [chunk async for chunk in chunks]
+
+
+ajoin = async_to_sync(_ajoin)
+
+
+class JsonEncodingTests(SimpleTestCase):
+    def test_json_array_batches(self):
+        self.assertEqual(
+            list(json_array(range(5), batch_size=2)), ["[0,1", ",2,3", ",4", "]"]
+        )
+        self.assertEqual(list(json_array([])), ["[]"])
+
+    def test_json_object_streams_iterators(self):
+        chunks = list(
+            json_object(
+                [
+                    ("rows", iter([{"amount": Decimal("1.50")}])),
+                    ("list", [1, 2]),
+                    ("total", Decimal("1.50")),
+                ]
+            )
+        )
+        self.assertEqual(
+            json.loads("".join(chunks)),
+            {"rows": [{"amount": "1.50"}], "list": [1, 2], "total": "1.50"},
+        )
+        self.assertEqual(list(json_object([])), ["{}"])
+
+    def test_json_object_consumes_members_lazily(self):
+        consumed = []
+
+        def members():
+            yield "rows", (consumed.append(row) or row for row in range(3))
+            # Runs after the rows above were streamed.
+            yield "count", len(consumed)
+
+        self.assertEqual(
+            json.loads("".join(json_object(members()))),
+            {"rows": [0, 1, 2], "count": 3},
+        )
+
+    def test_async_encoders_match(self):
+        self.assertEqual(
+            ajoin(ajson_array(_aiter(range(5)), batch_size=2)),
+            list(json_array(range(5), batch_size=2)),
+        )
+        self.assertEqual(ajoin(ajson_array(_aiter([]))), ["[]"])
+        members = _aiter([("rows", _aiter([1, 2])), ("total", 3)])
+        self.assertEqual(
+            "".join(ajoin(ajson_object(members))), '{"rows":[1,2],"total":3}'
+        )
+
+    def test_csv_rows(self):
+        chunks = list(csv_rows(["a", "b"], [(1, "x"), (2, "y,z")], batch_size=1))
+        self.assertEqual(chunks, ["\ufeffa,b\r\n", "1,x\r\n", '2,"y,z"\r\n'])
+
+    def test_response(self):
+        response = StreamingJsonResponse(json_array([1]))
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(b"".join(response), b"[1]")
+
+
+class LegalEntitiesDataTests(TestCase):
+    def test_streams_every_legal_entity(self):
+        partner = Partner.objects.create(
+            id=uuid.uuid4(), name="Исполнитель", referral_percentage=0, is_executor=True
+        )
+        for number in range(3):
+            LegalEntity.objects.create(
+                id=uuid.uuid4(),
+                name=f"ООО {number}",
+                partner=partner,
+                tax_number=str(number),
+                legal_entity_percentage=1.5,
+            )
+
+        response = verified_client().get(reverse("main:legal_entities_data"))
+        self.assertTrue(response.streaming)
+        rows = json.loads(b"".join(response.streaming_content))
+        self.assertCountEqual(
+            [row["name"] for row in rows], ["ООО 0", "ООО 1", "ООО 2"]
+        )
+        self.assertEqual(rows[0]["partner_id"], str(partner.pk))
+        self.assertEqual(rows[0]["legal_entity_percentage"], 1.5)
@@ -0,0 +1,86 @@
+import warnings
+
+from django.test import TestCase
+from django.urls import reverse
+
+from main.benchmarking import verified_client
+from main.models import Application
+from main.seeding import partner_id
+from main.testing import QueryCountAssertionsMixin
+
+from .utils import COUNTS, SEED, Seeder, local_cache
+
+
+@local_cache
+class ViewQueryCountTests(QueryCountAssertionsMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seeder = Seeder()
+        cls.seeder.add("partners", COUNTS["partners"])
+        cls.seeder.add("legal_entities", COUNTS["legal_entities"])
+
+    def setUp(self):
+        self.client = verified_client()
+
+    def get(self, name, **params):
+        response = self.client.get(reverse(f"main:{name}"), params)
+        self.assertEqual(response.status_code, 200)
+        if response.streaming:
+            with warnings.catch_warnings():
+                # The sync test client buffers async streaming content.
+                warnings.simplefilter("ignore")
+                b"".join(response)
+        return response
+
+    def assertConstantViewQueries(self, name, kinds, **params):
+        def add_rows():
+            for kind in kinds:
+                self.seeder.add(kind, 5)
+
+        self.assertConstantQueries(lambda: self.get(name, **params), add_rows)
+
+    def test_application_list(self):
+        self.assertConstantViewQueries("application_list", ["applications"])
+
+    def test_application_list_filtered_by_sum(self):
+        self.assertConstantViewQueries(
+            "application_list",
+            ["applications"],
+            executor=partner_id(SEED, 0),
+            sort_by_sum="desc",
+        )
+
+    def test_application_update_form(self):
+        self.seeder.add("applications", 1)
+        application = Application.objects.get()
+        self.assertConstantQueries(
+            lambda: self.client.get(
+                reverse("main:application_update", args=[application.pk])
+            ),
+            lambda: self.seeder.add("applications", 5),
+        )
+
+    def test_income_list(self):
+        self.assertConstantViewQueries("income_list", ["incomes"])
+
+    def test_outcome_list(self):
+        self.assertConstantViewQueries("outcome_list", ["outcomes"])
+
+    def test_legal_entities_list(self):
+        self.assertConstantViewQueries("legal_entities_list", ["legal_entities"])
+
+    def test_partner_list(self):
+        self.assertConstantViewQueries("partner_list", ["partners"])
+
+    def test_discrepancy_view(self):
+        self.assertConstantViewQueries("discrepancy_view", ["partners"])
+
+    def test_partner_ledger(self):
+        for role, index in (("executor", 0), ("customer", 1)):
+            with self.subTest(role=role):
+                self.assertConstantViewQueries(
+                    "partner_data_whole",
+                    ["applications", "incomes", "outcomes"],
+                    partner_id=partner_id(SEED, index),
+                    role=role,
+                )
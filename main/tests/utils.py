@@ -0,0 +1,52 @@
+from collections import defaultdict
+
+from django.test import override_settings
+
+from main import seeding
+from main.testing import temporary_cache
+
+SEED = 1
+COUNTS = {
+    "partners": 6,
+    "legal_entities": 6,
+    "incomes": 0,
+    "outcomes": 0,
+    "applications": 0,
+}
+
+# Cache generation tokens are bumped on commit, which never happens inside a
+# TestCase. With a process-local cache nothing is cached at all.
+local_cache = override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+
+
+class Seeder:
+    """Inserts the next rows of each kind of ``main.seeding`` data."""
+
+    def __init__(self):
+        self.inserted = defaultdict(int)
+
+    def add(self, kind, count):
+        start = self.inserted[kind]
+        seeding.seed_chunk(kind, start, start + count, SEED, COUNTS)
+        self.inserted[kind] += count
+
+
+def save_seeded(kind, start, stop):
+    """Save seeded rows one by one, so the model signals run."""
+    build = seeding.BUILDERS[kind]
+    objs = [build(SEED, index, COUNTS) for index in range(start, stop)]
+    for obj in objs:
+        obj.save(force_insert=True)
+    return objs
+
+
+class TemporaryCacheMixin:
+    """Runs each test against a file cache of its own, like production's."""
+
+    def setUp(self):
+        super().setUp()
+        cache = temporary_cache()
+        cache.__enter__()
+        self.addCleanup(cache.__exit__, None, None, None)
@@ -7,6 +7,7 @@ urlpatterns = [
     path("application/new/", views.application_create_view, name="application_create"),
     path("application/<uuid:pk>/", views.application_update, name="application_update"),
     path("application/list/", views.application_list, name="application_list"),
+    path("application/export/", views.application_export, name="application_export"),
     path(
         "application/<uuid:pk>/delete/",
         views.application_delete,
@@ -42,5 +43,13 @@ urlpatterns = [
     path("outcome/list/", views.outcome_list, name="outcome_list"),
     path("outcome/<uuid:pk>/", views.outcome_update, name="outcome_update"),
     path("outcome/<uuid:pk>/delete/", views.outcome_delete, name="outcome_delete"),
+    path("import/", views.import_data, name="import_data"),
+    path("api/<str:resource>/", views.api_list, name="api_list"),
+    path("report/", views.report_view, name="report"),
+    path("report/data/", views.report_data, name="report_data"),
+    path("report/refresh/", views.report_refresh, name="report_refresh"),
+    path("job/<uuid:pk>/", views.job_detail, name="job_detail"),
+    path("job/<uuid:pk>/data/", views.job_data, name="job_data"),
+    path("job/<uuid:pk>/file/", views.job_file, name="job_file"),
     path("discrepancy/", views.discrepancy_view, name="discrepancy_view"),
 ]
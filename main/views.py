@@ -1,7 +1,10 @@
+import asyncio
 import logging
+import uuid
 
-from django.db.models import Q, Sum
-from django.http import JsonResponse
+from asgiref.sync import sync_to_async
+from django.db import DatabaseError, transaction
+from django.http import FileResponse, Http404, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from two_factor.utils import default_device
 
@@ -12,24 +15,92 @@ from .forms import (
     IncomeForm,
     OutcomeForm,
     ApplicationFilterForm,
+    EditConflict,
     IncomeFilterForm,
+    ImportForm,
+    OutcomeFilterForm,
+    ReportFilterForm,
+    SearchForm,
+)
+from .caching import cached_rows
+from .conditional import (
+    collection_state,
+    collection_validators,
+    conditional_response,
+    timestamp_validators,
+)
+from .discrepancy import partner_ledger_members
+from . import api, jobs, reporting
+from .models import (
+    Application,
+    LegalEntity,
+    Partner,
+    Income,
+    Job,
+    JobStatus,
+    Outcome,
+    RollupDimension,
+)
+from .pagination import KeysetPage, KeysetPaginator
+from .querysets import (
+    APPLICATION_EXPORT_COLUMNS,
+    application_export_rows,
+    application_list_queryset,
+    application_paginator,
+    filter_applications,
+    income_list_queryset,
+    legal_entity_list_queryset,
+    outcome_list_queryset,
+    partner_list_queryset,
+    payment_paginator,
+    sorts_by_sum,
+)
+from .search import SEARCH_LIMIT, search_legal_entities
+from .streaming import (
+    STREAM_CHUNK_SIZE,
+    StreamingCsvResponse,
+    StreamingJsonResponse,
+    ajson_object,
+    csv_rows,
+    json_array,
+    json_object,
 )
-from .models import Application, LegalEntity, Partner, Income, Outcome
 
 
 logger = logging.getLogger(__name__)
 
+APPLICATIONS_PER_PAGE = 50
+LIST_PER_PAGE = 50
+
+
+def _otp_redirect(request):
+    if not request.user.is_authenticated or (
+        not request.user.is_verified() and default_device(request.user)
+    ):
+        return redirect("two_factor:login")
+    if not request.user.is_verified():
+        return redirect("two_factor:setup")
+    return None
+
 
 def otp_required(view_func):
     """Decorator which verifies that the user logged in using OTP."""
 
+    if asyncio.iscoroutinefunction(view_func):
+
+        async def _wrapped_async_view(request, *args, **kwargs):
+            # The session and user are loaded lazily with the sync ORM.
+            response = await sync_to_async(_otp_redirect)(request)
+            if response is not None:
+                return response
+            return await view_func(request, *args, **kwargs)
+
+        return _wrapped_async_view
+
     def _wrapped_view(request, *args, **kwargs):
-        if not request.user.is_authenticated or (
-            not request.user.is_verified() and default_device(request.user)
-        ):
-            return redirect("two_factor:login")
-        if not request.user.is_verified():
-            return redirect("two_factor:setup")
+        response = _otp_redirect(request)
+        if response is not None:
+            return response
         return view_func(request, *args, **kwargs)
 
     return _wrapped_view
@@ -41,13 +112,14 @@ def application_create_view(request):
         form = ApplicationForm(request.POST)
         if form.is_valid():
             application = form.save(commit=False)
-            form.update_calculated_fields()
+            application.id = uuid.uuid4()
             try:
-                application.save()
-                return redirect("application_list")
-            except Exception as e:
-                logger.error(f"Error saving application: {e}", exc_info=True)
-                return redirect("transaction_failed")
+                with transaction.atomic():
+                    application.save(force_insert=True)
+            except DatabaseError:
+                logger.exception("Error saving application")
+                return redirect("main:transaction_failed")
+            return redirect("main:application_list")
     else:
         form = ApplicationForm()
     return render(request, "application/application_form.html", {"form": form})
@@ -55,68 +127,131 @@ def application_create_view(request):
 
 @otp_required
 def application_list(request):
-    applications = Application.objects.all()
+    applications = application_list_queryset(Application.objects.all())
     filter_form = ApplicationFilterForm(request.GET)
+    sort_by_sum = request.GET.get("sort_by_sum")
+    searching = False
 
     if filter_form.is_valid():
-        customer = filter_form.cleaned_data.get("customer")
-        executor = filter_form.cleaned_data.get("executor")
-        legal_entity = filter_form.cleaned_data.get("legal_entity")
-        start_date = filter_form.cleaned_data.get("start_date")
-        end_date = filter_form.cleaned_data.get("end_date")
-        sort_by_sum = request.GET.get("sort_by_sum")
-
-        if customer:
-            applications = applications.filter(customer=customer)
-        if executor:
-            applications = applications.filter(executor=executor)
-        if legal_entity:
-            applications = applications.filter(
-                Q(receiver=legal_entity) | Q(sender=legal_entity)
-            )
-        if start_date and end_date:
-            applications = applications.filter(
-                created_date__range=[start_date, end_date]
-            )
-        elif start_date:
-            applications = applications.filter(created_date__gte=start_date)
-        elif end_date:
-            applications = applications.filter(created_date__lte=end_date)
-
-        if sort_by_sum:
-            if sort_by_sum == "asc":
-                applications = applications.order_by("initial_sum")
-            elif sort_by_sum == "desc":
-                applications = applications.order_by("-initial_sum")
-
-    if not sort_by_sum:
-        applications = applications.order_by("-created_date")
+        applications = filter_applications(applications, **filter_form.cleaned_data)
+        searching = bool(filter_form.cleaned_data["q"])
+
+    models = (Application, Partner, LegalEntity)
+    if searching and not sorts_by_sum(sort_by_sum):
+        # Ranked search results have no stable key to page on; show the best.
+        page = cached_rows(
+            "application_search",
+            models,
+            lambda: KeysetPage(list(applications[:SEARCH_LIMIT])),
+            filter_form.cleaned_data,
+        )
+    else:
+        paginator = application_paginator(
+            applications, sort_by_sum, per_page=APPLICATIONS_PER_PAGE
+        )
+        filters = filter_form.cleaned_data if filter_form.is_valid() else None
+        page = _cached_page(request, "application_list", models, paginator, filters)
 
     return render(
         request,
         "application/application_list.html",
-        {"applications": applications, "filter_form": filter_form},
+        {
+            "applications": page,
+            "filter_form": filter_form,
+            **_page_context(request, page),
+            "export_query": _filter_params(request).urlencode(),
+        },
     )
 
 
+@otp_required
+def application_export(request):
+    if request.GET.get("background"):
+        params = _filter_params(request)
+        params.pop("background")
+        job = jobs.enqueue("export_applications", {"query": params.urlencode()})
+        return redirect("main:job_detail", pk=job.pk)
+
+    return StreamingCsvResponse(
+        csv_rows(
+            [heading for _, heading in APPLICATION_EXPORT_COLUMNS],
+            application_export_rows(request.GET).iterator(chunk_size=STREAM_CHUNK_SIZE),
+        ),
+        filename="applications.csv",
+    )
+
+
+def _cached_page(request, namespace, models, paginator, *key):
+    """The page of ``paginator`` the request's cursor points at, cached."""
+    after, before = request.GET.get("after"), request.GET.get("before")
+    return cached_rows(
+        namespace,
+        models,
+        lambda: paginator.page(after=after, before=before),
+        *key,
+        paginator.cursor_key(after, before),
+    )
+
+
+def _page_context(request, page):
+    return {
+        "next_query": _cursor_query(request, "after", page.next_cursor),
+        "prev_query": _cursor_query(request, "before", page.prev_cursor),
+    }
+
+
+def _filter_params(request):
+    params = request.GET.copy()
+    params.pop("after", None)
+    params.pop("before", None)
+    return params
+
+
+def _cursor_query(request, direction, cursor):
+    if cursor is None:
+        return None
+    params = _filter_params(request)
+    params[direction] = cursor
+    return params.urlencode()
+
+
 @otp_required
 def application_update(request, pk):
     application_entity = get_object_or_404(Application, pk=pk)
     if request.method == "POST":
         form = ApplicationForm(request.POST, instance=application_entity)
         if form.is_valid():
-            form.save()
-            return redirect("application_list")
+            try:
+                form.save_changes()
+            except EditConflict:
+                form = _conflicting_application_form(request, pk)
+            else:
+                return redirect("main:application_list")
     else:
         form = ApplicationForm(instance=application_entity)
     return render(request, "application/application_form.html", {"form": form})
 
 
+def _conflicting_application_form(request, pk):
+    """The user's input over the current row, so saving again overwrites it."""
+    current = get_object_or_404(Application, pk=pk)
+    data = request.POST.copy()
+    data["version"] = current.updated_at.isoformat()
+    form = ApplicationForm(data, instance=current)
+    form.is_valid()
+    form.add_error(
+        None,
+        "Заявку изменили, пока вы ее редактировали. Проверьте данные и "
+        "сохраните еще раз, чтобы перезаписать изменения.",
+    )
+    return form
+
+
 @otp_required
 def application_delete(request, pk):
     application = get_object_or_404(Application, pk=pk)
     application.delete()
-    return redirect("application_list")
+    return redirect("main:application_list")
 
 
 def transaction_success(request):
@@ -129,8 +264,28 @@ def transaction_failed(request):
 
 @otp_required
 def legal_entities_list(request):
-    legals = LegalEntity.objects.all()
-    return render(request, "legal/legal_entities_list.html", {"legals": legals})
+    search_form = SearchForm(request.GET)
+    legals = legal_entity_list_queryset(LegalEntity.objects.all())
+    models = (LegalEntity, Partner)
+    if search_form.is_valid() and search_form.cleaned_data["q"]:
+        query = search_form.cleaned_data["q"]
+        page = cached_rows(
+            "legal_entities_search",
+            models,
+            lambda: KeysetPage(
+                list(search_legal_entities(legals, query)[:SEARCH_LIMIT])
+            ),
+            query,
+        )
+    else:
+        paginator = KeysetPaginator(legals, "name", per_page=LIST_PER_PAGE)
+        page = _cached_page(request, "legal_entities_list", models, paginator)
+
+    return render(
+        request,
+        "legal/legal_entities_list.html",
+        {"legals": page, "search_form": search_form, **_page_context(request, page)},
+    )
 
 
 @otp_required
@@ -148,19 +303,41 @@ def legal_entities_create(request):
 
 @otp_required
 def legal_entities_data(request):
-    legal_entity_data = LegalEntity.objects.all()
-    data = list(
-        legal_entity_data.values(
-            "id",
-            "name",
-            "partner_id",
-            "tax_number",
-            "legal_entity_percentage",
-            "created_at",
-            "updated_at",
-        )
+    partner_id = request.GET.get("partner_id")
+    if partner_id:
+        return _partner_legal_entities_data(request, partner_id)
+
+    legal_entity_data = LegalEntity.objects.values(
+        "id",
+        "name",
+        "partner_id",
+        "tax_number",
+        "legal_entity_percentage",
+        "created_at",
+        "updated_at",
+    )
+    return StreamingJsonResponse(
+        json_array(legal_entity_data.iterator(chunk_size=STREAM_CHUNK_SIZE))
+    )
+
+
+def _partner_legal_entities_data(request, partner_id):
+    try:
+        partner_id = uuid.UUID(partner_id)
+    except ValueError:
+        return JsonResponse({"error": "Invalid partner_id"}, status=400)
+
+    legal_entity_data = LegalEntity.objects.filter(partner_id=partner_id)
+    etag, last_modified = collection_validators(legal_entity_data)
+    return conditional_response(
+        request,
+        etag,
+        last_modified,
+        lambda: JsonResponse(
+            list(legal_entity_data.order_by("name").values("id", "name")),
+            safe=False,
+        ),
     )
-    return JsonResponse(data, safe=False)
 
 
 @otp_required
@@ -185,8 +362,13 @@ def legal_entities_delete(request, pk):
 
 @otp_required
 def partner_list(request):
-    executors = Partner.objects.filter(is_executor=True)
-    customers = Partner.objects.filter(is_executor=False)
+    partners = cached_rows(
+        "partner_list",
+        (Partner,),
+        lambda: list(partner_list_queryset(Partner.objects.all())),
+    )
+    executors = [partner for partner in partners if partner.is_executor]
+    customers = [partner for partner in partners if not partner.is_executor]
     return render(
         request,
         "partner/partner_list.html",
@@ -229,65 +411,53 @@ def partner_delete(request, pk):
 
 @otp_required
 def income_list(request):
-    incomes = Income.objects.all()
+    incomes = income_list_queryset(Income.objects.all())
     filter_form = IncomeFilterForm(request.GET)
+    executor = sort_by_amount = sort_by_created_at = None
 
     if filter_form.is_valid():
-        executor = filter_form.cleaned_data.get("executor")
-        sort_by_amount = request.GET.get("sort_by_amount")
-        sort_by_created_at = request.GET.get("sort_by_created_at")
-
+        executor = filter_form.cleaned_data["executor"]
+        sort_by_amount = filter_form.cleaned_data["sort_by_amount"]
+        sort_by_created_at = filter_form.cleaned_data["sort_by_created_at"]
         if executor:
             incomes = incomes.filter(executor=executor)
 
-        if sort_by_amount:
-            if sort_by_amount == "asc":
-                incomes = incomes.order_by("amount")
-            elif sort_by_amount == "desc":
-                incomes = incomes.order_by("-amount")
-
-        if sort_by_created_at:
-            if sort_by_created_at == "asc":
-                incomes = incomes.order_by("created_at")
-            elif sort_by_created_at == "desc":
-                incomes = incomes.order_by("-created_at")
+    paginator = payment_paginator(
+        incomes, sort_by_amount, sort_by_created_at, per_page=LIST_PER_PAGE
+    )
+    page = _cached_page(request, "income_list", (Income, Partner), paginator, executor)
 
     return render(
         request,
         "income/income_list.html",
-        {"incomes": incomes, "filter_form": filter_form},
+        {"incomes": page, "filter_form": filter_form, **_page_context(request, page)},
     )
 
 
 @otp_required
 def outcome_list(request):
-    outcomes = Outcome.objects.all()
-    filter_form = OutcomeForm(request.GET)
+    outcomes = outcome_list_queryset(Outcome.objects.all())
+    filter_form = OutcomeFilterForm(request.GET)
+    customer = sort_by_amount = sort_by_created_at = None
 
     if filter_form.is_valid():
-        executor = filter_form.cleaned_data.get("customer")
-        sort_by_amount = request.GET.get("sort_by_amount")
-        sort_by_created_at = request.GET.get("sort_by_created_at")
-
-        if executor:
-            outcomes = outcomes.filter(executor=executor)
-
-        if sort_by_amount:
-            if sort_by_amount == "asc":
-                outcomes = outcomes.order_by("amount")
-            elif sort_by_amount == "desc":
-                outcomes = outcomes.order_by("-amount")
+        customer = filter_form.cleaned_data["customer"]
+        sort_by_amount = filter_form.cleaned_data["sort_by_amount"]
+        sort_by_created_at = filter_form.cleaned_data["sort_by_created_at"]
+        if customer:
+            outcomes = outcomes.filter(customer=customer)
 
-        if sort_by_created_at:
-            if sort_by_created_at == "asc":
-                outcomes = outcomes.order_by("created_at")
-            elif sort_by_created_at == "desc":
-                outcomes = outcomes.order_by("-created_at")
+    paginator = payment_paginator(
+        outcomes, sort_by_amount, sort_by_created_at, per_page=LIST_PER_PAGE
+    )
+    page = _cached_page(
+        request, "outcome_list", (Outcome, Partner), paginator, customer
+    )
 
     return render(
         request,
         "outcome/outcome_list.html",
-        {"outcomes": outcomes, "filter_form": filter_form},
+        {"outcomes": page, "filter_form": filter_form, **_page_context(request, page)},
     )
 
 
@@ -304,6 +474,27 @@ def income_create(request):
         return render(request, "income/income_form.html", {"form": form})
 
 
+@otp_required
+def import_data(request):
+    if request.method == "POST":
+        form = ImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data["file"]
+            job = jobs.enqueue(
+                "import_data",
+                {
+                    "kind": form.cleaned_data["kind"],
+                    "name": upload.name,
+                    "strict": form.cleaned_data["strict"],
+                },
+                files={jobs.UPLOAD: upload},
+            )
+            return redirect("main:job_detail", pk=job.pk)
+    else:
+        form = ImportForm()
+    return render(request, "import/import_form.html", {"form": form})
+
+
 @otp_required
 def outcome_create(request):
     if request.method == "POST":
@@ -357,103 +548,165 @@ def outcome_delete(request, pk):
 
 
 @otp_required
-def partner_data(request):
+async def partner_data(request):
     role = request.GET.get("role")
+    partners = Partner.objects.filter(is_executor=role == "executor").order_by("name")
 
-    if role == "executor":
-        partners = Partner.objects.filter(is_executor=True)
-    else:
-        partners = Partner.objects.filter(is_executor=False)
-
-    partner_list_data = [
-        {"id": partner.id, "name": partner.name} for partner in partners
-    ]
+    partner_list_data = [partner async for partner in partners.values("id", "name")]
 
     return JsonResponse({"partners": partner_list_data})
 
 
 @otp_required
-def discrepancy_view(request):
-    role = request.GET.get("role", "executor")
-    partners = Partner.objects.filter(is_executor=(role == "executor"))
+def api_list(request, resource):
+    try:
+        resource = api.RESOURCES[resource]
+    except KeyError:
+        raise Http404("Unknown resource")
+    try:
+        fields = resource.parse_fields(request.GET.get("fields"))
+        updated_since = api.parse_updated_since(request.GET.get("updated_since"))
+        queryset = resource.queryset(request.GET)
+    except api.ApiError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    # Validators cover the whole scope so deletes change the ETag too.
+    state = collection_state(queryset)
+    etag, last_modified = timestamp_validators(
+        state["last_modified"], state["count"], sorted(request.GET.lists())
+    )
+    return conditional_response(
+        request,
+        etag,
+        last_modified,
+        lambda: StreamingJsonResponse(
+            json_object(
+                [
+                    ("count", state["count"]),
+                    ("last_modified", last_modified),
+                    ("results", api.rows(queryset, fields, updated_since)),
+                ]
+            )
+        ),
+    )
 
-    context = {"partners": partners}
 
-    return render(request, "discrepancy/discrepancy.html", context)
+@otp_required
+def report_view(request):
+    form = ReportFilterForm(request.GET)
+    rows = reporting.report(**form.cleaned_data) if form.is_valid() else []
+    return render(
+        request,
+        "report/report.html",
+        {
+            "form": form,
+            "dimension": RollupDimension(form.cleaned_data.get("dimension")).label,
+            "rows": rows,
+            "totals": reporting.totals(rows),
+            "refreshed_at": reporting.refreshed_at(),
+        },
+    )
 
 
 @otp_required
-def partner_data_whole(request):
-    partner_id = request.GET.get("partner_id")
-    role = request.GET.get("role")
+def report_data(request):
+    form = ReportFilterForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
 
-    if role == "executor":
-        applications = Application.objects.filter(executor_id=partner_id)
-        incomes = Income.objects.filter(executor_id=partner_id)
-        outcomes = Outcome.objects.filter(
-            customer_id__in=applications.values("customer_id")
-        )
-    else:
-        applications = Application.objects.filter(customer_id=partner_id)
-        incomes = Income.objects.filter(
-            executor_id__in=applications.values("executor_id")
-        )
-        outcomes = Outcome.objects.filter(customer_id=partner_id)
-
-    total_applications = applications.count()
-    total_income = incomes.aggregate(Sum("amount"))["amount__sum"] or 0
-    total_outcome = outcomes.aggregate(Sum("amount"))["amount__sum"] or 0
-    discrepancy = total_income - total_outcome
+    etag, refreshed_at = timestamp_validators(
+        reporting.refreshed_at(), sorted(request.GET.lists())
+    )
 
-    application_data = []
-    for app in applications:
-        application_data.append(
+    def build():
+        rows = reporting.report(**form.cleaned_data)
+        return JsonResponse(
             {
-                "created_date": app.created_date,
-                "id": app.id,
-                "customer": app.customer.name
-                if app.customer is not None
-                else "Нет заказчика",
-                "executor": app.executor.name
-                if app.executor is not None
-                else "Нет исполнителя",
-                "amount": app.uncargo_sum,
-                "created_at": app.created_at,
+                "refreshed_at": refreshed_at,
+                "rows": rows,
+                "totals": reporting.totals(rows),
             }
         )
 
-    incomes_data = []
-    for income in incomes:
-        incomes_data.append(
-            {
-                "created_at": income.created_at,
-                "id": income.id,
-                "executor": income.executor_id,
-                "name": income.executor.name,
-                "amount": income.amount,
-            }
-        )
+    return conditional_response(request, etag, refreshed_at, build)
 
-    outcomes_data = []
-    for outcome in outcomes:
-        outcomes_data.append(
-            {
-                "created_at": outcome.created_at,
-                "id": outcome.id,
-                "customer": outcome.customer_id,
-                "name": outcome.customer.name,
-                "amount": income.amount,
-            }
-        )
 
-    data = {
-        "incomes": incomes_data,
-        "outcomes": outcomes_data,
-        "applications": application_data,
-        "total_applications": total_applications,
-        "total_income": total_income,
-        "total_outcome": total_outcome,
-        "discrepancy": discrepancy,
+@otp_required
+def report_refresh(request):
+    if request.method != "POST":
+        return redirect("main:report")
+    job = jobs.enqueue("refresh_reports", key="refresh_reports")
+    return redirect("main:job_detail", pk=job.pk)
+
+
+def _job_payload(job):
+    return {
+        "id": job.pk,
+        "kind": job.kind,
+        "status": job.status,
+        "status_label": JobStatus(job.status).label,
+        "progress": job.progress,
+        "total": job.total,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "error": job.error,
+        "result": job.result,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
     }
 
-    return JsonResponse(data)
+
+@otp_required
+def job_detail(request, pk):
+    job = get_object_or_404(Job, pk=pk)
+    kind = jobs.JOBS.get(job.kind)
+    return render(
+        request,
+        "job/job_detail.html",
+        {
+            "job": job,
+            "label": kind.label if kind else job.kind,
+            "finished": job.status in (JobStatus.SUCCEEDED, JobStatus.FAILED),
+        },
+    )
+
+
+@otp_required
+def job_data(request, pk):
+    return JsonResponse(_job_payload(get_object_or_404(Job, pk=pk)))
+
+
+@otp_required
+def job_file(request, pk):
+    job = get_object_or_404(Job, pk=pk, status=JobStatus.SUCCEEDED)
+    name = (job.result or {}).get("file")
+    if not name:
+        raise Http404("The job produced no file")
+    try:
+        file = open(jobs.job_dir(job.pk) / name, "rb")
+    except FileNotFoundError:
+        raise Http404("The file was already deleted")
+    return FileResponse(file, as_attachment=True, filename=name)
+
+
+@otp_required
+def discrepancy_view(request):
+    role = request.GET.get("role", "executor")
+    partners = Partner.objects.filter(is_executor=(role == "executor"))
+
+    context = {"partners": partners}
+
+    return render(request, "discrepancy/discrepancy.html", context)
+
+
+@otp_required
+async def partner_data_whole(request):
+    try:
+        partner_id = uuid.UUID(request.GET.get("partner_id", ""))
+    except ValueError:
+        # The body streams after the headers, so bad input can't fail it then.
+        return JsonResponse({"error": "Invalid partner_id"}, status=400)
+    role = request.GET.get("role")
+
+    return StreamingJsonResponse(ajson_object(partner_ledger_members(partner_id, role)))
@@ -0,0 +1,16 @@
+"""Start-up of the processes ``manage.py run_jobs`` runs jobs in.
+
+A spawned child imports this module before Django is set up, so it must not
+import models or anything that does.
+"""
+
+import signal
+
+import django
+
+
+def init_worker():
+    # Ctrl-C reaches the whole process group; stopping is up to the parent,
+    # which lets running jobs finish.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    django.setup()